@@ -0,0 +1,440 @@
+"""
+Mode de service asynchrone (ASGI) de l'API FitBox.
+
+Expose les mêmes routes que backend_api (/health, /ready, /live, /metrics,
+/calculate, /generate_workout, /generate_nutrition, /chat,
+/conversation/<id>, /activity_levels, /goals) avec Quart. Les appels Ollama sont attendus
+(`await`) sur un client httpx.AsyncClient partagé: une requête en cours de
+génération n'occupe pas de thread, un seul processus peut donc garder des
+centaines de conversations en vol.
+
+Le calcul des profils, les prompts, l'historique et les caches restent ceux
+de FitBoxBackend (instance `backend` de backend_api). Les appels bloquants
+(SQLite de l'historique et du cache de réponses, comptage des tokens du
+prompt) passent par asyncio.to_thread pour ne pas bloquer la boucle
+d'événements. Le calcul en lot et les routes SSE restent servis par
+l'application Flask.
+
+Lancement (depuis backend/):
+    hypercorn asgi_app:app --bind 0.0.0.0:5000
+    # ou: python asgi_app.py
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+
+import httpx
+from quart import Quart, Response, g, jsonify, request
+
+from backend_api import (
+    backend,
+    health_payload,
+    liveness_payload,
+    readiness_payload,
+    is_error_response,
+    postprocess_response,
+    CACHE_BYPASS_HEADER,
+    CONVERSATION_MAX_PAGE,
+    CONVERSATION_PAGE_SIZE,
+)
+import metrics
+from ndjson_stream import NDJSONText
+from single_flight import AsyncSingleFlight
+from physiological_calculator import get_available_activity_levels, get_available_goals
+
+
+app = Quart(__name__)
+
+
+class AsyncGenerationClient:
+    """Génération asynchrone: Ollama via httpx.AsyncClient, modèle local via le scheduler"""
+
+    def __init__(self):
+        self.client = None
+        # Même réglage que FitBoxBackend (FITBOX_COALESCE)
+        self.coalescing = AsyncSingleFlight() if backend.coalescing is not None else None
+        self._in_flight = 0
+        self._requests = 0
+
+    async def start(self):
+        """Crée le client HTTP partagé (taille du pool et timeouts: OLLAMA_POOL_* / OLLAMA_*_TIMEOUT)"""
+        pool_size = int(os.environ.get('OLLAMA_ASYNC_POOL_SIZE', '256'))
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(
+                float(os.environ.get('OLLAMA_READ_TIMEOUT', '60')),
+                connect=float(os.environ.get('OLLAMA_CONNECT_TIMEOUT', '5'))
+            )
+        )
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def _ollama(self, prompt: str, max_tokens: int, temperature: float):
+        """
+        Appel Ollama sur une réplique choisie par backend.router (mêmes règles
+        que FitBoxBackend.ollama_stream: une réplique en échec est signalée et
+        la requête part vers une autre).
+
+        Returns:
+            Le texte nettoyé, ou None si toutes les répliques sont hors
+            service et que le modèle local peut prendre le relais
+        """
+        payload, headers = backend.ollama_request(prompt, max_tokens, temperature)
+        metrics.current_backend.set("ollama")
+        router = backend.router
+        tried = []
+        last_error = None
+        while True:
+            replica = router.acquire(exclude=tried, panic=backend.model is None)
+            if replica is None:
+                if last_error is not None and backend.model is None:
+                    raise last_error
+                return None
+            tried.append(replica.url)
+
+            accumulator = NDJSONText()
+            start = time.perf_counter()
+            latency = None
+            ok = False
+            try:
+                async with self.client.stream("POST", replica.url, json=payload, headers=headers) as resp:
+                    latency = time.perf_counter() - start
+                    if resp.status_code >= 500:
+                        resp.raise_for_status()
+                    async for chunk in resp.aiter_bytes():
+                        if accumulator.feed(chunk):
+                            break
+                    status_code = resp.status_code
+                ok = True
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if latency is not None and isinstance(e, httpx.TransportError):
+                    # Coupure en cours de lecture: pas de nouvel essai
+                    raise
+                last_error = e
+                continue
+            finally:
+                router.release(replica, latency=latency, ok=ok)
+
+            accumulator.close()
+            backend.record_ollama_metrics(accumulator.final, time.perf_counter() - start)
+            result = backend.ollama_result(accumulator.text, accumulator.others, accumulator.decoder, status_code, accumulator.error)
+            if is_error_response(result):
+                metrics.record_error("ollama_response")
+            return result
+
+    async def generate_response(self, prompt: str, max_tokens: int = 400, temperature: float = 0.7) -> str:
+        """Équivalent asynchrone de FitBoxBackend.generate_response (générations identiques partagées)"""
+        if self.coalescing is None:
+            return await self._generate(prompt, max_tokens, temperature)
+        key = backend.response_cache_key(prompt, max_tokens, temperature)
+        response, _ = await self.coalescing.do(key, lambda: self._generate(prompt, max_tokens, temperature))
+        return response
+
+    async def _generate(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        self._requests += 1
+        self._in_flight += 1
+        try:
+            if backend.use_ollama:
+                try:
+                    response = await self._ollama(prompt, max_tokens, temperature)
+                except Exception as e:
+                    metrics.record_error("ollama_request")
+                    return postprocess_response(f"Erreur lors de la requête Ollama: {e}")
+                if response is not None:
+                    return response
+                # Toutes les répliques sont hors service: repli sur le modèle local
+
+            metrics.current_backend.set("local")
+            if backend.model is None and not await asyncio.to_thread(backend.ensure_loaded):
+                metrics.record_error("model_not_loaded")
+                return "Erreur: Le modèle n'est pas chargé."
+
+            if backend.use_batch_scheduler:
+                # Le scheduler travaille dans son propre thread: on attend son Future
+                try:
+                    future = backend.get_scheduler().submit(prompt, max_new_tokens=max_tokens, temperature=temperature)
+                    return backend.local_result(await asyncio.wrap_future(future))
+                except Exception as e:
+                    metrics.record_error("generation")
+                    return f"Erreur lors de la génération: {str(e)}"
+
+            return await asyncio.to_thread(backend.generate_response, prompt, max_tokens, temperature)
+        finally:
+            self._in_flight -= 1
+
+    async def generate_cached(self, prompt: str, max_tokens: int = 400, temperature: float = 0.7, use_cache: bool = True):
+        """Équivalent asynchrone de FitBoxBackend.generate_cached"""
+        cache = backend.response_cache
+        if cache is None or not use_cache:
+            if cache is not None:
+                cache.record_bypass()
+            return await self.generate_response(prompt, max_tokens, temperature), False
+
+        key = backend.response_cache_key(prompt, max_tokens, temperature)
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            return cached, True
+
+        response = await self.generate_response(prompt, max_tokens, temperature)
+        if not is_error_response(response):
+            await asyncio.to_thread(cache.set, key, response)
+        return response, False
+
+    def stats(self) -> dict:
+        return {
+            "requests": self._requests,
+            "in_flight": self._in_flight,
+            "coalescing": self.coalescing.stats() if self.coalescing else None,
+        }
+
+
+generation = AsyncGenerationClient()
+
+
+@app.before_serving
+async def startup():
+    """Client HTTP partagé + chargement du modèle (hors boucle d'événements)"""
+    await generation.start()
+    if os.environ.get('FITBOX_BACKGROUND_LOAD', '0') not in ('0', 'false', 'False', ''):
+        backend.start_background_load()
+    else:
+        await asyncio.to_thread(backend.boot)
+
+
+@app.after_serving
+async def shutdown():
+    await generation.close()
+
+
+def _cache_bypassed() -> bool:
+    """True si la requête demande à contourner le cache de réponses"""
+    return request.headers.get(CACHE_BYPASS_HEADER, '0') not in ('0', 'false', 'False', '')
+
+
+@app.before_request
+async def _start_request_metrics():
+    g.request_started = time.perf_counter()
+    metrics.current_route.set(request.url_rule.rule if request.url_rule else "unmatched")
+    metrics.current_backend.set("ollama" if backend.use_ollama else "local")
+
+
+@app.after_request
+async def _record_request_metrics(response):
+    route = metrics.current_route.get()
+    metrics.REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    metrics.REQUEST_DURATION.observe(time.perf_counter() - g.request_started, route=route, method=request.method)
+    if response.status_code >= 500:
+        metrics.record_error("http_5xx")
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+async def prometheus_metrics():
+    """Métriques au format Prometheus (latences par étape, tokens, erreurs)"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/live', methods=['GET'])
+async def liveness():
+    """Liveness: le processus répond (indépendant du modèle)"""
+    return jsonify(liveness_payload())
+
+
+@app.route('/ready', methods=['GET'])
+async def readiness():
+    """Readiness: 200 une fois le modèle chargé et la chauffe terminée, 503 sinon"""
+    payload = readiness_payload()
+    return jsonify(payload), 200 if payload["ready"] else 503
+
+
+@app.route('/health', methods=['GET'])
+async def health_check():
+    """Vérification de l'état de l'API"""
+    payload = health_payload()
+    payload["async_generation"] = generation.stats()
+    return jsonify(payload)
+
+
+@app.route('/calculate', methods=['POST'])
+async def calculate_profile():
+    """Route pour calculer le profil physiologique"""
+    try:
+        data = (await request.get_json(silent=True)) or {}
+
+        for field in ['age', 'gender', 'weight', 'height']:
+            if field not in data:
+                return jsonify({
+                    "success": False,
+                    "error": f"Champ manquant: {field}"
+                }), 400
+
+        result = backend.calculate_profile(data)
+        return jsonify(result), 200 if result["success"] else 400
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+async def _generate_plan(kind: str):
+    data = (await request.get_json(silent=True)) or {}
+
+    profile_result = backend.calculate_profile(data)
+    if not profile_result["success"]:
+        return jsonify(profile_result), 400
+
+    profile = profile_result["profile"]
+    if kind == "workout_plan":
+        message = backend.workout_plan_message(data)
+    else:
+        message = backend.nutrition_plan_message(profile)
+
+    prompt = await asyncio.to_thread(backend.create_prompt, data, profile, message)
+    response, cached = await generation.generate_cached(prompt, max_tokens=500, use_cache=not _cache_bypassed())
+
+    return jsonify({
+        "success": True,
+        kind: response,
+        "cached": cached,
+        "generated_at": datetime.now().isoformat(),
+        "profile": profile
+    }), 200
+
+
+@app.route('/generate_workout', methods=['POST'])
+async def generate_workout():
+    """Route pour générer un programme d'entraînement"""
+    try:
+        return await _generate_plan("workout_plan")
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/generate_nutrition', methods=['POST'])
+async def generate_nutrition():
+    """Route pour générer un plan nutritionnel"""
+    try:
+        return await _generate_plan("nutrition_plan")
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/chat', methods=['POST'])
+async def chat():
+    """Route pour interaction conversationnelle"""
+    try:
+        data = (await request.get_json(silent=True)) or {}
+
+        user_data = data.get('user_data')
+        message = data.get('message')
+        conversation_id = data.get('conversation_id', 'default')
+
+        if not user_data or not message:
+            return jsonify({
+                "success": False,
+                "error": "user_data et message sont requis"
+            }), 400
+
+        profile_result = backend.calculate_profile(user_data)
+        if not profile_result["success"]:
+            return jsonify(profile_result), 400
+
+        history = await asyncio.to_thread(
+            backend.conversation_history, data.get('conversation_id'), data.get('history')
+        )
+        prompt, prompt_report = await asyncio.to_thread(
+            backend.build_prompt, user_data, profile_result["profile"], message, history
+        )
+        response = await generation.generate_response(prompt)
+
+        await asyncio.to_thread(backend.conversations.append, conversation_id, {
+            "user": message,
+            "assistant": response,
+            "timestamp": datetime.now().isoformat()
+        })
+
+        return jsonify({
+            "success": True,
+            "response": response,
+            "conversation_id": conversation_id,
+            "prompt_tokens": prompt_report["prompt_tokens"],
+            "timestamp": datetime.now().isoformat()
+        }), 200
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/conversation/<conversation_id>', methods=['GET'])
+async def get_conversation(conversation_id):
+    """Récupère l'historique d'une conversation, page par page (?offset=&limit=)"""
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(CONVERSATION_MAX_PAGE, max(1, int(request.args.get('limit', CONVERSATION_PAGE_SIZE))))
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "offset et limit doivent être des entiers"
+        }), 400
+
+    history = await asyncio.to_thread(backend.conversations.get, conversation_id, offset=offset, limit=limit)
+    if history is None:
+        return jsonify({
+            "success": False,
+            "error": "Conversation non trouvée"
+        }), 404
+
+    total = await asyncio.to_thread(backend.conversations.count, conversation_id)
+    return jsonify({
+        "success": True,
+        "conversation_id": conversation_id,
+        "history": history,
+        "total": total,
+        "offset": offset,
+        "limit": limit
+    }), 200
+
+
+@app.route('/activity_levels', methods=['GET'])
+async def get_activity_levels():
+    """Retourne les niveaux d'activité disponibles"""
+    return jsonify({
+        "success": True,
+        "activity_levels": [
+            {"key": key, "description": desc}
+            for key, desc in get_available_activity_levels()
+        ]
+    }), 200
+
+
+@app.route('/goals', methods=['GET'])
+async def get_goals():
+    """Retourne les objectifs disponibles"""
+    return jsonify({
+        "success": True,
+        "goals": [
+            {"key": key, "description": desc}
+            for key, desc in get_available_goals()
+        ]
+    }), 200
+
+
+if __name__ == '__main__':
+    print("🚀 Démarrage du serveur ASGI sur http://localhost:5000")
+    print("   Appuyez sur Ctrl+C pour arrêter\n")
+    app.run(host='0.0.0.0', port=5000)
@@ -1,24 +1,119 @@
-from flask import Flask, request, jsonify
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from peft import PeftModel
+from flask import Flask, request, jsonify, Response, stream_with_context, g
+# torch / transformers / peft et local_generation ne sont importés qu'au
+# premier usage du modèle local: le mode Ollama démarre sans eux
 import sys
 sys.path.append('..')
-from physiological_calculator import PhysiologicalCalculator
+from physiological_calculator import PhysiologicalCalculator, BMICategory, BatchErrorCode
+from http_pool import PooledHTTPSession
+from generation_router import GenerationRouter, http_probe
+from conversation_store import create_conversation_store
+from profile_cache import ProfileCache
+from response_cache import ResponseCache, response_key
+from single_flight import SingleFlight
+from text_normalizer import normalize_text, IncrementalNormalizer
+from ndjson_stream import NDJSONDecoder, NDJSONText, extract_text
+from prompt_builder import TokenCounter, build_prompt as build_budgeted_prompt
+import metrics
+import numpy as np
+import requests
 import json
 from datetime import datetime
 from pathlib import Path
 import os
+import contextvars
 import glob
-import requests
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from local_generation import LocalGenerationEngine, BatchScheduler
 
 
 app = Flask(__name__)
 
+# Calcul en lot: champs attendus, valeurs par défaut (identiques à /calculate)
+BATCH_FIELDS = ['age', 'gender', 'weight', 'height', 'activity_level', 'goal']
+BATCH_REQUIRED_FIELDS = ['age', 'gender', 'weight', 'height']
+BATCH_DEFAULTS = {'activity_level': 'moderately_active', 'goal': 'maintenance'}
+# Au-delà de ce nombre de lignes la réponse est streamée par morceaux
+BATCH_STREAM_THRESHOLD = int(os.environ.get('FITBOX_BATCH_STREAM_THRESHOLD', '1000'))
+BATCH_STREAM_CHUNK = 1000
+BATCH_MAX_ROWS = int(os.environ.get('FITBOX_BATCH_MAX_ROWS', '200000'))
+BATCH_OUTPUT_FIELDS = ['bmi', 'bmi_category', 'bmr', 'tdee', 'target_calories',
+                       'protein_g', 'carbs_g', 'fat_g', 'ideal_weight', 'weight_difference']
+# En-tête permettant à un client de contourner le cache de réponses
+CACHE_BYPASS_HEADER = 'X-FitBox-Cache-Bypass'
+# Pagination de /conversation/<id>
+CONVERSATION_PAGE_SIZE = 50
+CONVERSATION_MAX_PAGE = 500
+# Génération de chauffe au démarrage (profil fictif, quelques tokens)
+WARMUP_USER_DATA = {'age': 30, 'gender': 'male', 'weight': 75, 'height': 1.75,
+                    'activity_level': 'moderately_active', 'goal': 'maintenance'}
+WARMUP_MESSAGE = "Donne-moi un conseil pour bien commencer."
+
+
+def is_error_response(text: str) -> bool:
+    """Message d'erreur renvoyé à la place d'une génération (jamais mis en cache)"""
+    return text.startswith("Erreur")
+
+
+def stream_in_thread(streamer, generate):
+    """
+    Lit `streamer` pendant que generate() tourne dans un thread.
+    
+    Une exception de generate() ferme le streamer (sinon la lecture
+    attendrait indéfiniment) puis est relancée côté lecteur.
+    
+    Yields:
+        Morceaux de texte du streamer
+    """
+    errors = []
+    
+    def _run():
+        try:
+            generate()
+        except BaseException as e:
+            errors.append(e)
+            streamer.end()
+    
+    # Le thread reprend le contexte de la requête (étiquettes des métriques)
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(_run,), daemon=True)
+    thread.start()
+    yield from streamer
+    thread.join()
+    if errors:
+        raise errors[0]
+
+
+def postprocess_response(text: str) -> str:
+    """Nettoyage du texte généré (normalize_text, chronométré comme étape 'postprocess')"""
+    with metrics.stage("postprocess"):
+        return normalize_text(text)
+
 
 class FitBoxBackend:
     """Gestionnaire du backend FitBox"""
     
+    # Bloc fixe en tête de chaque prompt: ses past-key-values sont mis en cache
+    # par LocalGenerationEngine, seule la suite est recalculée à chaque requête
+    SYSTEM_PREAMBLE = """<|system|>
+    Tu es FitBox, un coach sportif et nutritionniste expert virtuel. 
+    Tu fournis des conseils personnalisés, motivants et basés sur la science.
+    Réponds de manière concise et actionable.
+    FORMAT INSTRUCTIONS FOR OUTPUT:
+    - Réponds en français clair et naturel.
+    - Utilise des phrases courtes et simples.
+    - Structure la réponse avec des titres et des listes à puces lorsqu'il y a des étapes ou items.
+    - N'utilise pas de balises de style brutales (évite les `**gras**` non nécessaires) et évite de scinder les mots.
+    - Ne renvoie pas de métadonnées internes ou de tokens spéciaux (ex: `<|assistant|>`).
+    <|end|>
+    <|user|>
+    """
+    # Nombre d'échanges précédents repris dans le prompt
+    HISTORY_TURNS = 3
+    
     def __init__(self, model_path: str = None):
         # Déterminer un chemin par défaut robuste vers <repo_root>/models/fitbox_model
         if model_path:
@@ -52,9 +147,24 @@ class FitBoxBackend:
             pass
         self.model = None
         self.tokenizer = None
+        self.engine = None
+        self.scheduler = None
+        # Regroupement des requêtes locales concurrentes en lots (FITBOX_BATCH_SCHEDULER=0 pour désactiver)
+        self.use_batch_scheduler = os.environ.get('FITBOX_BATCH_SCHEDULER', '1') not in ('0', 'false', 'False', '')
+        self.max_batch_size = int(os.environ.get('FITBOX_MAX_BATCH_SIZE', '8'))
+        self.max_batch_wait_ms = float(os.environ.get('FITBOX_MAX_BATCH_WAIT_MS', '20'))
         self.calculator = PhysiologicalCalculator()
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self._device = None
         self.model_loaded = False
+        # Chargement: pending -> loading -> ready / failed (exposé par /health)
+        self.load_state = "pending"
+        self.load_seconds = None
+        self._load_lock = threading.Lock()
+        # Chauffe: pending -> running -> done / failed (skipped si FITBOX_WARMUP=0)
+        self.warmup_state = "pending"
+        self.warmup_seconds = None
+        self.warmup_error = None
+        self.started_at = time.time()
         # Ollama Cloud config (optionnel). Expect full URL like 'https://cloud.ollama.com/api/generate'
         self.ollama_api_url = os.environ.get('OLLAMA_API_URL')
         self.ollama_api_key = os.environ.get('OLLAMA_API_KEY')
@@ -65,10 +175,129 @@ class FitBoxBackend:
         if not self.ollama_api_url and self.ollama_local:
             # endpoint local par défaut
             self.ollama_api_url = os.environ.get('OLLAMA_LOCAL_URL', 'http://127.0.0.1:11434/api/generate')
-        self.use_ollama = bool(self.ollama_api_url)
-        self.conversations = {}
+        # Plusieurs répliques possibles (OLLAMA_API_URLS), réparties par GenerationRouter
+        self.router = GenerationRouter.from_env(self.ollama_api_url)
+        self.use_ollama = self.router is not None
+        if self.use_ollama and not self.ollama_api_url:
+            self.ollama_api_url = self.router.urls[0]
+        # Modèle HF local chargé aussi en mode Ollama, utilisé seulement si toutes les répliques sont hors service
+        self.local_fallback = os.environ.get('OLLAMA_LOCAL_FALLBACK', '0') not in ('0', 'false', 'False', '')
+        # Session HTTP keep-alive partagée (taille du pool et timeouts via OLLAMA_POOL_* / OLLAMA_*_TIMEOUT)
+        self.http = PooledHTTPSession.from_env()
+        # Historique borné (mémoire LRU/TTL ou SQLite partagé: FITBOX_CONVERSATION_STORE)
+        self.conversations = create_conversation_store()
+        # Profils déjà calculés, partagés (immuables) entre les requêtes d'une session
+        self.profile_cache = ProfileCache(int(os.environ.get('FITBOX_PROFILE_CACHE_SIZE', '4096')))
+        # Cache optionnel des programmes/plans générés (FITBOX_RESPONSE_CACHE=1)
+        self.response_cache = None
+        if os.environ.get('FITBOX_RESPONSE_CACHE', '0') not in ('0', 'false', 'False', ''):
+            default_db = Path(__file__).resolve().parent.parent / "data" / "response_cache.db"
+            self.response_cache = ResponseCache(
+                max_entries=int(os.environ.get('FITBOX_RESPONSE_CACHE_SIZE', '1024')),
+                ttl_seconds=float(os.environ.get('FITBOX_RESPONSE_CACHE_TTL', '86400')),
+                path=os.environ.get('FITBOX_RESPONSE_CACHE_DB', str(default_db)) or None
+            )
+        # Générations identiques simultanées partagées (FITBOX_COALESCE=0 pour désactiver)
+        self.coalescing = None
+        if os.environ.get('FITBOX_COALESCE', '1') not in ('0', 'false', 'False', ''):
+            self.coalescing = SingleFlight()
+        # Budget de tokens du prompt (historique réduit au-delà)
+        self.prompt_token_budget = int(os.environ.get('FITBOX_PROMPT_TOKEN_BUDGET', '2048'))
+        self._prompt_tokenizer = None
+        self._prompt_tokenizer_loaded = False
+        self._token_counter = None
+    
+    @property
+    def device(self) -> str:
+        """'cuda' ou 'cpu' (détecté au premier accès: importe torch)"""
+        if self._device is None:
+            import torch
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        return self._device
+    
+    def load(self) -> bool:
+        """
+        load_model() une seule fois, avec suivi de l'état et de la durée.
         
-        print(f"🖥️  Device: {self.device}")
+        Un appel concurrent attend la fin du chargement en cours.
+        """
+        with self._load_lock:
+            if self.load_state in ("ready", "failed"):
+                return self.load_state == "ready"
+            self.load_state = "loading"
+            start = time.perf_counter()
+            try:
+                success = self.load_model()
+            except Exception as e:
+                print(f"❌ Erreur lors du chargement: {e}")
+                success = False
+            self.load_seconds = round(time.perf_counter() - start, 3)
+            self.load_state = "ready" if success else "failed"
+            return success
+    
+    def warm_up(self) -> bool:
+        """
+        Génération de chauffe: create_prompt -> generate_response sur un
+        profil fictif (premiers kernels, caches du tokenizer et du préfixe
+        système, connexion à Ollama). Ne passe ni par le cache de réponses
+        ni par l'historique.
+        
+        Returns:
+            True si la génération a abouti
+        """
+        if os.environ.get('FITBOX_WARMUP', '1') in ('0', 'false', 'False', ''):
+            self.warmup_state = "skipped"
+            return True
+        
+        self.warmup_state = "running"
+        start = time.perf_counter()
+        try:
+            profile = self.calculate_profile(WARMUP_USER_DATA)["profile"]
+            prompt = self.create_prompt(WARMUP_USER_DATA, profile, WARMUP_MESSAGE)
+            response = self._generate_response(
+                prompt, max_tokens=int(os.environ.get('FITBOX_WARMUP_TOKENS', '16')), temperature=0.7
+            )
+            error = response if is_error_response(response) else None
+        except Exception as e:
+            error = str(e)
+        self.warmup_seconds = round(time.perf_counter() - start, 3)
+        self.warmup_error = error
+        self.warmup_state = "failed" if error else "done"
+        if error:
+            print(f"⚠️  Chauffe échouée ({self.warmup_seconds}s): {error}")
+        else:
+            print(f"🔥 Chauffe terminée en {self.warmup_seconds}s")
+        return error is None
+    
+    def boot(self) -> bool:
+        """
+        load() puis warm_up(). Une chauffe échouée (ex. Ollama pas encore
+        démarré) est retentée en arrière-plan toutes les
+        FITBOX_WARMUP_RETRY_SECONDS secondes.
+        """
+        if not self.load():
+            return False
+        if not self.warm_up():
+            threading.Thread(target=self._retry_warm_up, name="fitbox-warmup", daemon=True).start()
+        return True
+    
+    def _retry_warm_up(self):
+        delay = float(os.environ.get('FITBOX_WARMUP_RETRY_SECONDS', '30'))
+        while True:
+            time.sleep(delay)
+            if self.warm_up():
+                return
+    
+    def start_background_load(self) -> threading.Thread:
+        """Lance boot() dans un thread: le serveur répond pendant le chargement (voir /ready)"""
+        thread = threading.Thread(target=self.boot, name="fitbox-model-load", daemon=True)
+        thread.start()
+        return thread
+    
+    @property
+    def ready(self) -> bool:
+        """Modèle chargé et chauffe terminée: l'instance peut recevoir du trafic"""
+        return self.load_state == "ready" and self.warmup_state in ("done", "skipped")
     
     def load_model(self):
         """Charge le modèle fine-tuné"""
@@ -76,12 +305,40 @@ class FitBoxBackend:
 
         # Si la configuration Ollama est fournie, on active le mode Ollama Cloud
         if self.use_ollama:
-            print(f"🌩️  Mode Ollama activé — enverra les prompts vers: {self.ollama_api_url} (modèle: {self.ollama_model_name})")
+            print(f"🌩️  Mode Ollama activé — enverra les prompts vers: {', '.join(self.router.urls)} (modèle: {self.ollama_model_name}, répartition: {self.router.strategy})")
             if not self.ollama_api_key:
                 print("⚠️  Aucune clé OLLAMA_API_KEY trouvée dans l'environnement — vous aurez probablement une erreur d'authentification lors des requêtes")
-            # Pas d'autres charges locales à faire
+            self.start_health_checks()
+            if self.local_fallback:
+                print("🛟 Repli local activé — chargement du modèle HF (utilisé si toutes les répliques Ollama sont hors service)")
+                self.load_local_model()
+            # Le mode Ollama reste utilisable même sans modèle local
             return True
 
+        return self.load_local_model()
+
+    def start_health_checks(self):
+        """Contrôle de santé actif des répliques Ollama (OLLAMA_HEALTH_INTERVAL, 0 pour désactiver)"""
+        interval = float(os.environ.get('OLLAMA_HEALTH_INTERVAL', '10'))
+        if interval <= 0:
+            return
+        headers = {"Authorization": f"Bearer {self.ollama_api_key}"} if self.ollama_api_key else None
+        self.router.start_health_checks(
+            http_probe(headers, path=os.environ.get('OLLAMA_HEALTH_PATH', '/api/tags')),
+            interval=interval
+        )
+
+    def load_local_model(self):
+        """Charge le modèle HF local (adapter LoRA, modèle complet ou modèle de base)"""
+        try:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+            from peft import PeftModel
+        except ImportError as e:
+            print(f"❌ Dépendances du modèle local manquantes ({e}): pip install torch transformers peft")
+            return False
+        print(f"🖥️  Device: {self.device}")
+
         # Vérifier l'existence du dossier et la présence de fichiers attendus
         try:
             if not self.model_path.exists():
@@ -218,17 +475,46 @@ class FitBoxBackend:
             print(f"❌ Erreur inattendue lors de la vérification du dossier modèle: {e}")
             return False
     
+    def ensure_loaded(self) -> bool:
+        """
+        Chargement paresseux: charge le modèle au premier usage du chemin
+        local si personne ne l'a encore fait (ex. servi par gunicorn sans
+        initialize_app). Un échec de chargement n'est pas retenté.
+        """
+        if self.load_state in ("pending", "loading") and not self.use_ollama:
+            self.load()
+        return self.model is not None
+    
+    def get_engine(self) -> "LocalGenerationEngine":
+        """Moteur de génération locale associé au modèle chargé"""
+        from local_generation import LocalGenerationEngine
+        if self.engine is None or self.engine.model is not self.model:
+            self.engine = LocalGenerationEngine(self.model, self.tokenizer, self.device, observer=metrics)
+        return self.engine
+    
+    def get_scheduler(self) -> "BatchScheduler":
+        """Scheduler de lots placé devant le moteur local"""
+        from local_generation import BatchScheduler
+        engine = self.get_engine()
+        if self.scheduler is None or self.scheduler.engine is not engine:
+            self.scheduler = BatchScheduler(
+                engine,
+                max_batch_size=self.max_batch_size,
+                max_wait_ms=self.max_batch_wait_ms,
+                prefix=self.SYSTEM_PREAMBLE,
+            )
+        return self.scheduler
+    
     def calculate_profile(self, user_data: dict) -> dict:
-        """Calcule le profil physiologique complet"""
+        """
+        Calcule le profil physiologique complet.
+        
+        Le profil retourné vient du cache de profils: il est partagé entre
+        les requêtes et en lecture seule.
+        """
         try:
-            profile = self.calculator.calculate_complete_profile(
-                age=user_data['age'],
-                gender=user_data['gender'],
-                weight=user_data['weight'],
-                height=user_data['height'],
-                activity_level=user_data.get('activity_level', 'moderately_active'),
-                goal=user_data.get('goal', 'maintenance')
-            )
+            with metrics.stage("calculate_profile"):
+                profile = self.profile_cache.get_or_compute(user_data, self._compute_profile)
             
             return {
                 "success": True,
@@ -241,9 +527,96 @@ class FitBoxBackend:
                 "error": str(e)
             }
     
+    def _compute_profile(self, user_data: dict) -> dict:
+        return self.calculator.calculate_complete_profile(
+            age=user_data['age'],
+            gender=user_data['gender'],
+            weight=user_data['weight'],
+            height=user_data['height'],
+            activity_level=user_data.get('activity_level', 'moderately_active'),
+            goal=user_data.get('goal', 'maintenance')
+        )
+    
+    def calculate_profiles_batch(self, columns: dict) -> dict:
+        """
+        Calcule les profils d'un lot d'utilisateurs en une seule passe vectorisée.
+        
+        Args:
+            columns: Dictionnaire champ -> liste de valeurs (voir BATCH_FIELDS)
+            
+        Returns:
+            Tableaux NumPy produits par PhysiologicalCalculator.calculate_batch_profiles
+        """
+        return self.calculator.calculate_batch_profiles(
+            age=columns['age'],
+            gender=columns['gender'],
+            weight=columns['weight'],
+            height=columns['height'],
+            activity_level=columns['activity_level'],
+            goal=columns['goal']
+        )
+    
+    def conversation_history(self, conversation_id: str, client_history: list = None) -> list:
+        """
+        Historique utilisé dans le prompt.
+
+        L'historique est relu côté serveur à partir de conversation_id (source
+        unique); un historique envoyé par un ancien client reste accepté.
+        Sans conversation_id explicite, aucun historique n'est partagé.
+        """
+        if client_history:
+            return client_history
+        if not conversation_id:
+            return []
+        return self.conversations.recent(conversation_id, self.HISTORY_TURNS)
+    
+    def token_counter(self) -> TokenCounter:
+        """
+        Compteur de tokens des prompts.
+        
+        Tokenizer du modèle local s'il est chargé, sinon celui indiqué par
+        FITBOX_PROMPT_TOKENIZER (chargé une fois), sinon une estimation.
+        """
+        tokenizer = self.tokenizer or self._load_prompt_tokenizer()
+        if self._token_counter is None or self._token_counter.tokenizer is not tokenizer:
+            self._token_counter = TokenCounter(tokenizer)
+        return self._token_counter
+    
+    def _load_prompt_tokenizer(self):
+        if not self._prompt_tokenizer_loaded:
+            self._prompt_tokenizer_loaded = True
+            name = os.environ.get('FITBOX_PROMPT_TOKENIZER')
+            if name:
+                try:
+                    from transformers import AutoTokenizer
+                    self._prompt_tokenizer = AutoTokenizer.from_pretrained(name, trust_remote_code=True)
+                    print(f"✅ Tokenizer de comptage des prompts: {name}")
+                except Exception as e:
+                    print(f"⚠️  Tokenizer {name} indisponible ({e}): tokens estimés")
+        return self._prompt_tokenizer
+    
     def create_prompt(self, user_data: dict, profile: dict, message: str, conversation_history: list = None) -> str:
         """Crée un prompt contextualisé"""
+        return self.build_prompt(user_data, profile, message, conversation_history)[0]
+    
+    def build_prompt(self, user_data: dict, profile: dict, message: str, conversation_history: list = None) -> tuple:
+        """
+        Crée un prompt contextualisé tenant dans prompt_token_budget.
         
+        Returns:
+            Tuple (prompt, rapport): voir prompt_builder.build_prompt
+        """
+        with metrics.stage("create_prompt"):
+            history = conversation_history[-self.HISTORY_TURNS:] if conversation_history else None
+            prompt, report = build_budgeted_prompt(
+                self._prompt_renderer(user_data, profile), message, history,
+                self.token_counter(), self.prompt_token_budget
+            )
+        metrics.record_prompt(report)
+        return prompt, report
+    
+    def _prompt_renderer(self, user_data: dict, profile: dict):
+        """Gabarit du prompt: (texte d'historique, message) -> prompt"""
         context = f"""PROFIL UTILISATEUR:
 - Âge: {user_data['age']} ans, {user_data['gender']}
 - Poids: {user_data['weight']} kg, Taille: {user_data['height']} m
@@ -256,237 +629,354 @@ DONNÉES PHYSIOLOGIQUES:
 - Calories cibles: {profile['nutrition']['target_calories']} cal/jour
 - Macros: {profile['nutrition']['macros']['protein_g']}g protéines, {profile['nutrition']['macros']['carbs_g']}g glucides, {profile['nutrition']['macros']['fat_g']}g lipides"""
         
-        history_text = ""
-        if conversation_history:
-            history_text = "\n\nHISTORIQUE DE CONVERSATION:\n"
-            for item in conversation_history[-3:]:
-                history_text += f"User: {item['user']}\nAssistant: {item['assistant']}\n\n"
-        
-        prompt = f"""<|system|>
-    Tu es FitBox, un coach sportif et nutritionniste expert virtuel. 
-    Tu fournis des conseils personnalisés, motivants et basés sur la science.
-    Réponds de manière concise et actionable.
-    FORMAT INSTRUCTIONS FOR OUTPUT:
-    - Réponds en français clair et naturel.
-    - Utilise des phrases courtes et simples.
-    - Structure la réponse avec des titres et des listes à puces lorsqu'il y a des étapes ou items.
-    - N'utilise pas de balises de style brutales (évite les `**gras**` non nécessaires) et évite de scinder les mots.
-    - Ne renvoie pas de métadonnées internes ou de tokens spéciaux (ex: `<|assistant|>`).
-    <|end|>
-    <|user|>
-    {context}
+        def render(history_text: str, message: str) -> str:
+            return self.SYSTEM_PREAMBLE + f"""{context}
     {history_text}
     {message}<|end|>
     <|assistant|>
     """
         
-        return prompt
+        return render
     
-    def generate_response(self, prompt: str, max_tokens: int = 400, temperature: float = 0.7) -> str:
-        """Génère une réponse du modèle (VERSION CORRIGÉE)"""
-        def postprocess_response(text: str) -> str:
-            """Nettoyage simple et conservateur des artefacts fréquents issus des generations.
-
-            - retire les marqueurs Markdown gras (`**`), underscores inutiles
-            - normalise les espaces multiples
-            - corrige les espaces erronés autour des apostrophes et ponctuation
-            - applique une normalisation unicode
-            """
+    def ollama_request(self, prompt: str, max_tokens: int, temperature: float, stream: bool = False):
+        """
+        Corps et en-têtes d'un appel /api/generate.
+        
+        Returns:
+            Tuple (payload, headers)
+        """
+        payload = {
+            "model": self.ollama_model_name,
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        if stream:
+            payload["stream"] = True
+        headers = {"Content-Type": "application/json"}
+        if self.ollama_api_key:
+            headers["Authorization"] = f"Bearer {self.ollama_api_key}"
+        return payload, headers
+    
+    @staticmethod
+    def ollama_result(text: str, others: list, decoder: NDJSONDecoder, status_code: int, error=None) -> str:
+        """
+        Texte final d'une réponse Ollama lue par NDJSONText (nettoyé).
+        
+        Un statut hors 2xx ou un objet portant un champ `error` donne un
+        message d'erreur (is_error_response), pas un texte généré.
+        """
+        if error is None:
+            error = next((o['error'] for o in others if isinstance(o, dict) and o.get('error')), None)
+        if error is not None or not 200 <= status_code < 300:
+            detail = error if error is not None else (text or decoder.snippet or (json.dumps(others[0]) if others else ""))
+            return postprocess_response(f"Erreur Ollama (status {status_code}): {str(detail)[:200]}")
+
+        if text:
+            return postprocess_response(text)
+
+        # Objet sans champ texte: 'result' ou sérialisation brève
+        if others:
+            j = others[0]
+            out = j.get('result') if isinstance(j, dict) else None
+            if isinstance(out, list) and len(out) > 0:
+                first = out[0]
+                if isinstance(first, dict) and 'text' in first:
+                    return postprocess_response(first['text'])
+                if isinstance(first, str):
+                    return postprocess_response(first)
             try:
-                import re
-                import unicodedata
-
-                # Normalisation unicode (préserve accents propres)
-                text = unicodedata.normalize('NFKC', text)
-
-                # Retirer les balises de mise en forme explicites comme **bold** ou __underline__
-                text = re.sub(r"\*\*(.*?)\*\*", r"\1", text, flags=re.S)
-                text = re.sub(r"__(.*?)__", r"\1", text, flags=re.S)
-
-                # Supprimer étoiles isolées et triples backticks
-                text = text.replace('`', '')
-                text = text.replace('•', '-')
-
-                # Supprimer séquences répétées d'astérisques ou de tirets
-                text = re.sub(r"\*{2,}", '', text)
-                text = re.sub(r"-{3,}", '---', text)
-
-                # Supprimer espaces multiples
-                text = re.sub(r"[ \t\xa0]{2,}", ' ', text)
-
-                # Corriger espace avant ponctuation (.,;:!?) -> enlevez l'espace précédant
-                text = re.sub(r"\s+([.,;:!\?%])", r"\1", text)
-
-                # Corriger espaces autour d'apostrophes (l ' exemple -> l')
-                text = re.sub(r"\s+'\s*", "'", text)
-
-                # Corriger espace après ouverture de parenthèse
-                text = re.sub(r"\(\s+", '(', text)
-                text = re.sub(r"\s+\)", ')', text)
-
-                # Collapser plus d'un saut de ligne en au plus deux
-                text = re.sub(r"\n{3,}", '\n\n', text)
-
-                # Corriger cas où le modèle a inséré des espaces entre lettres au sein d'un même mot
-                # Exemple: "p r o g r a m m e" ou "ent ra în ement" -> "programme", "entraînement"
-                def _collapse_spaced_letters(match):
-                    s = match.group(0)
-                    return s.replace(' ', '')
-
-                # Cherche séquences de lettres séparées par des espaces répétées (au moins 3 lettres espacées)
-                text = re.sub(r"(?:(?:[A-Za-zÀ-ÖØ-öø-ÿ]\s){2,}[A-Za-zÀ-ÖØ-öø-ÿ])", _collapse_spaced_letters, text)
-                text = text.strip()
-
-                return text
+                return postprocess_response(json.dumps(j))
             except Exception:
-                return text
+                return postprocess_response(str(j))
 
-        # Si on est en mode Ollama, déléguer la génération à l'API HTTP
-        if self.use_ollama:
-            try:
-                payload = {
-                    "model": self.ollama_model_name,
-                    "prompt": prompt,
-                    "max_tokens": max_tokens,
-                    "temperature": temperature
-                }
-                headers = {"Content-Type": "application/json"}
-                if self.ollama_api_key:
-                    headers["Authorization"] = f"Bearer {self.ollama_api_key}"
-
-                resp = requests.post(self.ollama_api_url, json=payload, headers=headers, timeout=60)
-                # Try parsing as JSON first
+        # Aucun objet JSON: message de debug court (pas de dump complet)
+        snippet = decoder.snippet + ('...' if len(decoder.snippet) >= decoder.SNIPPET_SIZE else '')
+        return postprocess_response(f"Erreur Ollama: réponse non JSON (status {status_code}). Raw (tronc): {snippet}")
+    
+    @staticmethod
+    def record_ollama_metrics(final: dict, seconds: float):
+        """
+        Durée de l'appel HTTP et, si Ollama les fournit dans l'objet final,
+        durées prefill/decode et nombres de tokens (prompt_eval_*, eval_*).
+        """
+        metrics.observe_stage("ollama_http", seconds, backend="ollama")
+        if not isinstance(final, dict):
+            return
+        if final.get('prompt_eval_duration'):
+            metrics.observe_stage("prefill", final['prompt_eval_duration'] / 1e9, backend="ollama")
+        if final.get('eval_duration'):
+            metrics.observe_stage("decode", final['eval_duration'] / 1e9, backend="ollama")
+        eval_seconds = final['eval_duration'] / 1e9 if final.get('eval_duration') else seconds
+        metrics.record_tokens(final.get('prompt_eval_count'), final.get('eval_count'), eval_seconds, backend="ollama")
+    
+    @contextmanager
+    def ollama_stream(self, payload: dict, headers: dict):
+        """
+        Requête Ollama streamée vers une réplique choisie par le routeur.
+        
+        Une réplique injoignable (connexion, timeout, statut 5xx) est signalée
+        au routeur et la requête part vers une autre. Si toutes échouent, la
+        dernière erreur est levée, sauf si le modèle local peut prendre le
+        relais.
+        
+        Yields:
+            La réponse requests, ou None si toutes les répliques sont hors
+            service et que le modèle local est chargé
+        """
+        tried = []
+        last_error = None
+        while True:
+            replica = self.router.acquire(exclude=tried, panic=self.model is None)
+            if replica is None:
+                if last_error is not None and self.model is None:
+                    raise last_error
+                yield None
+                return
+            tried.append(replica.url)
+
+            start = time.perf_counter()
+            with ExitStack() as stack:
                 try:
-                    j = resp.json()
-                except Exception:
-                    text = resp.text
-                    # Ollama may stream NDJSON or return concatenated JSON objects.
-                    # Try to split into lines and parse each JSON object.
-                    responses = []
-                    parsed_any = False
-                    # Normalize separators '}{' -> '}\n{'
-                    normalized = text.replace('}{', '}\n{')
-                    for line in normalized.splitlines():
-                        line = line.strip()
-                        if not line:
-                            continue
-                        try:
-                            obj = json.loads(line)
-                            parsed_any = True
-                            # collect common fields
-                            if isinstance(obj, dict):
-                                if 'response' in obj and obj['response']:
-                                    responses.append(str(obj['response']))
-                                elif 'text' in obj and obj['text']:
-                                    responses.append(str(obj['text']))
-                                else:
-                                    # try to extract nested output list
-                                    out = obj.get('output') or obj.get('results')
-                                    if isinstance(out, list) and len(out) > 0:
-                                        first = out[0]
-                                        if isinstance(first, dict) and 'text' in first:
-                                            responses.append(str(first['text']))
-                                        elif isinstance(first, str):
-                                            responses.append(first)
-                        except Exception:
-                            # ignore lines that are not JSON
-                            continue
-
-                    if parsed_any and responses:
-                        # join pieces into a single response text and postprocess
-                        return postprocess_response(' '.join(responses).strip())
-
-                    # As a last resort try a simple regex-like extraction for "response":"..."
-                    try:
-                        import re
-                        matches = re.findall(r'"response"\s*:\s*"(.*?)"', text)
-                        if matches:
-                            return postprocess_response(' '.join(matches).strip())
-                    except Exception:
-                        pass
-
-                    # If nothing matched, return a shorter debug message (avoid huge dumps)
-                    snippet = text[:2000] + ('...' if len(text) > 2000 else '')
-                    return postprocess_response(f"Erreur Ollama: réponse non JSON (status {resp.status_code}). Raw (tronc): {snippet}")
-
-                # If we got valid JSON object, parse common shapes and postprocess
-                if isinstance(j, dict):
-                    if 'response' in j and j['response']:
-                        return postprocess_response(j['response'])
-                    if 'text' in j and j['text']:
-                        return postprocess_response(j['text'])
-                    # 2) output/results arrays
-                    out = j.get('output') or j.get('results') or j.get('result')
-                    if isinstance(out, list) and len(out) > 0:
-                        first = out[0]
-                        if isinstance(first, dict) and 'text' in first:
-                            return postprocess_response(first['text'])
-                        if isinstance(first, str):
-                            return postprocess_response(first)
-
-                # Fallback: serialize JSON briefly and postprocess
+                    resp = stack.enter_context(self.http.stream("POST", replica.url, json=payload, headers=headers))
+                    if resp.status_code >= 500:
+                        resp.raise_for_status()
+                except requests.RequestException as e:
+                    self.router.release(replica, ok=False)
+                    last_error = e
+                    continue
+
+                latency = time.perf_counter() - start
+                failed = False
                 try:
-                    short = json.dumps(j)
-                    return postprocess_response(short)
+                    yield resp
                 except Exception:
-                    return postprocess_response(str(j))
+                    failed = True
+                    raise
+                finally:
+                    self.router.release(replica, latency=latency, ok=not failed)
+                return
+    
+    def generate_response(self, prompt: str, max_tokens: int = 400, temperature: float = 0.7) -> str:
+        """
+        Génère une réponse du modèle.
+        
+        Les appels simultanés avec le même prompt et les mêmes paramètres
+        attendent une seule génération et partagent son résultat (compteur
+        `deduplicated` de /health).
+        """
+        if self.coalescing is None:
+            return self._generate_response(prompt, max_tokens, temperature)
+        key = self.response_cache_key(prompt, max_tokens, temperature)
+        response, _ = self.coalescing.do(key, lambda: self._generate_response(prompt, max_tokens, temperature))
+        return response
+    
+    def _generate_response(self, prompt: str, max_tokens: int = 400, temperature: float = 0.7) -> str:
+        """Génère une réponse du modèle (VERSION CORRIGÉE)"""
+        # Si on est en mode Ollama, déléguer la génération à l'API HTTP
+        if self.use_ollama:
+            metrics.current_backend.set("ollama")
+            try:
+                payload, headers = self.ollama_request(prompt, max_tokens, temperature)
+
+                # Réponse lue au fil de l'eau (NDJSON, objets concaténés ou
+                # JSON unique); la lecture s'arrête dès l'objet "done"
+                accumulator = NDJSONText()
+                start = time.perf_counter()
+                with self.ollama_stream(payload, headers) as resp:
+                    if resp is not None:
+                        for chunk in resp.iter_content(chunk_size=None):
+                            if accumulator.feed(chunk):
+                                break
+                        accumulator.close()
+                        status_code = resp.status_code
+
+                if resp is not None:
+                    self.record_ollama_metrics(accumulator.final, time.perf_counter() - start)
+                    result = self.ollama_result(accumulator.text, accumulator.others, accumulator.decoder, status_code, accumulator.error)
+                    if is_error_response(result):
+                        metrics.record_error("ollama_response")
+                    return result
+                # Toutes les répliques sont hors service: repli sur le modèle local
 
             except Exception as e:
+                metrics.record_error("ollama_request")
                 return postprocess_response(f"Erreur lors de la requête Ollama: {e}")
 
-        if self.model is None:
+        metrics.current_backend.set("local")
+        if self.model is None and not self.ensure_loaded():
+            metrics.record_error("model_not_loaded")
             return "Erreur: Le modèle n'est pas chargé."
         
         try:
-            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-            
-            # ✅ CORRECTION: Ajout de use_cache=False
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    **inputs,
+            if self.use_batch_scheduler:
+                # Les requêtes concurrentes sont regroupées en lots par le scheduler
+                response = self.get_scheduler().generate(prompt, max_new_tokens=max_tokens, temperature=temperature)
+            else:
+                # Cache KV activé + réutilisation du cache du préfixe système
+                response = self.get_engine().generate(
+                    prompt,
                     max_new_tokens=max_tokens,
                     temperature=temperature,
-                    top_p=0.9,
-                    top_k=50,
-                    repetition_penalty=1.1,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    use_cache=False,  # ✅ CORRECTION: Désactiver le cache
+                    prefix=self.SYSTEM_PREAMBLE,
                 )
-            
-            response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
 
-            if "<|assistant|>" in response:
-                response = response.split("<|assistant|>")[-1].strip()
-
-            return postprocess_response(response)
+            return self.local_result(response)
             
         except Exception as e:
+            metrics.record_error("generation")
             return f"Erreur lors de la génération: {str(e)}"
     
-    def generate_workout_plan(self, user_data: dict, profile: dict) -> dict:
-        """Génère un programme d'entraînement"""
-        message = f"Crée-moi un programme d'entraînement détaillé pour la semaine, adapté à mon niveau et mon objectif de {user_data.get('goal', 'fitness')}."
+    @staticmethod
+    def local_result(response: str) -> str:
+        """Texte final d'une génération locale (après la dernière balise assistant, nettoyé)"""
+        if "<|assistant|>" in response:
+            response = response.split("<|assistant|>")[-1].strip()
+        return postprocess_response(response)
+    
+    def response_cache_key(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        """Clé du cache de réponses pour le modèle courant"""
+        model = self.ollama_model_name if self.use_ollama else str(self.model_path)
+        return response_key(prompt, model, temperature, max_tokens)
+    
+    def generate_cached(self, prompt: str, max_tokens: int = 400, temperature: float = 0.7, use_cache: bool = True):
+        """
+        generate_response derrière le cache de réponses.
+        
+        La clé combine le prompt, le modèle, la température et max_tokens.
+        Les messages d'erreur ne sont jamais mis en cache.
+        
+        Returns:
+            Tuple (réponse, True si elle vient du cache)
+        """
+        if self.response_cache is None:
+            return self.generate_response(prompt, max_tokens=max_tokens, temperature=temperature), False
+        
+        if not use_cache:
+            self.response_cache.record_bypass()
+            return self.generate_response(prompt, max_tokens=max_tokens, temperature=temperature), False
+        
+        key = self.response_cache_key(prompt, max_tokens, temperature)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            return cached, True
+        
+        response = self.generate_response(prompt, max_tokens=max_tokens, temperature=temperature)
+        if not is_error_response(response):
+            self.response_cache.set(key, response)
+        return response, False
+    
+    def stream_response(self, prompt: str, max_tokens: int = 400, temperature: float = 0.7):
+        """
+        Génère une réponse token par token.
+        
+        En mode Ollama, les morceaux NDJSON sont transmis dès leur réception;
+        en local, un TextIteratorStreamer lit les tokens pendant que
+        model.generate tourne dans un thread. Le texte est nettoyé au fil de
+        l'eau par IncrementalNormalizer.
+        
+        Yields:
+            Morceaux de texte nettoyés
+        """
+        cleaner = IncrementalNormalizer()
+        
+        if self.use_ollama:
+            payload, headers = self.ollama_request(prompt, max_tokens, temperature, stream=True)
+            metrics.current_backend.set("ollama")
+            start = time.perf_counter()
+            
+            with self.ollama_stream(payload, headers) as resp:
+                if resp is None:
+                    # Toutes les répliques sont hors service: repli sur le modèle local
+                    yield from self._stream_local(prompt, max_tokens, temperature, cleaner)
+                    return
+                resp.raise_for_status()
+                decoder = NDJSONDecoder()
+                done = False
+                for chunk in resp.iter_content(chunk_size=None):
+                    for obj in decoder.feed(chunk):
+                        if not isinstance(obj, dict):
+                            continue
+                        if obj.get('error'):
+                            metrics.record_error("ollama_response")
+                            raise RuntimeError(f"Erreur Ollama: {obj['error']}")
+                        out = cleaner.feed(extract_text(obj))
+                        if out:
+                            yield out
+                        if obj.get('done'):
+                            self.record_ollama_metrics(obj, time.perf_counter() - start)
+                            done = True
+                            break
+                    if done:
+                        break
+            
+            out = cleaner.flush()
+            if out:
+                yield out
+            return
+        
+        yield from self._stream_local(prompt, max_tokens, temperature, cleaner)
+    
+    def _stream_local(self, prompt: str, max_tokens: int, temperature: float, cleaner: IncrementalNormalizer):
+        """Génération locale token par token (TextIteratorStreamer)"""
+        metrics.current_backend.set("local")
+        if self.model is None and not self.ensure_loaded():
+            raise RuntimeError("Le modèle n'est pas chargé.")
+        
+        from transformers import TextIteratorStreamer
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        
+        def _generate():
+            self.get_engine().generate(
+                prompt,
+                max_new_tokens=max_tokens,
+                temperature=temperature,
+                prefix=self.SYSTEM_PREAMBLE,
+                streamer=streamer,
+            )
+        
+        for text in stream_in_thread(streamer, _generate):
+            out = cleaner.feed(text)
+            if out:
+                yield out
+        
+        out = cleaner.flush()
+        if out:
+            yield out
+    
+    def workout_plan_message(self, user_data: dict) -> str:
+        """Message utilisateur pour la génération d'un programme d'entraînement"""
+        return f"Crée-moi un programme d'entraînement détaillé pour la semaine, adapté à mon niveau et mon objectif de {user_data.get('goal', 'fitness')}."
+    
+    def nutrition_plan_message(self, profile: dict) -> str:
+        """Message utilisateur pour la génération d'un plan nutritionnel"""
+        return f"Crée-moi un plan alimentaire détaillé pour une journée type, respectant mes macros de {profile['nutrition']['macros']['protein_g']}g protéines, {profile['nutrition']['macros']['carbs_g']}g glucides et {profile['nutrition']['macros']['fat_g']}g lipides."
+    
+    def generate_workout_plan(self, user_data: dict, profile: dict, use_cache: bool = True) -> dict:
+        """Génère un programme d'entraînement (servi par le cache de réponses si activé)"""
+        message = self.workout_plan_message(user_data)
         
         prompt = self.create_prompt(user_data, profile, message)
-        response = self.generate_response(prompt, max_tokens=500)
+        response, cached = self.generate_cached(prompt, max_tokens=500, use_cache=use_cache)
         
         return {
             "success": True,
             "workout_plan": response,
+            "cached": cached,
             "generated_at": datetime.now().isoformat()
         }
     
-    def generate_nutrition_plan(self, user_data: dict, profile: dict) -> dict:
-        """Génère un plan nutritionnel"""
-        message = f"Crée-moi un plan alimentaire détaillé pour une journée type, respectant mes macros de {profile['nutrition']['macros']['protein_g']}g protéines, {profile['nutrition']['macros']['carbs_g']}g glucides et {profile['nutrition']['macros']['fat_g']}g lipides."
+    def generate_nutrition_plan(self, user_data: dict, profile: dict, use_cache: bool = True) -> dict:
+        """Génère un plan nutritionnel (servi par le cache de réponses si activé)"""
+        message = self.nutrition_plan_message(profile)
         
         prompt = self.create_prompt(user_data, profile, message)
-        response = self.generate_response(prompt, max_tokens=500)
+        response, cached = self.generate_cached(prompt, max_tokens=500, use_cache=use_cache)
         
         return {
             "success": True,
             "nutrition_plan": response,
+            "cached": cached,
             "generated_at": datetime.now().isoformat()
         }
 
@@ -494,14 +984,85 @@ DONNÉES PHYSIOLOGIQUES:
 backend = FitBoxBackend()
 
 
+@app.before_request
+def _start_request_metrics():
+    """Route courante (modèle d'URL, ex. /conversation/<conversation_id>) pour les étiquettes des métriques"""
+    g.request_started = time.perf_counter()
+    metrics.current_route.set(request.url_rule.rule if request.url_rule else "unmatched")
+    metrics.current_backend.set("ollama" if backend.use_ollama else "local")
+
+
+@app.after_request
+def _record_request_metrics(response):
+    route = metrics.current_route.get()
+    metrics.REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    metrics.REQUEST_DURATION.observe(time.perf_counter() - g.request_started, route=route, method=request.method)
+    if response.status_code >= 500:
+        metrics.record_error("http_5xx")
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Métriques au format Prometheus (latences par étape, tokens, erreurs)"""
+    return Response(metrics.REGISTRY.render(), mimetype=None, content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/live', methods=['GET'])
+def liveness():
+    """Liveness: le processus répond (indépendant du modèle)"""
+    return jsonify(liveness_payload())
+
+
+@app.route('/ready', methods=['GET'])
+def readiness():
+    """Readiness: 200 une fois le modèle chargé et la chauffe terminée, 503 sinon"""
+    payload = readiness_payload()
+    return jsonify(payload), 200 if payload["ready"] else 503
+
+
+def liveness_payload() -> dict:
+    return {
+        "status": "alive",
+        "uptime_seconds": round(time.time() - backend.started_at, 1),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def readiness_payload() -> dict:
+    """Chargement et chauffe (partagé avec /health et le mode ASGI)"""
+    return {
+        "ready": backend.ready,
+        "load_state": backend.load_state,
+        "load_seconds": backend.load_seconds,
+        "warmup_state": backend.warmup_state,
+        "warmup_seconds": backend.warmup_seconds,
+        "warmup_error": backend.warmup_error,
+    }
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Vérification de l'état de l'API"""
-    return jsonify({
+    return jsonify(health_payload())
+
+
+def health_payload() -> dict:
+    """État du backend et statistiques (partagé avec le mode ASGI)"""
+    return {
         "status": "healthy",
+        **readiness_payload(),
         "model_loaded": backend.model is not None,
+        "http_pool": backend.http.stats() if backend.use_ollama else None,
+        "ollama_router": backend.router.stats() if backend.router else None,
+        "local_engine": backend.engine.stats() if backend.engine else None,
+        "scheduler": backend.scheduler.stats() if backend.scheduler else None,
+        "conversations": backend.conversations.stats(),
+        "profile_cache": backend.profile_cache.stats(),
+        "response_cache": backend.response_cache.stats() if backend.response_cache else None,
+        "coalescing": backend.coalescing.stats() if backend.coalescing else None,
         "timestamp": datetime.now().isoformat()
-    })
+    }
 
 
 @app.route('/calculate', methods=['POST'])
@@ -532,6 +1093,164 @@ def calculate_profile():
         }), 500
 
 
+def _cache_bypassed() -> bool:
+    """True si la requête demande à contourner le cache de réponses"""
+    return request.headers.get(CACHE_BYPASS_HEADER, '0') not in ('0', 'false', 'False', '')
+
+
+def _parse_batch_payload(data):
+    """
+    Normalise une requête de calcul en lot en colonnes.
+    
+    Accepte une liste de profils (`[{...}, ...]` ou `{"profiles": [...]}`)
+    ou un objet colonnaire (`{"columns": {"age": [...], ...}}` ou directement
+    `{"age": [...], ...}`).
+    
+    Returns:
+        Tuple (colonnes, erreurs_par_ligne, format) où erreurs_par_ligne associe
+        l'indice d'une ligne incomplète à son message et format vaut "rows"
+        ou "columns"
+        
+    Raises:
+        ValueError: Si la requête n'a aucune des formes acceptées
+    """
+    if isinstance(data, dict) and isinstance(data.get('profiles'), list):
+        data = data['profiles']
+    
+    if isinstance(data, list):
+        columns = {field: [] for field in BATCH_FIELDS}
+        row_errors = {}
+        for i, row in enumerate(data):
+            if not isinstance(row, dict):
+                row = {}
+            for field in BATCH_REQUIRED_FIELDS:
+                if field not in row and i not in row_errors:
+                    row_errors[i] = f"Champ manquant: {field}"
+            for field in BATCH_FIELDS:
+                value = row.get(field, BATCH_DEFAULTS.get(field))
+                columns[field].append(value if value is not None else "")
+        return columns, row_errors, "rows"
+    
+    if isinstance(data, dict):
+        source = data.get('columns', data)
+        if isinstance(source, dict):
+            for field in BATCH_REQUIRED_FIELDS:
+                if not isinstance(source.get(field), list):
+                    raise ValueError(f"Colonne manquante: {field}")
+            n = len(source['age'])
+            columns = {}
+            for field in BATCH_FIELDS:
+                values = source.get(field)
+                if values is None:
+                    values = [BATCH_DEFAULTS[field]] * n
+                if not isinstance(values, list) or len(values) != n:
+                    raise ValueError(f"La colonne {field} doit contenir {n} valeurs")
+                columns[field] = [v if v is not None else "" for v in values]
+            return columns, {}, "columns"
+    
+    raise ValueError("Format attendu: liste de profils ou objet colonnaire")
+
+
+def _batch_error_messages(result: dict, row_errors: dict) -> list:
+    """Message d'erreur par ligne (None si la ligne est valide)"""
+    messages = [None] * len(result['error_codes'])
+    for i in np.flatnonzero(result['error_mask']):
+        messages[i] = BatchErrorCode.from_code(int(result['error_codes'][i])).message
+    for i, message in row_errors.items():
+        messages[i] = message
+    return messages
+
+
+def _batch_output_column(result: dict, valid: np.ndarray, field: str, start: int, stop: int) -> list:
+    """Colonne de sortie pour les lignes [start:stop] (null pour les lignes invalides)"""
+    if field == 'bmi_category':
+        keys = np.array([c.key for c in BMICategory] + [None], dtype=object)
+        column = keys[result['bmi_category'][start:stop]]
+    else:
+        column = result[field][start:stop].astype(object)
+    column[~valid[start:stop]] = None
+    return column.tolist()
+
+
+def _iter_batch_rows(result: dict, messages: list, valid: np.ndarray):
+    """Produit la réponse JSON ligne par ligne, par morceaux de BATCH_STREAM_CHUNK"""
+    n = len(messages)
+    yield '{"success": true, "count": %d, "failed": %d, "results": [' % (n, int((~valid).sum()))
+    for start in range(0, n, BATCH_STREAM_CHUNK):
+        stop = min(start + BATCH_STREAM_CHUNK, n)
+        columns = {
+            field: _batch_output_column(result, valid, field, start, stop)
+            for field in BATCH_OUTPUT_FIELDS
+        }
+        items = []
+        for offset, i in enumerate(range(start, stop)):
+            if valid[i]:
+                row = {key: values[offset] for key, values in columns.items()}
+                items.append(json.dumps({"index": i, "success": True, "profile": row}))
+            else:
+                items.append(json.dumps({"index": i, "success": False, "error": messages[i]}, ensure_ascii=False))
+        yield (',' if start else '') + ','.join(items)
+    yield ']}'
+
+
+def _iter_batch_columns(result: dict, messages: list, valid: np.ndarray):
+    """Produit la réponse JSON colonnaire, une colonne à la fois, par morceaux"""
+    n = len(messages)
+    yield '{"success": true, "count": %d, "failed": %d, "columns": {' % (n, int((~valid).sum()))
+    for f_index, field in enumerate(['success', 'error'] + BATCH_OUTPUT_FIELDS):
+        yield ('' if f_index == 0 else ', ') + json.dumps(field) + ': ['
+        for start in range(0, n, BATCH_STREAM_CHUNK):
+            stop = min(start + BATCH_STREAM_CHUNK, n)
+            if field == 'success':
+                chunk = valid[start:stop].tolist()
+            elif field == 'error':
+                chunk = messages[start:stop]
+            else:
+                chunk = _batch_output_column(result, valid, field, start, stop)
+            yield (',' if start else '') + json.dumps(chunk, ensure_ascii=False)[1:-1]
+        yield ']'
+    yield '}}'
+
+
+@app.route('/calculate_batch', methods=['POST'])
+def calculate_batch():
+    """Route pour calculer les profils d'un lot d'utilisateurs en une passe"""
+    try:
+        data = request.get_json(silent=True)
+        
+        try:
+            columns, row_errors, output_format = _parse_batch_payload(data)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        n = len(columns['age'])
+        if n > BATCH_MAX_ROWS:
+            return jsonify({
+                "success": False,
+                "error": f"Lot trop volumineux: {n} lignes (max {BATCH_MAX_ROWS})"
+            }), 413
+        
+        result = backend.calculate_profiles_batch(columns)
+        messages = _batch_error_messages(result, row_errors)
+        valid = np.array([m is None for m in messages], dtype=bool)
+        
+        iter_body = _iter_batch_rows if output_format == "rows" else _iter_batch_columns
+        body = iter_body(result, messages, valid)
+        
+        if n > BATCH_STREAM_THRESHOLD:
+            return Response(stream_with_context(body), mimetype='application/json'), 200
+        return Response(''.join(body), mimetype='application/json'), 200
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
 @app.route('/generate_workout', methods=['POST'])
 def generate_workout():
     """Route pour générer un programme d'entraînement"""
@@ -543,7 +1262,9 @@ def generate_workout():
         if not profile_result["success"]:
             return jsonify(profile_result), 400
         
-        workout_plan = backend.generate_workout_plan(data, profile_result["profile"])
+        workout_plan = backend.generate_workout_plan(
+            data, profile_result["profile"], use_cache=not _cache_bypassed()
+        )
         workout_plan["profile"] = profile_result["profile"]
         
         return jsonify(workout_plan), 200
@@ -566,7 +1287,9 @@ def generate_nutrition():
         if not profile_result["success"]:
             return jsonify(profile_result), 400
         
-        nutrition_plan = backend.generate_nutrition_plan(data, profile_result["profile"])
+        nutrition_plan = backend.generate_nutrition_plan(
+            data, profile_result["profile"], use_cache=not _cache_bypassed()
+        )
         nutrition_plan["profile"] = profile_result["profile"]
         
         return jsonify(nutrition_plan), 200
@@ -586,8 +1309,8 @@ def chat():
         
         user_data = data.get('user_data')
         message = data.get('message')
+        history = backend.conversation_history(data.get('conversation_id'), data.get('history'))
         conversation_id = data.get('conversation_id', 'default')
-        history = data.get('history', [])
         
         if not user_data or not message:
             return jsonify({
@@ -602,13 +1325,10 @@ def chat():
         
         profile = profile_result["profile"]
         
-        prompt = backend.create_prompt(user_data, profile, message, history)
+        prompt, prompt_report = backend.build_prompt(user_data, profile, message, history)
         response = backend.generate_response(prompt)
         
-        if conversation_id not in backend.conversations:
-            backend.conversations[conversation_id] = []
-        
-        backend.conversations[conversation_id].append({
+        backend.conversations.append(conversation_id, {
             "user": message,
             "assistant": response,
             "timestamp": datetime.now().isoformat()
@@ -618,6 +1338,7 @@ def chat():
             "success": True,
             "response": response,
             "conversation_id": conversation_id,
+            "prompt_tokens": prompt_report["prompt_tokens"],
             "timestamp": datetime.now().isoformat()
         }), 200
         
@@ -628,14 +1349,153 @@ def chat():
         }), 500
 
 
+def _sse_event(data: dict, event: str = None) -> str:
+    """Formate un événement Server-Sent Events"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _sse_response(events) -> Response:
+    """Réponse text/event-stream non bufferisée"""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def _stream_generation(prompt: str, max_tokens: int, result_key: str, extra: dict = None, on_complete=None):
+    """
+    Transmet les tokens générés sous forme d'événements SSE.
+    
+    Chaque morceau est envoyé en `data: {"token": ...}`; l'événement final
+    `done` contient le texte complet sous result_key (et extra), un incident
+    produit un événement `error`.
+    """
+    pieces = []
+    try:
+        for piece in backend.stream_response(prompt, max_tokens=max_tokens):
+            pieces.append(piece)
+            yield _sse_event({"token": piece})
+    except Exception as e:
+        yield _sse_event({"success": False, "error": str(e)}, event="error")
+        return
+    
+    response = ''.join(pieces)
+    if on_complete:
+        on_complete(response)
+    done = {"success": True, result_key: response, "generated_at": datetime.now().isoformat()}
+    done.update(extra or {})
+    yield _sse_event(done, event="done")
+
+
+def _json_object() -> dict:
+    """Corps JSON de la requête s'il s'agit d'un objet, sinon {} (absent, invalide, tableau...)"""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else {}
+
+
+def _plan_stream(message_for, result_key: str):
+    """Variante SSE d'une génération de plan (message construit par message_for(data, profile))"""
+    try:
+        data = _json_object()
+        
+        profile_result = backend.calculate_profile(data)
+        if not profile_result["success"]:
+            return jsonify(profile_result), 400
+        
+        profile = profile_result["profile"]
+        prompt = backend.create_prompt(data, profile, message_for(data, profile))
+        return _sse_response(_stream_generation(prompt, 500, result_key, {"profile": profile}))
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/generate_workout/stream', methods=['POST'])
+def generate_workout_stream():
+    """Variante SSE de /generate_workout"""
+    return _plan_stream(lambda data, profile: backend.workout_plan_message(data), "workout_plan")
+
+
+@app.route('/generate_nutrition/stream', methods=['POST'])
+def generate_nutrition_stream():
+    """Variante SSE de /generate_nutrition"""
+    return _plan_stream(lambda data, profile: backend.nutrition_plan_message(profile), "nutrition_plan")
+
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Variante SSE de /chat"""
+    try:
+        data = _json_object()
+        
+        user_data = data.get('user_data')
+        message = data.get('message')
+        conversation_id = data.get('conversation_id', 'default')
+        
+        if not isinstance(user_data, dict) or not user_data or not message:
+            return jsonify({
+                "success": False,
+                "error": "user_data et message sont requis"
+            }), 400
+        
+        history = backend.conversation_history(data.get('conversation_id'), data.get('history'))
+        
+        profile_result = backend.calculate_profile(user_data)
+        if not profile_result["success"]:
+            return jsonify(profile_result), 400
+        
+        prompt, prompt_report = backend.build_prompt(user_data, profile_result["profile"], message, history)
+        
+        def _save(response):
+            backend.conversations.append(conversation_id, {
+                "user": message,
+                "assistant": response,
+                "timestamp": datetime.now().isoformat()
+            })
+        
+        return _sse_response(_stream_generation(
+            prompt, 400, "response",
+            {"conversation_id": conversation_id, "prompt_tokens": prompt_report["prompt_tokens"]},
+            on_complete=_save
+        ))
+        
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
 @app.route('/conversation/<conversation_id>', methods=['GET'])
 def get_conversation(conversation_id):
-    """Récupère l'historique d'une conversation"""
-    if conversation_id in backend.conversations:
+    """
+    Récupère l'historique d'une conversation, page par page.
+
+    Paramètres: ?offset=0&limit=50 (du plus ancien au plus récent)
+    """
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(CONVERSATION_MAX_PAGE, max(1, int(request.args.get('limit', CONVERSATION_PAGE_SIZE))))
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "offset et limit doivent être des entiers"
+        }), 400
+
+    history = backend.conversations.get(conversation_id, offset=offset, limit=limit)
+    if history is not None:
         return jsonify({
             "success": True,
             "conversation_id": conversation_id,
-            "history": backend.conversations[conversation_id]
+            "history": history,
+            "total": backend.conversations.count(conversation_id),
+            "offset": offset,
+            "limit": limit
         }), 200
     else:
         return jsonify({
@@ -680,16 +1540,25 @@ def initialize_app():
     print("🏋️  FITBOX - BACKEND API (VERSION CORRIGÉE)")
     print("="*60)
     
-    success = backend.load_model()
+    # Chargement en arrière-plan (FITBOX_BACKGROUND_LOAD=1): le serveur
+    # démarre tout de suite, /health indique quand il est prêt
+    if os.environ.get('FITBOX_BACKGROUND_LOAD', '0') not in ('0', 'false', 'False', ''):
+        backend.start_background_load()
+        print("\n⏳ Chargement et chauffe du modèle en arrière-plan (voir /ready)")
+        success = True
+    else:
+        success = backend.boot()
     
     if success:
         print("\n✅ Backend initialisé avec succès!")
         print("\n📡 Endpoints disponibles:")
-        print("   GET  /health")
+        print("   GET  /health, /ready, /live, /metrics")
         print("   POST /calculate")
+        print("   POST /calculate_batch")
         print("   POST /generate_workout")
         print("   POST /generate_nutrition")
         print("   POST /chat")
+        print("   POST /chat/stream, /generate_workout/stream, /generate_nutrition/stream (SSE)")
         print("   GET  /conversation/<id>")
         print("   GET  /activity_levels")
         print("   GET  /goals")
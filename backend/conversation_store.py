@@ -0,0 +1,292 @@
+"""
+Stockage des conversations du chat.
+
+Deux implémentations interchangeables:
+- InMemoryConversationStore: mémoire du processus, bornée (LRU + TTL)
+- SQLiteConversationStore: fichier SQLite en mode WAL, partagé entre
+  plusieurs workers (gunicorn) et conservé après redémarrage
+
+Dans les deux cas le nombre de messages par conversation est plafonné
+(les plus anciens sont supprimés) et l'ajout d'un message est en O(1).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import List, Optional
+
+
+class ConversationStore:
+    """Interface commune des stockages de conversations"""
+
+    def append(self, conversation_id: str, entry: dict) -> None:
+        """Ajoute un échange {"user", "assistant", "timestamp"} à la conversation"""
+        raise NotImplementedError
+
+    def get(self, conversation_id: str, offset: int = 0, limit: Optional[int] = None) -> Optional[List[dict]]:
+        """
+        Lit une page de la conversation, du plus ancien au plus récent.
+
+        Returns:
+            Liste des échanges, ou None si la conversation n'existe pas
+        """
+        raise NotImplementedError
+
+    def count(self, conversation_id: str) -> int:
+        """Nombre d'échanges conservés (0 si la conversation n'existe pas)"""
+        raise NotImplementedError
+
+    def recent(self, conversation_id: str, n: int) -> List[dict]:
+        """Les n derniers échanges de la conversation"""
+        total = self.count(conversation_id)
+        return self.get(conversation_id, offset=max(0, total - n), limit=n) or []
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return self.count(conversation_id) > 0
+
+    def stats(self) -> dict:
+        """Statistiques du stockage"""
+        raise NotImplementedError
+
+
+class InMemoryConversationStore(ConversationStore):
+    """
+    Stockage en mémoire borné.
+
+    Les conversations sont rangées par ordre d'accès (LRU): au-delà de
+    max_conversations la moins récemment utilisée est évincée, et une
+    conversation inactive depuis plus de ttl_seconds expire.
+    """
+
+    def __init__(self, max_conversations: int = 10000, max_messages: int = 100, ttl_seconds: Optional[float] = 7 * 86400):
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+
+        self._conversations: "OrderedDict[str, deque]" = OrderedDict()
+        self._last_access = {}
+        self._lock = threading.Lock()
+        self._evicted = 0
+        self._expired = 0
+
+    def _expire(self, now: float):
+        """Supprime les conversations expirées (en tête de l'ordre LRU)"""
+        if not self.ttl_seconds:
+            return
+        while self._conversations:
+            oldest = next(iter(self._conversations))
+            if now - self._last_access[oldest] <= self.ttl_seconds:
+                break
+            del self._conversations[oldest]
+            del self._last_access[oldest]
+            self._expired += 1
+
+    def _touch(self, conversation_id: str, now: float):
+        self._conversations.move_to_end(conversation_id)
+        self._last_access[conversation_id] = now
+
+    def append(self, conversation_id: str, entry: dict) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            messages = self._conversations.get(conversation_id)
+            if messages is None:
+                messages = deque(maxlen=self.max_messages)
+                self._conversations[conversation_id] = messages
+            messages.append(entry)
+            self._touch(conversation_id, now)
+
+            while len(self._conversations) > self.max_conversations:
+                evicted, _ = self._conversations.popitem(last=False)
+                del self._last_access[evicted]
+                self._evicted += 1
+
+    def get(self, conversation_id: str, offset: int = 0, limit: Optional[int] = None) -> Optional[List[dict]]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            messages = self._conversations.get(conversation_id)
+            if messages is None:
+                return None
+            self._touch(conversation_id, now)
+            stop = len(messages) if limit is None else min(len(messages), offset + limit)
+            return [messages[i] for i in range(offset, stop)]
+
+    def count(self, conversation_id: str) -> int:
+        with self._lock:
+            self._expire(time.monotonic())
+            messages = self._conversations.get(conversation_id)
+            return len(messages) if messages is not None else 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "conversations": len(self._conversations),
+                "max_conversations": self.max_conversations,
+                "max_messages": self.max_messages,
+                "evicted": self._evicted,
+                "expired": self._expired,
+            }
+
+
+class SQLiteConversationStore(ConversationStore):
+    """
+    Stockage SQLite (mode WAL) partageable entre processus.
+
+    Chaque message reçoit un numéro de séquence croissant par conversation;
+    le plafond max_messages est appliqué en supprimant les séquences trop
+    anciennes, via la clé primaire (conversation_id, seq).
+    """
+
+    # Fréquence (en nombre d'ajouts) de la purge des conversations expirées
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str, max_messages: int = 100, ttl_seconds: Optional[float] = 7 * 86400):
+        self.path = str(path)
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._appends = 0
+        self._appends_lock = threading.Lock()
+
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                " conversation_id TEXT PRIMARY KEY,"
+                " next_seq INTEGER NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " conversation_id TEXT NOT NULL,"
+                " seq INTEGER NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " PRIMARY KEY (conversation_id, seq)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations(updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connexion propre au thread courant"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, conversation_id: str, entry: dict) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO conversations (conversation_id, next_seq, updated_at) VALUES (?, 1, ?)"
+                " ON CONFLICT(conversation_id) DO UPDATE SET"
+                " next_seq = next_seq + 1, updated_at = excluded.updated_at",
+                (conversation_id, time.time())
+            )
+            (next_seq,) = conn.execute(
+                "SELECT next_seq FROM conversations WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+            seq = next_seq - 1
+            conn.execute(
+                "INSERT INTO messages (conversation_id, seq, payload) VALUES (?, ?, ?)",
+                (conversation_id, seq, json.dumps(entry, ensure_ascii=False))
+            )
+            if seq >= self.max_messages:
+                conn.execute(
+                    "DELETE FROM messages WHERE conversation_id = ? AND seq <= ?",
+                    (conversation_id, seq - self.max_messages)
+                )
+
+        with self._appends_lock:
+            self._appends += 1
+            purge = self._appends % self.PURGE_EVERY == 0
+        if purge:
+            self.purge_expired()
+
+    def _first_seq(self, conn: sqlite3.Connection, conversation_id: str) -> Optional[int]:
+        row = conn.execute(
+            "SELECT next_seq FROM conversations WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return max(0, row[0] - self.max_messages)
+
+    def get(self, conversation_id: str, offset: int = 0, limit: Optional[int] = None) -> Optional[List[dict]]:
+        conn = self._connection()
+        first = self._first_seq(conn, conversation_id)
+        if first is None:
+            return None
+        start = first + offset
+        rows = conn.execute(
+            "SELECT payload FROM messages WHERE conversation_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+            (conversation_id, start, -1 if limit is None else limit)
+        ).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def count(self, conversation_id: str) -> int:
+        row = self._connection().execute(
+            "SELECT next_seq FROM conversations WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        return min(row[0], self.max_messages) if row else 0
+
+    def purge_expired(self) -> int:
+        """Supprime les conversations inactives depuis plus de ttl_seconds"""
+        if not self.ttl_seconds:
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM messages WHERE conversation_id IN"
+                " (SELECT conversation_id FROM conversations WHERE updated_at < ?)",
+                (cutoff,)
+            )
+            cursor = conn.execute("DELETE FROM conversations WHERE updated_at < ?", (cutoff,))
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        (conversations,) = self._connection().execute("SELECT COUNT(*) FROM conversations").fetchone()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "conversations": conversations,
+            "max_messages": self.max_messages,
+        }
+
+
+def create_conversation_store() -> ConversationStore:
+    """
+    Construit le stockage selon l'environnement.
+
+    FITBOX_CONVERSATION_STORE: "memory" (défaut) ou "sqlite"
+    FITBOX_CONVERSATION_DB: chemin du fichier SQLite
+    FITBOX_MAX_MESSAGES: messages conservés par conversation
+    FITBOX_MAX_CONVERSATIONS: conversations conservées en mémoire
+    FITBOX_CONVERSATION_TTL: durée de vie d'une conversation inactive (s, 0 = illimitée)
+    """
+    kind = os.environ.get('FITBOX_CONVERSATION_STORE', 'memory').lower()
+    max_messages = int(os.environ.get('FITBOX_MAX_MESSAGES', '100'))
+    ttl = float(os.environ.get('FITBOX_CONVERSATION_TTL', str(7 * 86400))) or None
+
+    if kind == 'sqlite':
+        default_path = Path(__file__).resolve().parent.parent / "data" / "conversations.db"
+        return SQLiteConversationStore(
+            os.environ.get('FITBOX_CONVERSATION_DB', str(default_path)),
+            max_messages=max_messages,
+            ttl_seconds=ttl
+        )
+
+    return InMemoryConversationStore(
+        max_conversations=int(os.environ.get('FITBOX_MAX_CONVERSATIONS', '10000')),
+        max_messages=max_messages,
+        ttl_seconds=ttl
+    )
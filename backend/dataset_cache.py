@@ -0,0 +1,102 @@
+"""
+Cache disque des datasets d'entraînement, adressé par contenu.
+
+Chaque entrée est un dataset Arrow (save_to_disk) rangé sous une empreinte
+SHA-256 de tout ce qui détermine son contenu: octets du CSV, code source du
+rendu des exemples, vocabulaire du tokenizer, max_length et mode. Une
+modification de l'une de ces entrées change l'empreinte: l'ancienne entrée
+n'est simplement plus lue. load_from_disk mappe les fichiers Arrow en
+mémoire, une relance repart donc directement sur l'entraînement.
+
+Entrées: <cache_dir>/<kind>-<empreinte>/ (dataset + fitbox_cache.json)
+"""
+
+import hashlib
+import inspect
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+META_FILE = "fitbox_cache.json"
+_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 du contenu d'un fichier, lu par blocs de 1 Mo"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_digest(*objects: Any) -> str:
+    """SHA-256 du code source de modules, classes ou fonctions"""
+    digest = hashlib.sha256()
+    for obj in objects:
+        digest.update(inspect.getsource(obj).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def tokenizer_digest(tokenizer) -> str:
+    """SHA-256 du vocabulaire et des tokens spéciaux d'un tokenizer"""
+    state = {
+        "class": type(tokenizer).__name__,
+        "vocab": sorted(tokenizer.get_vocab().items()),
+        "special_tokens": getattr(tokenizer, "special_tokens_map", {}),
+        "eos_token_id": tokenizer.eos_token_id,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    return hashlib.sha256(json.dumps(state, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def fingerprint(**parts: Any) -> str:
+    """Empreinte d'un ensemble de paramètres (ordre des clés indifférent)"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class DatasetCache:
+    """
+    Datasets Arrow sur disque indexés par empreinte.
+
+    Les écritures passent par un dossier temporaire renommé à la fin: une
+    exécution interrompue ne laisse pas d'entrée incomplète.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+
+    def path(self, kind: str, key: str) -> Path:
+        return self.cache_dir / f"{kind}-{key[:24]}"
+
+    def load(self, kind: str, key: str) -> Optional[Tuple[Any, dict]]:
+        """
+        Dataset en cache (mappé en mémoire) et ses métadonnées.
+
+        Returns:
+            (dataset, metadata) ou None si l'entrée n'existe pas
+        """
+        from datasets import load_from_disk
+
+        path = self.path(kind, key)
+        meta_path = path / META_FILE
+        if not meta_path.exists():
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            metadata = json.load(f)
+        if metadata.get("key") != key:
+            return None
+        return load_from_disk(str(path)), metadata
+
+    def save(self, kind: str, key: str, dataset, metadata: Optional[dict] = None) -> Path:
+        """Écrit le dataset en Arrow avec ses métadonnées"""
+        path = self.path(kind, key)
+        tmp_path = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        dataset.save_to_disk(str(tmp_path))
+        with open(tmp_path / META_FILE, "w", encoding="utf-8") as f:
+            json.dump({"key": key, **(metadata or {})}, f, indent=2, ensure_ascii=False)
+        shutil.rmtree(path, ignore_errors=True)
+        tmp_path.rename(path)
+        return path
@@ -5,6 +5,7 @@ from transformers import (
     AutoTokenizer,
     TrainingArguments,
     Trainer,
+    TrainerCallback,
     BitsAndBytesConfig,
     DataCollatorForLanguageModeling
 )
@@ -14,12 +15,30 @@ from peft import (
     prepare_model_for_kbit_training,
     PeftModel
 )
-from datasets import Dataset
+from datasets import Dataset, IterableDataset, load_dataset
 import pandas as pd
 import json
+import math
 from pathlib import Path
 from datetime import datetime
+from backend import physiological_calculator, sequence_packing, training_data
+from backend.training_checkpoints import find_resume_checkpoint, mark_checkpoint, new_run_id, remove_run_checkpoints, set_aside_checkpoints
+from backend.dataset_cache import DatasetCache, file_digest, fingerprint, source_digest, tokenizer_digest
 from backend.physiological_calculator import PhysiologicalCalculator
+from backend.sequence_packing import DynamicPaddingCollator, format_padding_report, pack_sequences, padding_report
+from backend.training_data import format_examples, generate_examples, iter_examples, write_training_shards
+
+
+class RunMarkerCallback(TrainerCallback):
+    """Écrit le run_id de l'exécution dans chaque checkpoint sauvegardé"""
+    
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+    
+    def on_save(self, args, state, control, **kwargs):
+        checkpoint = Path(args.output_dir) / f"checkpoint-{state.global_step}"
+        if state.is_world_process_zero and checkpoint.is_dir():
+            mark_checkpoint(checkpoint, self.run_id)
 
 
 class FitBoxFineTuner:
@@ -28,15 +47,23 @@ class FitBoxFineTuner:
     def __init__(
         self,
         model_name: str = "meta-llama/Llama-2-7b-hf",  # Llama 3.2 ou Llama 2 - QLoRA friendly
-        output_dir: str = "models/fitbox_model"
+        output_dir: str = "models/fitbox_model",
+        cache_dir: str = "data/cache"
     ):
        
         self.model_name = model_name
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         
+        # Cache des datasets générés et tokenisés (None: désactivé)
+        self.cache = DatasetCache(cache_dir) if cache_dir else None
+        self.data_fingerprint = None
+        
         self.model = None
         self.tokenizer = None
+        self.sequence_mode = "max_length"
+        self.padding_report = None
+        self.run_id = None
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         
         print(f"🖥️  Device: {self.device}")
@@ -44,67 +71,106 @@ class FitBoxFineTuner:
     def prepare_training_data(
         self,
         csv_path: str = "data/fitness_data_cleaned.csv",
-        max_samples: int = None
+        max_samples: int = None,
+        num_workers: int = None,
+        chunk_rows: int = 10000,
+        shard_dir: str = None
     ) -> Dataset:
+        """
+        Génère les exemples d'entraînement (3 par profil) à partir du CSV.
         
-        print("\n📊 Préparation des données d'entraînement...")
-        
-        # Charger le CSV
-        df = pd.read_csv(csv_path)
-        if max_samples:
-            df = df.sample(n=min(max_samples, len(df)), random_state=42)
-        
-        print(f"✅ {len(df)} échantillons chargés")
+        Les profils sont calculés en colonnes et les textes rendus en
+        parallèle (voir backend/training_data.py). Avec shard_dir, les
+        exemples sont écrits en shards JSONL au fil de l'eau puis chargés
+        par `datasets` (mappés sur disque) au lieu d'être gardés en mémoire.
         
-        # Calculateur physiologique
-        calc = PhysiologicalCalculator()
+        Le résultat est mis en cache (cache_dir) sous une empreinte du CSV,
+        du code de rendu et de max_samples, conservée dans data_fingerprint
+        pour le cache de tokenize_dataset.
         
-        # Créer les exemples d'entraînement
-        training_examples = []
+        Args:
+            csv_path: CSV des profils
+            max_samples: Taille d'un échantillon aléatoire (random_state=42)
+            num_workers: Processus de rendu (None: nombre de CPU)
+            chunk_rows: Lignes du CSV traitées par bloc
+            shard_dir: Dossier des shards JSONL (optionnel)
+        """
+        print("\n📊 Préparation des données d'entraînement...")
+        self.data_fingerprint = fingerprint(
+            csv=file_digest(csv_path),
+            renderer=source_digest(training_data, physiological_calculator),
+            max_samples=max_samples,
+        )
+        if self.cache:
+            cached = self.cache.load("texts", self.data_fingerprint)
+            if cached:
+                dataset, _ = cached
+                print(f"♻️  {len(dataset)} exemples chargés depuis le cache ({self.cache.path('texts', self.data_fingerprint)})")
+                return dataset
         
         print("🔄 Génération des prompts et réponses...")
+        dataset = self._generate_training_data(csv_path, max_samples, num_workers, chunk_rows, shard_dir)
+        if self.cache:
+            self.cache.save("texts", self.data_fingerprint, dataset, {"csv_path": str(csv_path)})
+        return dataset
+    
+    def _generate_training_data(self, csv_path, max_samples, num_workers, chunk_rows, shard_dir) -> Dataset:
+        """Génère les exemples (voir prepare_training_data)"""
+        if shard_dir:
+            shards = write_training_shards(
+                csv_path, shard_dir, max_samples=max_samples,
+                chunk_rows=chunk_rows, num_workers=num_workers
+            )
+            return load_dataset("json", data_files=[str(p) for p in shards], split="train")
         
-        for idx, row in df.iterrows():
-            try:
-                # Convertir le genre en string (0 -> male, 1 -> female)
-                gender_val = row['Gender']
-                gender = "female" if int(gender_val) == 1 else "male"
-                
-                # Convertir Workout_Type float en string
-                workout_type_str = self._map_workout_type(row['Workout_Type'])
-                
-                # Calculer le profil physiologique
-                profile = calc.calculate_complete_profile(
-                    age=int(row['Age']),
-                    gender=gender,
-                    weight=float(row['Weight (kg)']),
-                    height=float(row['Height (m)']),
-                    activity_level=self._map_activity_level(
-                        row['Workout_Frequency (days/week)']
-                    ),
-                    goal=self._map_goal(workout_type_str)
-                )
-                
-                # Créer différents types d'exemples (passer le type d'entraînement converti)
-                examples = self._create_training_examples(row, profile, workout_type_str)
-                training_examples.extend(examples)
-                
-                if (idx + 1) % 100 == 0:
-                    print(f"   Traité: {idx + 1}/{len(df)}")
-                    
-            except Exception as e:
-                print(f"⚠️  Erreur ligne {idx}: {e}")
-                continue
-        
-        print(f"✅ {len(training_examples)} exemples d'entraînement créés")
+        texts = []
+        for chunk in generate_examples(csv_path, max_samples, chunk_rows, num_workers):
+            texts.extend(chunk)
+            print(f"   Exemples générés: {len(texts)}")
+        
+        print(f"✅ {len(texts)} exemples d'entraînement créés")
         
         # Convertir en Dataset Hugging Face
         dataset = Dataset.from_dict({
-            "text": [ex["text"] for ex in training_examples]
+            "text": texts
         })
         
         return dataset
     
+    def prepare_streaming_dataset(
+        self,
+        data_path: str = "data/fitness_data_cleaned.csv",
+        chunk_rows: int = 10000,
+        num_workers: int = None,
+        shuffle_buffer: int = 10000,
+        seed: int = 42
+    ) -> IterableDataset:
+        """
+        Exemples d'entraînement en streaming, pour les corpus plus gros que la RAM.
+        
+        Le CSV (ou Parquet) est lu par blocs et les exemples produits à la
+        demande: rien n'est matérialisé. Le mélange se fait dans un tampon
+        borné (shuffle_buffer exemples, re-mélangé à chaque époque) et la
+        tokenization à la volée (tokenize_dataset). train() demande alors
+        max_steps, la taille du corpus n'étant pas connue à l'avance.
+        
+        Args:
+            data_path: CSV ou fichier .parquet des profils
+            chunk_rows: Lignes lues par bloc
+            num_workers: Processus de rendu des textes (None: nombre de CPU)
+            shuffle_buffer: Taille du tampon de mélange (0: pas de mélange)
+            seed: Graine du mélange
+        """
+        print(f"\n📊 Données d'entraînement en streaming: {data_path}")
+        dataset = IterableDataset.from_generator(
+            iter_examples,
+            gen_kwargs={"path": data_path, "chunk_rows": chunk_rows, "num_workers": num_workers}
+        )
+        if shuffle_buffer:
+            dataset = dataset.shuffle(seed=seed, buffer_size=shuffle_buffer)
+            print(f"   🔀 Mélange dans un tampon de {shuffle_buffer} exemples")
+        return dataset
+    
     def _map_workout_type(self, workout_value: float) -> str:
         """Mappe les valeurs numériques de Workout_Type aux labels string"""
         # Les valeurs vont de 0.0 à 1.0, mappées à différents types
@@ -155,125 +221,15 @@ class FitBoxFineTuner:
         Returns:
             Liste d'exemples formatés
         """
-        examples = []
-        
-        # Gérer le genre (peut être int ou str)
-        gender = row['Gender']
-        if isinstance(gender, (int, float)):
-            gender_str = "Male" if int(gender) == 0 else "Female"
-        else:
-            gender_str = str(gender).capitalize()
-        
-        user_info = f"""Âge: {row['Age']} ans
-Genre: {gender_str}
-Poids: {row['Weight (kg)']} kg
-Taille: {row['Height (m)']} m
-IMC: {profile['bmi']['bmi']}
-Niveau: {'Débutant' if row['Experience_Level'] == 1 else 'Intermédiaire' if row['Experience_Level'] == 2 else 'Avancé'}"""
-        
-        # Exemple 1: Programme d'entraînement
-        workout_prompt = f"""<|system|>
-Tu es FitBox, un coach sportif expert. Fournis des programmes personnalisés.<|end|>
-<|user|>
-{user_info}
-
-Crée-moi un programme d'entraînement {workout_type_str} pour cette semaine.<|end|>
-<|assistant|>
-Voici ton programme {workout_type_str} personnalisé pour la semaine:
-
-📅 PROGRAMME HEBDOMADAIRE ({row['Workout_Frequency (days/week)']} séances):
-
-Séance 1-3: {workout_type_str}
-- Durée: {row['Session_Duration (hours)']:.1f}h par séance
-- Intensité: {'Modérée' if row['Experience_Level'] <= 2 else 'Élevée'}
-- Calories estimées: {row['Calories_Burned']:.0f} cal/séance
-
-💡 CONSEILS:
-- Hydratation: {row['Water_Intake (liters)']:.1f}L par jour minimum
-- Échauffement: 10 minutes avant chaque séance
-- Récupération: 48h entre séances intenses
-- Progression: {'Commence doucement, concentre-toi sur la technique' if row['Experience_Level'] == 1 else 'Augmente progressivement l intensité' if row['Experience_Level'] == 2 else 'Challenge-toi avec des variantes avancées'}
-
-🎯 OBJECTIF:
-Avec une fréquence cardiaque moyenne de {row['Avg_BPM']} BPM et un pourcentage de masse grasse de {row['Fat_Percentage']:.1f}%, tu es sur la bonne voie!<|end|>"""
-        
-        examples.append({"text": workout_prompt})
-        
-        # Exemple 2: Plan nutritionnel
-        nutrition_prompt = f"""<|system|>
-Tu es FitBox, un nutritionniste expert. Fournis des plans alimentaires personnalisés.<|end|>
-<|user|>
-{user_info}
-Type d'entraînement: {workout_type_str}
-Calories cibles: {profile['nutrition']['target_calories']:.0f} cal/jour
-Protéines: {profile['nutrition']['macros']['protein_g']:.0f}g
-Glucides: {profile['nutrition']['macros']['carbs_g']:.0f}g
-Lipides: {profile['nutrition']['macros']['fat_g']:.0f}g
-
-Donne-moi un plan alimentaire pour une journée.<|end|>
-<|assistant|>
-Voici ton plan nutritionnel pour atteindre tes objectifs:
-
-🍳 PETIT-DÉJEUNER (25% - {profile['nutrition']['target_calories'] * 0.25:.0f} cal):
-- Protéines: {profile['nutrition']['macros']['protein_g'] * 0.25:.0f}g
-- Glucides: {profile['nutrition']['macros']['carbs_g'] * 0.25:.0f}g
-- Lipides: {profile['nutrition']['macros']['fat_g'] * 0.25:.0f}g
-
-Exemple: Omelette 3 œufs, flocons d'avoine, fruits
-
-🥗 DÉJEUNER (35% - {profile['nutrition']['target_calories'] * 0.35:.0f} cal):
-- Protéines: {profile['nutrition']['macros']['protein_g'] * 0.35:.0f}g
-- Glucides: {profile['nutrition']['macros']['carbs_g'] * 0.35:.0f}g
-- Lipides: {profile['nutrition']['macros']['fat_g'] * 0.35:.0f}g
-
-Exemple: Poulet grillé 200g, riz complet, légumes
-
-🍽️ DÎNER (30% - {profile['nutrition']['target_calories'] * 0.30:.0f} cal):
-- Protéines: {profile['nutrition']['macros']['protein_g'] * 0.30:.0f}g
-- Glucides: {profile['nutrition']['macros']['carbs_g'] * 0.30:.0f}g
-- Lipides: {profile['nutrition']['macros']['fat_g'] * 0.30:.0f}g
-
-Exemple: Poisson, patates douces, salade
-
-🥜 COLLATIONS (10% - {profile['nutrition']['target_calories'] * 0.10:.0f} cal):
-Fruits secs, yaourt grec, fruits frais
-
-💧 HYDRATATION:
-{row['Water_Intake (liters)']:.1f}L d'eau minimum par jour<|end|>"""
-        
-        examples.append({"text": nutrition_prompt})
-        
-        # Exemple 3: Conseils généraux
-        general_prompt = f"""<|system|>
-Tu es FitBox, un coach sportif et nutritionniste expert.<|end|>
-<|user|>
-{user_info}
-
-Donne-moi des conseils pour optimiser mes résultats.<|end|>
-<|assistant|>
-Voici mes conseils personnalisés pour toi:
-
-💪 ENTRAÎNEMENT:
-- Continue ton programme {workout_type_str} à raison de {row['Workout_Frequency (days/week)']} fois/semaine
-- Maintiens ta fréquence cardiaque moyenne autour de {row['Avg_BPM']} BPM
-- Fréquence cardiaque au repos: {row['Resting_BPM']} BPM (très bon!)
-
-📊 PROGRESSION:
-- Ton IMC actuel: {profile['bmi']['bmi']} - {profile['bmi']['category']}
-- Calories à consommer: {profile['nutrition']['target_calories']:.0f} cal/jour
-- Répartition: {profile['nutrition']['macros']['protein_g']:.0f}g protéines, {profile['nutrition']['macros']['carbs_g']:.0f}g glucides, {profile['nutrition']['macros']['fat_g']:.0f}g lipides
-
-🎯 RECOMMANDATIONS:
-1. Maintiens ton niveau d'activité actuel
-2. Assure {row['Water_Intake (liters)']:.1f}L d'eau par jour
-3. Dors 7-8h par nuit pour la récupération
-4. {'Concentre-toi sur la technique avant d augmenter les charges' if row['Experience_Level'] == 1 else 'Continue à progresser graduellement' if row['Experience_Level'] == 2 else 'N hésite pas à varier tes entraînements'}
-
-Tu es sur la bonne voie! Continue comme ça! 🚀<|end|>"""
-        
-        examples.append({"text": general_prompt})
-        
-        return examples
+        nutrition = profile['nutrition']
+        texts = format_examples(
+            row['Age'], row['Gender'], row['Weight (kg)'], row['Height (m)'], row['Experience_Level'],
+            row['Workout_Frequency (days/week)'], row['Session_Duration (hours)'], row['Calories_Burned'],
+            row['Water_Intake (liters)'], row['Avg_BPM'], row['Resting_BPM'], row['Fat_Percentage'],
+            workout_type_str, profile['bmi']['bmi'], profile['bmi']['category'], nutrition['target_calories'],
+            nutrition['macros']['protein_g'], nutrition['macros']['carbs_g'], nutrition['macros']['fat_g']
+        )
+        return [{"text": text} for text in texts]
     
     def setup_model_for_training(self):
         """
@@ -350,33 +306,117 @@ Tu es sur la bonne voie! Continue comme ça! 🚀<|end|>"""
         print(f"   💾 Économies mémoire GPU: ~70% (4-bit QLoRA)")
         print(f"   ⚡ Gradient Checkpointing: Activé (économise 2-3x mémoire)")
     
-    def tokenize_dataset(self, dataset: Dataset) -> Dataset:
+    SEQUENCE_MODES = ("max_length", "dynamic", "packing")
+    
+    def tokenize_dataset(
+        self,
+        dataset: Dataset,
+        mode: str = "max_length",
+        max_length: int = 2048,
+        batch_size: int = 4,
+        report_sample: int = 2000,
+        data_fingerprint: str = None
+    ) -> Dataset:
         """
         Tokenize le dataset pour l'entraînement.
         
+        Modes (voir backend/sequence_packing.py):
+        - max_length: chaque exemple paddé à max_length (comportement initial)
+        - dynamic: exemples non paddés, terminés par EOS; le collator padde
+          chaque batch à sa plus longue séquence (batches groupés par longueur)
+        - packing: exemples terminés par EOS concaténés en séquences pleines
+          de max_length tokens, frontières portées par les position_ids
+        
+        Avec data_fingerprint (empreinte de prepare_training_data), le dataset
+        tokenisé est mis en cache sous une empreinte qui ajoute le vocabulaire
+        du tokenizer, max_length et le mode (hors streaming).
+        
         Args:
             dataset: Dataset Hugging Face
+            mode: max_length, dynamic ou packing
+            max_length: Longueur maximale des séquences
+            batch_size: Taille du batch, pour le rapport de padding
+            report_sample: Exemples mesurés pour le rapport en streaming
+            data_fingerprint: Empreinte des textes (active le cache)
             
         Returns:
             Dataset tokenisé
         """
-        print("\n🔤 Tokenization du dataset...")
+        if mode not in self.SEQUENCE_MODES:
+            raise ValueError(f"Mode inconnu: {mode} (attendu: {', '.join(self.SEQUENCE_MODES)})")
+        
+        print(f"\n🔤 Tokenization du dataset (mode {mode})...")
+        cache_key = None
+        if self.cache and data_fingerprint and not isinstance(dataset, IterableDataset):
+            cache_key = fingerprint(
+                data=data_fingerprint,
+                tokenizer=tokenizer_digest(self.tokenizer),
+                max_length=max_length,
+                mode=mode,
+                batch_size=batch_size,
+                code=source_digest(FitBoxFineTuner.tokenize_dataset, sequence_packing),
+            )
+            cached = self.cache.load("tokenized", cache_key)
+            if cached:
+                tokenized_dataset, metadata = cached
+                self.sequence_mode = mode
+                self.padding_report = metadata["padding_report"]
+                print(f"♻️  {len(tokenized_dataset)} séquences chargées depuis le cache")
+                print(format_padding_report(self.padding_report))
+                return tokenized_dataset
+        
+        eos_token_id = self.tokenizer.eos_token_id
         
         def tokenize_function(examples):
-            return self.tokenizer(
-                examples["text"],
-                truncation=True,
-                max_length=2048,
-                padding="max_length",
-            )
+            if mode == "max_length":
+                tokens = self.tokenizer(
+                    examples["text"],
+                    truncation=True,
+                    max_length=max_length,
+                    padding="max_length",
+                )
+                tokens["length"] = [sum(mask) for mask in tokens["attention_mask"]]
+                return tokens
+            
+            # EOS ajouté après troncature: le modèle apprend à s'arrêter
+            tokens = self.tokenizer(examples["text"], truncation=True, max_length=max_length - 1)
+            input_ids = [ids + [eos_token_id] for ids in tokens["input_ids"]]
+            return {"input_ids": input_ids, "length": [len(ids) for ids in input_ids]}
         
+        # IterableDataset: map() est paresseux, la tokenization se fait à la volée
         tokenized_dataset = dataset.map(
             tokenize_function,
             batched=True,
-            remove_columns=dataset.column_names,
+            remove_columns=dataset.column_names or ["text"],
         )
         
-        print(f"✅ {len(tokenized_dataset)} exemples tokenisés")
+        streaming = isinstance(tokenized_dataset, IterableDataset)
+        if streaming:
+            lengths = [example["length"] for example in tokenized_dataset.take(report_sample)]
+        else:
+            lengths = tokenized_dataset["length"]
+        
+        if mode == "packing":
+            tokenized_dataset = tokenized_dataset.map(
+                lambda batch: pack_sequences(
+                    batch["input_ids"], max_length, eos_token_id, self.tokenizer.pad_token_id
+                ),
+                batched=True,
+                remove_columns=["input_ids", "length"],
+            )
+        
+        self.sequence_mode = mode
+        self.padding_report = padding_report(lengths, max_length, batch_size)
+        sample = f" (sur {len(lengths)} exemples)" if streaming else ""
+        print(f"📏 Padding selon le mode{sample}:")
+        print(format_padding_report(self.padding_report))
+        
+        if streaming:
+            print("✅ Tokenization à la volée (streaming)")
+        else:
+            print(f"✅ {len(lengths)} exemples tokenisés ({len(tokenized_dataset)} séquences)")
+        if cache_key:
+            self.cache.save("tokenized", cache_key, tokenized_dataset, {"padding_report": self.padding_report})
         return tokenized_dataset
     
     def train(
@@ -385,6 +425,8 @@ Tu es sur la bonne voie! Continue comme ça! 🚀<|end|>"""
         num_epochs: int = 4,
         batch_size: int = 4,
         learning_rate: float = 5e-4,
+        max_steps: int = -1,
+        resume: bool = True,
     ):
         """
         Lance le fine-tuning du modèle avec optimisations avancées.
@@ -392,7 +434,7 @@ Tu es sur la bonne voie! Continue comme ça! 🚀<|end|>"""
         AMÉLIORATIONS APPORTÉES:
         1. Learning rate augmentée (2e-4 → 5e-4) pour convergence plus rapide
         2. Batch size augmenté (2 → 4) grâce à QLoRA
-        3. Warmup steps augmentés (100 → 200) pour stabilité initiale
+        3. Warmup sur 10% des pas (warmup_ratio) pour stabilité initiale
         4. Cosine scheduler pour meilleure convergence
         
         Args:
@@ -400,39 +442,84 @@ Tu es sur la bonne voie! Continue comme ça! 🚀<|end|>"""
             num_epochs: Nombre d'époques (par défaut 4)
             batch_size: Taille du batch (par défaut 4, possible avec QLoRA)
             learning_rate: Taux d'apprentissage (par défaut 5e-4)
+            max_steps: Nombre de pas d'optimisation (requis en streaming,
+                prioritaire sur num_epochs)
+            resume: Reprendre l'exécution interrompue dont output_dir garde
+                les checkpoints (False: nouvelle exécution)
+        
+        Reprise: le Trainer recharge poids LoRA, optimiseur, scheduler et
+        états RNG du checkpoint, puis saute les batches déjà vus. Sur un
+        dataset tokenisé (non streaming), seuls les indices du sampler sont
+        sautés: aucun exemple n'est relu ni retokenisé. En streaming, les
+        batches sautés sont relus depuis le début du flux.
         """
+        streaming = isinstance(train_dataset, IterableDataset)
+        if streaming and max_steps <= 0:
+            raise ValueError("max_steps est requis avec un dataset en streaming (taille inconnue)")
+        
         print("\n🏋️  Début du fine-tuning avec QLoRA...")
         print(f"   📊 Configuration:")
         print(f"      - Epochs: {num_epochs}")
         print(f"      - Batch Size: {batch_size} (augmenté grâce à QLoRA)")
         print(f"      - Learning Rate: {learning_rate}")
-        print(f"      - Warmup Steps: 200 (pour meilleure stabilité)")
+        
+        # Pas d'optimisation prévus: warmup et fréquence des checkpoints en
+        # dépendent (le packing divise le nombre de pas par ~15 par rapport
+        # à max_length: 200 pas fixes ne seraient jamais atteints)
+        gradient_accumulation_steps = 2
+        if max_steps > 0:
+            planned_steps = max_steps
+        else:
+            micro_steps = math.ceil(len(train_dataset) / batch_size)
+            planned_steps = max(micro_steps // gradient_accumulation_steps, 1) * num_epochs
+        # Un checkpoint tous les ~10% de l'entraînement (au plus tous les 200 pas)
+        save_steps = min(200, max(1, planned_steps // 10))
+        print(f"      - Pas d'optimisation prévus: {planned_steps}")
+        print(f"      - Warmup: 10% des pas ({math.ceil(planned_steps * 0.1)})")
+        print(f"      - Checkpoints: tous les {save_steps} pas")
         print(f"      - Optimizer: Paged AdamW 8-bit")
         
         # Configuration de l'entraînement optimisée
         training_args = TrainingArguments(
             output_dir=str(self.output_dir),
             num_train_epochs=num_epochs,
+            max_steps=max_steps,
             per_device_train_batch_size=batch_size,
-            gradient_accumulation_steps=2,  # Simule batch_size plus large
+            gradient_accumulation_steps=gradient_accumulation_steps,  # Simule batch_size plus large
             learning_rate=learning_rate,
             fp16=True,                      # Mixed Precision Training
-            save_steps=200,                 # Checkpoints plus fréquents
+            save_steps=save_steps,          # ~10% des pas prévus
             logging_steps=20,               # Logging détaillé
             save_total_limit=3,
-            warmup_steps=200,               # AMÉLIORÉ: 100 → 200 (meilleure stabilité)
+            warmup_ratio=0.1,               # Proportionnel au nombre de pas (packing compris)
             lr_scheduler_type="cosine",     # Cosine annealing pour convergence douce
             optim="paged_adamw_8bit",       # Optimiseur 8-bit pour économiser mémoire
             report_to="none",
             weight_decay=0.01,              # Régularisation L2
             max_grad_norm=0.3,              # Clipping pour stabilité
+            # Padding dynamique: batches de longueurs proches (colonne "length")
+            group_by_length=self.sequence_mode == "dynamic" and not streaming,
+            length_column_name="length",
         )
         
         # Data collator pour language modeling
-        data_collator = DataCollatorForLanguageModeling(
-            tokenizer=self.tokenizer,
-            mlm=False
-        )
+        if self.sequence_mode == "max_length":
+            data_collator = DataCollatorForLanguageModeling(
+                tokenizer=self.tokenizer,
+                mlm=False
+            )
+        else:
+            data_collator = DynamicPaddingCollator(self.tokenizer.pad_token_id)
+        
+        # Checkpoint d'une exécution interrompue, choisi sur son marqueur
+        # d'exécution (voir training_checkpoints), pas sur son numéro de pas
+        found = find_resume_checkpoint(self.output_dir) if resume else None
+        checkpoint, self.run_id = found if found else (None, new_run_id())
+        if checkpoint:
+            print(f"\n♻️  Reprise depuis {Path(checkpoint).name} (exécution {self.run_id})")
+        moved = set_aside_checkpoints(self.output_dir, keep_run_id=self.run_id)
+        if moved:
+            print(f"   📦 {len(moved)} checkpoint(s) d'autres exécutions déplacés dans {moved[0].parent.parent}")
         
         # Créer le Trainer Hugging Face
         trainer = Trainer(
@@ -440,21 +527,27 @@ Tu es sur la bonne voie! Continue comme ça! 🚀<|end|>"""
             args=training_args,
             train_dataset=train_dataset,
             data_collator=data_collator,
+            callbacks=[RunMarkerCallback(self.run_id)],
         )
         
         # Entraîner le modèle
-        print(f"\n📚 Entraînement sur {len(train_dataset)} exemples...")
+        if streaming:
+            print(f"\n📚 Entraînement en streaming sur {max_steps} pas...")
+        else:
+            print(f"\n📚 Entraînement sur {len(train_dataset)} exemples...")
         print(f"   ⏱️  Temps estimé: 15-30 minutes sur GPU 4GB")
         print("-" * 60)
         
         # Capture les métriques d'entraînement
-        train_result = trainer.train()
+        train_result = trainer.train(resume_from_checkpoint=checkpoint)
         
         print("\n✅ Entraînement terminé!")
         print(f"   📊 Perte finale: {train_result.training_loss:.4f}")
         
-        # Sauvegarder le modèle
+        # Sauvegarder le modèle (marque l'exécution comme terminée), puis
+        # supprimer ses checkpoints devenus inutiles pour la reprise
         self.save_model(train_result)
+        remove_run_checkpoints(self.output_dir, self.run_id)
     
     def save_model(self, train_result=None):
         """
@@ -473,6 +566,7 @@ Tu es sur la bonne voie! Continue comme ça! 🚀<|end|>"""
         metadata = {
             "base_model": self.model_name,
             "timestamp": datetime.now().isoformat(),
+            "run_id": self.run_id,
             "device": self.device,
             "technique": "QLoRA (4-bit Quantization + LoRA)",
             "improvements": [
@@ -480,11 +574,15 @@ Tu es sur la bonne voie! Continue comme ça! 🚀<|end|>"""
                 "Gradient Checkpointing (économise 2-3x mémoire)",
                 "LoRA rank: 32 (au lieu de 16)",
                 "Learning Rate: 5e-4 (optimisée)",
-                "Warmup Steps: 200 (pour stabilité)",
+                "Warmup: 10% des pas (warmup_ratio, pour stabilité)",
                 "Batch Size: 4 (possible grâce à QLoRA)"
             ]
         }
         
+        if self.padding_report:
+            metadata["sequence_mode"] = self.sequence_mode
+            metadata["padding_report"] = self.padding_report
+        
         # Ajouter les métriques d'entraînement si disponibles
         if train_result:
             metadata["training_metrics"] = {
@@ -565,7 +663,7 @@ def main():
     ✅ Gradient Checkpointing (économise 2-3x mémoire)
     ✅ r=32 au lieu de r=16 (plus de capacité d'adaptation)
     ✅ Learning Rate optimisée (5e-4)
-    ✅ Warmup augmenté (200 steps)
+    ✅ Warmup proportionnel (10% des pas)
     ✅ Batch size augmenté (4 au lieu de 2)
     ✅ Meilleure logging et tracking
     """
@@ -607,7 +705,9 @@ def main():
     print("\n" + "-"*70)
     print("🔤 ÉTAPE 3: Tokenization du dataset")
     print("-"*70)
-    tokenized_dataset = finetuner.tokenize_dataset(dataset)
+    tokenized_dataset = finetuner.tokenize_dataset(
+        dataset, mode="packing", data_fingerprint=finetuner.data_fingerprint
+    )
     
     # Étape 4: Entraîner avec hyperparamètres optimisés
     print("\n" + "-"*70)
@@ -618,10 +718,11 @@ def main():
     print("   - Epochs: 4")
     print("   - Batch Size: 4 (grâce à QLoRA)")
     print("   - Learning Rate: 5e-4")
-    print("   - Warmup Steps: 200")
+    print("   - Warmup: 10% des pas (warmup_ratio)")
     print("   - Scheduler: Cosine Annealing")
     print("   - Optimizer: Paged AdamW 8-bit")
     print("   - Gradient Checkpointing: Activé")
+    print("   - Séquences: packing (2048 tokens pleins, voir le rapport de padding)")
     
     finetuner.train(
         train_dataset=tokenized_dataset,
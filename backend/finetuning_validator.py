@@ -170,7 +170,7 @@ class FitBoxValidator:
                 "num_epochs": 4,
                 "batch_size": 4,
                 "learning_rate": 5e-4,
-                "warmup_steps": 200,
+                "warmup_ratio": 0.1,
                 "max_length": 2048,
                 "gradient_accumulation": 2,
                 "lr_scheduler": "cosine"
@@ -184,7 +184,7 @@ class FitBoxValidator:
             print(f"   • Learning Rate: 5e-4 (optimal pour LLM fine-tuning) ✅")
             print(f"   • Batch Size: 4 (possible grâce à QLoRA) ✅")
             print(f"   • Epochs: 4 (bon équilibre) ✅")
-            print(f"   • Warmup: 200 steps (stabilité) ✅")
+            print(f"   • Warmup: 10% des pas (stabilité, quel que soit le mode de séquences) ✅")
             print(f"   • Max Length: 2048 (pour long context) ✅")
             
             print("\n⏱️  Temps d'entraînement estimé:")
@@ -0,0 +1,272 @@
+"""
+Répartition des générations entre plusieurs serveurs Ollama.
+
+Chaque requête est envoyée à une réplique choisie parmi celles disponibles:
+- least_outstanding: la réplique ayant le moins de requêtes en cours
+  (à égalité, tour à tour)
+- latency_weighted: round-robin pondéré lissé, poids inversement
+  proportionnel à la latence moyenne (EWMA du temps avant premier octet)
+
+Une réplique est écartée (ejection) après `eject_after` échecs consécutifs,
+pendant `eject_seconds`, ou tant que son contrôle de santé actif échoue.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+STRATEGIES = ("least_outstanding", "latency_weighted")
+
+
+def health_url(url: str, path: str = "/api/tags") -> str:
+    """URL de contrôle de santé d'une réplique (même hôte, chemin `path`)"""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, path, "", ""))
+
+
+class Replica:
+    """État d'un serveur Ollama (requêtes en cours, latence, échecs)"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.latency = None
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.healthy = True
+        self.current_weight = 0.0
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+
+class GenerationRouter:
+    """Choix de la réplique Ollama pour chaque requête, avec ejection des répliques en échec"""
+
+    # Poids d'une nouvelle mesure dans la moyenne de latence
+    LATENCY_ALPHA = 0.3
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        strategy: str = "least_outstanding",
+        eject_after: int = 3,
+        eject_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialise le routeur.
+
+        Args:
+            urls: URLs /api/generate des répliques (locales ou cloud)
+            strategy: 'least_outstanding' ou 'latency_weighted'
+            eject_after: Échecs consécutifs avant d'écarter une réplique
+            eject_seconds: Durée d'écartement d'une réplique
+            clock: Horloge (secondes), remplaçable dans les tests
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Stratégie inconnue: {strategy} (attendu: {', '.join(STRATEGIES)})")
+        self.replicas = [Replica(url) for url in dict.fromkeys(u.strip() for u in urls if u and u.strip())]
+        if not self.replicas:
+            raise ValueError("Au moins une URL Ollama est requise")
+        self.strategy = strategy
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._rotation = 0
+        self._health_thread = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls, default_url: Optional[str] = None) -> Optional["GenerationRouter"]:
+        """
+        Construit le routeur depuis OLLAMA_API_URLS (URLs séparées par des
+        virgules), ou à défaut depuis la seule URL `default_url`.
+
+        Returns:
+            Le routeur, ou None si aucune URL n'est configurée
+        """
+        urls = [u for u in os.environ.get('OLLAMA_API_URLS', '').split(',') if u.strip()]
+        if not urls and default_url:
+            urls = [default_url]
+        if not urls:
+            return None
+        return cls(
+            urls,
+            strategy=os.environ.get('OLLAMA_ROUTER_STRATEGY', 'least_outstanding'),
+            eject_after=int(os.environ.get('OLLAMA_EJECT_AFTER', '3')),
+            eject_seconds=float(os.environ.get('OLLAMA_EJECT_SECONDS', '30'))
+        )
+
+    @property
+    def urls(self) -> List[str]:
+        return [r.url for r in self.replicas]
+
+    def _pick_least_outstanding(self, candidates: List[Replica]) -> Replica:
+        # Rotation du point de départ: les égalités sont réparties tour à tour
+        start = self._rotation % len(candidates)
+        self._rotation += 1
+        ordered = candidates[start:] + candidates[:start]
+        return min(ordered, key=lambda r: r.outstanding)
+
+    def _pick_latency_weighted(self, candidates: List[Replica]) -> Replica:
+        # Round-robin pondéré lissé (à la nginx): chaque réplique gagne son
+        # poids à chaque tour, la plus haute est choisie puis perd le total
+        known = [1.0 / r.latency for r in candidates if r.latency]
+        # Une réplique jamais mesurée reçoit le meilleur poids connu
+        default = max(known) if known else 1.0
+        total = 0.0
+        best = None
+        for replica in candidates:
+            weight = 1.0 / replica.latency if replica.latency else default
+            replica.current_weight += weight
+            total += weight
+            if best is None or replica.current_weight > best.current_weight:
+                best = replica
+        best.current_weight -= total
+        return best
+
+    def acquire(self, exclude: Iterable[str] = (), panic: bool = False) -> Optional[Replica]:
+        """
+        Choisit une réplique et y réserve une requête (à rendre avec release()).
+
+        Args:
+            exclude: URLs déjà essayées pour cette requête
+            panic: Si aucune réplique n'est disponible, choisir quand même
+                parmi les répliques écartées (aucun repli possible)
+
+        Returns:
+            La réplique choisie, ou None si aucune n'est utilisable
+        """
+        exclude = set(exclude)
+        with self._lock:
+            now = self._clock()
+            remaining = [r for r in self.replicas if r.url not in exclude]
+            candidates = [r for r in remaining if r.available(now)]
+            if not candidates:
+                if not (panic and remaining):
+                    return None
+                candidates = remaining
+            if self.strategy == "latency_weighted":
+                replica = self._pick_latency_weighted(candidates)
+            else:
+                replica = self._pick_least_outstanding(candidates)
+            replica.outstanding += 1
+            replica.requests += 1
+            return replica
+
+    def release(self, replica: Replica, latency: Optional[float] = None, ok: bool = True):
+        """
+        Rend une requête réservée par acquire().
+
+        Args:
+            replica: Réplique utilisée
+            latency: Temps avant premier octet (s), si la réponse a été reçue
+            ok: False si la requête a échoué (connexion, timeout, 5xx)
+        """
+        with self._lock:
+            replica.outstanding -= 1
+            if ok:
+                replica.consecutive_failures = 0
+                if latency is not None:
+                    if replica.latency is None:
+                        replica.latency = latency
+                    else:
+                        replica.latency += self.LATENCY_ALPHA * (latency - replica.latency)
+                return
+            replica.errors += 1
+            replica.consecutive_failures += 1
+            if replica.consecutive_failures >= self.eject_after:
+                self._eject(replica)
+
+    def _eject(self, replica: Replica):
+        """Écarte une réplique pendant eject_seconds (appelé sous verrou)"""
+        replica.ejected_until = self._clock() + self.eject_seconds
+        replica.ejections += 1
+        replica.consecutive_failures = 0
+
+    def all_down(self) -> bool:
+        """True si aucune réplique n'est disponible"""
+        with self._lock:
+            now = self._clock()
+            return not any(r.available(now) for r in self.replicas)
+
+    def check_health(self, probe: Callable[[str], bool]):
+        """
+        Contrôle de santé actif de toutes les répliques.
+
+        Args:
+            probe: Fonction url -> True si la réplique répond
+        """
+        for replica in self.replicas:
+            try:
+                healthy = bool(probe(replica.url))
+            except Exception:
+                healthy = False
+            with self._lock:
+                replica.healthy = healthy
+
+    def start_health_checks(self, probe: Callable[[str], bool], interval: float = 10.0):
+        """Lance check_health(probe) toutes les `interval` secondes dans un thread démon"""
+        if self._health_thread is not None:
+            return
+
+        def _loop():
+            while not self._stop.is_set():
+                self.check_health(probe)
+                self._stop.wait(interval)
+
+        self._health_thread = threading.Thread(target=_loop, name="ollama-health", daemon=True)
+        self._health_thread.start()
+
+    def stop(self):
+        """Arrête le thread de contrôle de santé"""
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join(timeout=5)
+            self._health_thread = None
+
+    def stats(self) -> dict:
+        """Stratégie et état de chaque réplique (requêtes en cours, latence, échecs)"""
+        with self._lock:
+            now = self._clock()
+            return {
+                "strategy": self.strategy,
+                "available": sum(r.available(now) for r in self.replicas),
+                "replicas": [
+                    {
+                        "url": r.url,
+                        "available": r.available(now),
+                        "healthy": r.healthy,
+                        "outstanding": r.outstanding,
+                        "requests": r.requests,
+                        "errors": r.errors,
+                        "ejections": r.ejections,
+                        "ejected_for_s": round(max(0.0, r.ejected_until - now), 1),
+                        "latency_ms": round(r.latency * 1000, 1) if r.latency is not None else None,
+                    }
+                    for r in self.replicas
+                ],
+            }
+
+
+def http_probe(headers: Optional[dict] = None, path: str = "/api/tags", timeout: float = 2.0) -> Callable[[str], bool]:
+    """
+    Contrôle de santé HTTP: GET sur `path` de l'hôte de la réplique.
+
+    Les sondes n'utilisent pas le pool partagé, pour ne pas attendre un
+    créneau derrière les générations en cours.
+    """
+    def _probe(url: str) -> bool:
+        resp = requests.get(health_url(url, path), headers=headers, timeout=timeout)
+        return resp.status_code < 500
+
+    return _probe
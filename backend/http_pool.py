@@ -0,0 +1,207 @@
+"""
+Pool de connexions HTTP persistantes pour les appels Ollama.
+
+Une seule session `requests` est partagée par le backend: les connexions
+TCP (et les sessions TLS pour l'URL cloud) sont conservées en keep-alive
+et réutilisées d'un appel à l'autre au lieu d'être rouvertes à chaque
+génération.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class PooledHTTPSession:
+    """
+    Session HTTP keep-alive partagée, avec limite de requêtes simultanées
+    par hôte, timeouts connexion/lecture séparés et statistiques du pool.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        max_per_host: Optional[int] = None,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0
+    ):
+        """
+        Initialise la session.
+
+        Args:
+            pool_connections: Nombre d'hôtes distincts gardés en cache
+            pool_maxsize: Connexions keep-alive conservées par hôte
+            max_per_host: Requêtes simultanées autorisées par hôte
+                (par défaut pool_maxsize; les suivantes attendent un créneau)
+            connect_timeout: Timeout d'établissement de connexion (s)
+            read_timeout: Timeout de lecture entre deux octets reçus (s)
+        """
+        self.pool_maxsize = pool_maxsize
+        self.max_per_host = max_per_host or pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=0
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+        self._lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._requests = 0
+        self._errors = 0
+        self._in_flight = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @classmethod
+    def from_env(cls) -> "PooledHTTPSession":
+        """Construit la session à partir des variables d'environnement OLLAMA_POOL_* / OLLAMA_*_TIMEOUT"""
+        max_per_host = os.environ.get('OLLAMA_POOL_PER_HOST')
+        return cls(
+            pool_connections=int(os.environ.get('OLLAMA_POOL_CONNECTIONS', '4')),
+            pool_maxsize=int(os.environ.get('OLLAMA_POOL_SIZE', '16')),
+            max_per_host=int(max_per_host) if max_per_host else None,
+            connect_timeout=float(os.environ.get('OLLAMA_CONNECT_TIMEOUT', '5')),
+            read_timeout=float(os.environ.get('OLLAMA_READ_TIMEOUT', '60'))
+        )
+
+    def _slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.max_per_host)
+                self._host_slots[host] = slot
+            return slot
+
+    def _acquire(self, url: str) -> threading.BoundedSemaphore:
+        """Réserve un créneau pour l'hôte de l'URL et comptabilise l'attente"""
+        slot = self._slot(urlsplit(url).netloc)
+
+        start = time.perf_counter()
+        slot.acquire()
+        waited = time.perf_counter() - start
+
+        with self._lock:
+            self._requests += 1
+            self._in_flight += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return slot
+
+    def _release(self, slot: threading.BoundedSemaphore, failed: bool = False):
+        with self._lock:
+            self._in_flight -= 1
+            if failed:
+                self._errors += 1
+        slot.release()
+
+    def request(self, method: str, url: str, timeout: Optional[Tuple[float, float]] = None, **kwargs) -> requests.Response:
+        """
+        Envoie une requête via le pool partagé.
+
+        Bloque tant que max_per_host requêtes vers le même hôte sont en cours;
+        le temps d'attente est comptabilisé dans les statistiques.
+
+        Args:
+            method: Méthode HTTP
+            url: URL complète
+            timeout: Tuple (connexion, lecture); par défaut celui du pool
+            **kwargs: Arguments transmis à requests.Session.request
+
+        Returns:
+            Réponse requests (corps entièrement lu)
+        """
+        slot = self._acquire(url)
+        failed = False
+        try:
+            return self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+        except requests.RequestException:
+            failed = True
+            raise
+        finally:
+            self._release(slot, failed)
+
+    @contextmanager
+    def stream(self, method: str, url: str, timeout: Optional[Tuple[float, float]] = None, **kwargs) -> Iterator[requests.Response]:
+        """
+        Requête dont le corps est lu au fil de l'eau.
+
+        Le créneau de l'hôte reste réservé jusqu'à la sortie du bloc `with`,
+        puis la connexion est rendue au pool.
+
+        Exemple:
+            with pool.stream("POST", url, json=payload) as resp:
+                for line in resp.iter_lines():
+                    ...
+        """
+        slot = self._acquire(url)
+        failed = False
+        resp = None
+        try:
+            resp = self.session.request(method, url, timeout=timeout or self.timeout, stream=True, **kwargs)
+            yield resp
+        except requests.RequestException:
+            failed = True
+            raise
+        finally:
+            if resp is not None:
+                resp.close()
+            self._release(slot, failed)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Raccourci pour request('POST', ...)"""
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """
+        Statistiques du pool.
+
+        Returns:
+            Dictionnaire avec le nombre de requêtes, les nouvelles connexions
+            ouvertes, le taux de réutilisation des connexions et le temps
+            d'attente d'un créneau (moyen et maximum, en ms)
+        """
+        hosts = {}
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                "requests": pool.num_requests,
+                "new_connections": pool.num_connections,
+            }
+
+        pooled_requests = sum(h["requests"] for h in hosts.values())
+        new_connections = sum(h["new_connections"] for h in hosts.values())
+
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "errors": self._errors,
+                "in_flight": self._in_flight,
+                "new_connections": new_connections,
+                "reuse_ratio": round(1 - new_connections / pooled_requests, 4) if pooled_requests else 0.0,
+                "wait_time_avg_ms": round(self._wait_total / self._requests * 1000, 3) if self._requests else 0.0,
+                "wait_time_max_ms": round(self._wait_max * 1000, 3),
+                "pool_maxsize": self.pool_maxsize,
+                "max_per_host": self.max_per_host,
+                "connect_timeout": self.timeout[0],
+                "read_timeout": self.timeout[1],
+                "hosts": hosts,
+            }
+
+    def close(self):
+        """Ferme toutes les connexions du pool"""
+        self.session.close()
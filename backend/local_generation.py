@@ -0,0 +1,461 @@
+"""
+Moteur de génération locale (Hugging Face) avec cache KV.
+
+Le cache KV reste activé pendant le décodage (chaque nouveau token ne
+calcule l'attention que pour lui-même). En plus, les past-key-values d'un
+préfixe fixe (le bloc `<|system|>` de create_prompt) sont calculés une
+seule fois puis réutilisés: chaque requête ne fait le prefill que de la
+partie propre à l'utilisateur. Le préfixe est coupé après son dernier saut
+de ligne, et la première découpe est vérifiée contre la tokenisation du
+prompt complet: le modèle reçoit exactement les mêmes input_ids qu'avant.
+
+BatchScheduler regroupe les requêtes concurrentes en lots paddés, pour
+qu'un seul appel à model.generate serve plusieurs utilisateurs au lieu
+que chaque requête Flask lance le sien.
+
+Le modèle et le tokenizer sont partagés: les appels à generate et
+generate_batch (scheduler, streaming, appels directs) sont sérialisés par
+un verrou du moteur.
+"""
+
+import contextvars
+import copy
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future
+from typing import List, Optional, Sequence, Tuple, Union
+
+import torch
+
+
+class LocalGenerationEngine:
+    """Génération locale avec cache KV et cache de préfixe"""
+
+    def __init__(self, model, tokenizer, device: str, max_prefix_entries: int = 4, observer=None):
+        """
+        Initialise le moteur.
+
+        Args:
+            model: Modèle causal Hugging Face (ou PeftModel)
+            tokenizer: Tokenizer associé
+            device: "cuda" ou "cpu"
+            max_prefix_entries: Nombre de préfixes gardés en cache (LRU)
+            observer: Objet optionnel recevant les mesures
+                (observe_stage(stage, seconds, backend) et
+                record_tokens(tokens_in, tokens_out, seconds, backend),
+                par exemple le module metrics)
+        """
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.max_prefix_entries = max_prefix_entries
+        self.observer = observer
+
+        self._prefix_cache: "OrderedDict[str, Tuple[torch.Tensor, object]]" = OrderedDict()
+        # Préfixe -> la découpe préfixe/suite redonne-t-elle les tokens du prompt complet
+        self._prefix_checked = {}
+        self._lock = threading.Lock()
+        # Un seul appel au modèle à la fois (scheduler, streaming, appels directs)
+        self._generate_lock = threading.Lock()
+        self._prefix_hits = 0
+        self._prefix_misses = 0
+        self._prefill_tokens_saved = 0
+        self._prefix_rejected = 0
+
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+    def _prefix_state(self, prefix: str) -> Tuple[torch.Tensor, object]:
+        """Retourne (input_ids, past_key_values) du préfixe, calculés une seule fois"""
+        with self._lock:
+            state = self._prefix_cache.get(prefix)
+            if state is not None:
+                self._prefix_cache.move_to_end(prefix)
+                self._prefix_hits += 1
+                self._prefill_tokens_saved += state[0].shape[1]
+                return state
+
+            self._prefix_misses += 1
+            prefix_ids = self.tokenizer(prefix, return_tensors="pt").input_ids.to(self.device)
+            with torch.no_grad():
+                outputs = self.model(input_ids=prefix_ids, use_cache=True)
+            state = (prefix_ids, outputs.past_key_values)
+
+            self._prefix_cache[prefix] = state
+            while len(self._prefix_cache) > self.max_prefix_entries:
+                self._prefix_cache.popitem(last=False)
+            return state
+
+    @staticmethod
+    def cache_boundary(prefix: str) -> str:
+        """
+        Partie du préfixe mise en cache: jusqu'au dernier saut de ligne.
+
+        L'indentation qui suit (`<|user|>\\n    `) se fond avec le premier mot
+        de la suite en SentencePiece/BPE: elle est laissée à la suite.
+        """
+        cut = prefix.rfind("\n")
+        return prefix[:cut + 1] if cut >= 0 else prefix
+
+    def _split_matches(self, prefix: str, prompt: str) -> bool:
+        """
+        Vérifie (une fois par préfixe) que tokens(préfixe) + tokens(suite)
+        est identique à tokens(prompt); sinon le préfixe n'est pas mis en cache.
+        """
+        with self._lock:
+            checked = self._prefix_checked.get(prefix)
+        if checked is not None:
+            return checked
+
+        full_ids = list(self.tokenizer(prompt).input_ids)
+        split_ids = list(self.tokenizer(prefix).input_ids) + list(
+            self.tokenizer(prompt[len(prefix):], add_special_tokens=False).input_ids
+        )
+        matches = split_ids == full_ids
+        with self._lock:
+            self._prefix_checked[prefix] = matches
+            if not matches:
+                self._prefix_rejected += 1
+        if not matches:
+            print("⚠️  Cache de préfixe désactivé pour ce préfixe: sa tokenisation séparée diffère du prompt complet")
+        return matches
+
+    def _observe(self, stage: str, start: float):
+        if self.observer is not None:
+            self.observer.observe_stage(stage, time.perf_counter() - start, backend="local")
+
+    def _record_tokens(self, tokens_in: int, tokens_out: int, start: float):
+        if self.observer is not None:
+            self.observer.record_tokens(tokens_in, tokens_out, time.perf_counter() - start, backend="local")
+
+    def _record_request(self, tokenize_seconds: float, generate_seconds: float, tokens_in: int, tokens_out: int):
+        """Mesures d'une requête d'un lot (appelé dans le contexte de la requête)"""
+        self.observer.observe_stage("tokenize", tokenize_seconds, backend="local")
+        self.observer.observe_stage("generate", generate_seconds, backend="local")
+        self.observer.record_tokens(tokens_in, tokens_out, generate_seconds, backend="local")
+
+    def encode(self, prompt: str, prefix: Optional[str] = None) -> Tuple[torch.Tensor, object]:
+        """
+        Tokenise le prompt.
+
+        Si le prompt commence par `prefix`, les tokens du préfixe (coupé par
+        cache_boundary) sont ceux du cache et seule la suite est tokenisée; une
+        copie des past-key-values du préfixe est retournée (generate les
+        modifie en place). Si la découpe change les tokens (_split_matches),
+        le prompt est tokenisé en entier, sans cache.
+
+        Returns:
+            Tuple (input_ids, past_key_values ou None)
+        """
+        if prefix:
+            prefix = self.cache_boundary(prefix)
+        if (prefix and prompt.startswith(prefix) and len(prompt) > len(prefix)
+                and self._split_matches(prefix, prompt)):
+            prefix_ids, prefix_cache = self._prefix_state(prefix)
+            suffix_ids = self.tokenizer(
+                prompt[len(prefix):], return_tensors="pt", add_special_tokens=False
+            ).input_ids.to(self.device)
+            return torch.cat([prefix_ids, suffix_ids], dim=-1), copy.deepcopy(prefix_cache)
+
+        return self.tokenizer(prompt, return_tensors="pt").input_ids.to(self.device), None
+
+    def generate(
+        self,
+        prompt: str,
+        max_new_tokens: int = 400,
+        temperature: float = 0.7,
+        prefix: Optional[str] = None,
+        streamer=None,
+        **generate_kwargs
+    ) -> str:
+        """
+        Génère la suite du prompt avec le cache KV activé.
+
+        Args:
+            prompt: Prompt complet
+            max_new_tokens: Nombre maximal de tokens générés
+            temperature: Température d'échantillonnage
+            prefix: Préfixe fixe du prompt dont le cache KV peut être réutilisé
+            streamer: Streamer Hugging Face optionnel (TextIteratorStreamer...)
+            **generate_kwargs: Arguments supplémentaires pour model.generate
+
+        Returns:
+            Texte généré (sans le prompt)
+        """
+        with self._generate_lock:
+            return self._generate(prompt, max_new_tokens, temperature, prefix, streamer, **generate_kwargs)
+
+    def _generate(self, prompt, max_new_tokens, temperature, prefix, streamer, **generate_kwargs) -> str:
+        start = time.perf_counter()
+        input_ids, past_key_values = self.encode(prompt, prefix)
+        self._observe("tokenize", start)
+
+        kwargs = dict(
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            top_p=0.9,
+            top_k=50,
+            repetition_penalty=1.1,
+            do_sample=True,
+            pad_token_id=self.tokenizer.eos_token_id,
+            use_cache=True,
+        )
+        kwargs.update(generate_kwargs)
+        if past_key_values is not None:
+            kwargs["past_key_values"] = past_key_values
+        if streamer is not None:
+            kwargs["streamer"] = streamer
+
+        start = time.perf_counter()
+        with torch.no_grad():
+            outputs = self.model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                **kwargs
+            )
+        self._observe("generate", start)
+        self._record_tokens(input_ids.shape[1], outputs.shape[1] - input_ids.shape[1], start)
+
+        return self.tokenizer.decode(outputs[0, input_ids.shape[1]:], skip_special_tokens=True)
+
+    def generate_batch(
+        self,
+        prompts: Sequence[str],
+        max_new_tokens: Union[int, Sequence[int]] = 400,
+        temperature: float = 0.7,
+        contexts: Optional[Sequence[contextvars.Context]] = None
+    ) -> List[str]:
+        """
+        Génère la suite de plusieurs prompts en un seul appel (padding à gauche).
+
+        Args:
+            prompts: Prompts complets
+            max_new_tokens: Limite commune ou limite par prompt (le lot est
+                généré jusqu'à la plus grande, chaque sortie est ensuite tronquée)
+            temperature: Température d'échantillonnage commune au lot
+            contexts: Contexte de chaque prompt: les mesures de chaque requête
+                y sont enregistrées (étiquettes de métriques de sa requête)
+
+        Returns:
+            Textes générés, dans l'ordre des prompts
+        """
+        if isinstance(max_new_tokens, int):
+            max_new_tokens = [max_new_tokens] * len(prompts)
+
+        with self._generate_lock:
+            # Padding à gauche (par appel: le tokenizer partagé n'est pas modifié),
+            # la génération continue à droite de chaque prompt
+            start = time.perf_counter()
+            inputs = self.tokenizer(
+                list(prompts), return_tensors="pt", padding=True, padding_side="left"
+            ).to(self.device)
+            tokenize_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with torch.no_grad():
+                outputs = self.model.generate(
+                    **inputs,
+                    max_new_tokens=max(max_new_tokens),
+                    temperature=temperature,
+                    top_p=0.9,
+                    top_k=50,
+                    repetition_penalty=1.1,
+                    do_sample=True,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    use_cache=True,
+                )
+            generate_seconds = time.perf_counter() - start
+
+        prompt_len = inputs["input_ids"].shape[1]
+        if self.observer is not None:
+            generated = outputs[:, prompt_len:]
+            for i, limit in enumerate(max_new_tokens):
+                measures = (
+                    tokenize_seconds,
+                    generate_seconds,
+                    int(inputs["attention_mask"][i].sum()),
+                    int((generated[i, :limit] != self.tokenizer.pad_token_id).sum()),
+                )
+                if contexts is not None:
+                    contexts[i].run(self._record_request, *measures)
+                else:
+                    self._record_request(*measures)
+        return [
+            self.tokenizer.decode(outputs[i, prompt_len:prompt_len + limit], skip_special_tokens=True)
+            for i, limit in enumerate(max_new_tokens)
+        ]
+
+    def stats(self) -> dict:
+        """Statistiques du cache de préfixe"""
+        with self._lock:
+            return {
+                "prefix_entries": len(self._prefix_cache),
+                "prefix_hits": self._prefix_hits,
+                "prefix_misses": self._prefix_misses,
+                "prefix_rejected": self._prefix_rejected,
+                "prefill_tokens_saved": self._prefill_tokens_saved,
+            }
+
+
+class _PendingRequest:
+    """Requête en attente dans la file du BatchScheduler"""
+
+    __slots__ = ("prompt", "max_new_tokens", "temperature", "future", "enqueued_at", "context")
+
+    def __init__(self, prompt: str, max_new_tokens: int, temperature: float):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+        # Contexte de l'appelant (étiquettes de métriques de sa requête)
+        self.context = contextvars.copy_context()
+
+
+class BatchScheduler:
+    """
+    File d'attente + worker regroupant les prompts en lots dynamiques.
+
+    Le worker prend la première requête en attente puis attend au plus
+    max_wait_ms d'autres requêtes, jusqu'à max_batch_size. Les requêtes d'un
+    même lot partageant la même température sont générées ensemble; chaque
+    appelant reçoit son propre résultat.
+    """
+
+    LATENCY_WINDOW = 1000
+
+    def __init__(
+        self,
+        engine: LocalGenerationEngine,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 20.0,
+        prefix: Optional[str] = None
+    ):
+        """
+        Initialise et démarre le worker.
+
+        Args:
+            engine: Moteur de génération locale
+            max_batch_size: Taille maximale d'un lot
+            max_wait_ms: Fenêtre d'attente maximale pour compléter un lot
+            prefix: Préfixe fixe réutilisé (cache KV) quand un lot ne contient
+                qu'un seul prompt
+        """
+        self.engine = engine
+        self.prefix = prefix
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._queue: "queue.Queue[_PendingRequest]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._queue_latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._processed = 0
+
+        self._worker = threading.Thread(target=self._run, name="fitbox-batch-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt: str, max_new_tokens: int = 400, temperature: float = 0.7) -> Future:
+        """Ajoute un prompt à la file et retourne un Future portant le texte généré"""
+        request = _PendingRequest(prompt, max_new_tokens, temperature)
+        self._queue.put(request)
+        return request.future
+
+    def generate(self, prompt: str, max_new_tokens: int = 400, temperature: float = 0.7) -> str:
+        """Soumet un prompt et attend son résultat"""
+        return self.submit(prompt, max_new_tokens, temperature).result()
+
+    def _collect_batch(self) -> List[_PendingRequest]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.temperature, []).append(request)
+
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                for request in batch:
+                    self._queue_latencies.append(started - request.enqueued_at)
+
+            for temperature, requests in groups.items():
+                self._process(requests, temperature)
+
+    def _process(self, requests: List[_PendingRequest], temperature: float):
+        try:
+            if len(requests) == 1:
+                # Lot d'un seul prompt: chemin avec cache de préfixe
+                request = requests[0]
+                texts = [request.context.run(
+                    self.engine.generate,
+                    request.prompt,
+                    max_new_tokens=request.max_new_tokens,
+                    temperature=temperature,
+                    prefix=self.prefix,
+                )]
+            else:
+                # Mesures enregistrées dans le contexte de chaque requête
+                texts = self.engine.generate_batch(
+                    [r.prompt for r in requests],
+                    max_new_tokens=[r.max_new_tokens for r in requests],
+                    temperature=temperature,
+                    contexts=[r.context for r in requests],
+                )
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return
+
+        with self._lock:
+            self._processed += len(requests)
+        for request, text in zip(requests, texts):
+            request.future.set_result(text)
+
+    def stats(self) -> dict:
+        """
+        Statistiques du scheduler.
+
+        Returns:
+            Profondeur de file, histogramme des tailles de lot et latence
+            d'attente en file (moyenne, p50, p95, max en ms, sur les
+            LATENCY_WINDOW dernières requêtes)
+        """
+        with self._lock:
+            latencies = sorted(self._queue_latencies)
+            histogram = dict(sorted(self._batch_sizes.items()))
+            processed = self._processed
+
+        def _percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+
+        return {
+            "queue_depth": self._queue.qsize(),
+            "processed": processed,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batch_size_histogram": histogram,
+            "queue_latency_ms": {
+                "avg": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+                "p50": _percentile(0.50),
+                "p95": _percentile(0.95),
+                "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            },
+        }
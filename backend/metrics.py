@@ -0,0 +1,245 @@
+"""
+Métriques au format d'exposition Prometheus (texte 0.0.4).
+
+Compteurs, jauges et histogrammes étiquetés, sans dépendance externe,
+exposés par la route /metrics. Les étiquettes `route` et `backend` de la
+requête en cours sont portées par des ContextVar: elles suivent la requête
+dans son thread (Flask) ou sa tâche (ASGI) sans être passées à chaque appel.
+
+Métriques FitBox:
+- fitbox_requests_total / fitbox_request_duration_seconds: par route HTTP
+- fitbox_stage_duration_seconds: par étape (calculate_profile,
+  create_prompt, tokenize, generate, ollama_http, prefill, decode,
+  postprocess)
+- fitbox_tokens_total: tokens du prompt (in) et générés (out)
+- fitbox_tokens_per_second: débit de la dernière génération
+- fitbox_errors_total: erreurs par route, backend et type
+- fitbox_prompt_tokens: taille des prompts assemblés (budget de tokens)
+- fitbox_prompt_history_turns_total: échanges d'historique gardés,
+  tronqués ou abandonnés pour tenir dans le budget
+"""
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Route et backend (ollama / local) de la requête en cours
+current_route = contextvars.ContextVar("fitbox_route", default="none")
+current_backend = contextvars.ContextVar("fitbox_backend", default="none")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base commune: nom, aide, étiquettes et valeurs par combinaison d'étiquettes"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: étiquettes attendues {self.labelnames}, reçues {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Compteur monotone"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Un compteur ne peut pas diminuer")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Valeur instantanée"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels) -> Optional[float]:
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """Histogramme cumulatif (buckets `le`, somme et nombre d'observations)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{self._labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+
+class Registry:
+    """Ensemble de métriques rendu d'un bloc par /metrics"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "fitbox_requests_total", "Requêtes HTTP traitées", ("route", "method", "status")))
+REQUEST_DURATION = REGISTRY.register(Histogram(
+    "fitbox_request_duration_seconds", "Durée des requêtes HTTP", ("route", "method")))
+STAGE_DURATION = REGISTRY.register(Histogram(
+    "fitbox_stage_duration_seconds", "Durée de chaque étape du traitement", ("stage", "route", "backend")))
+TOKENS = REGISTRY.register(Counter(
+    "fitbox_tokens_total", "Tokens du prompt (in) et générés (out)", ("direction", "route", "backend")))
+TOKENS_PER_SECOND = REGISTRY.register(Gauge(
+    "fitbox_tokens_per_second", "Débit de génération de la dernière requête", ("route", "backend")))
+ERRORS = REGISTRY.register(Counter(
+    "fitbox_errors_total", "Erreurs par route, backend et type", ("route", "backend", "kind")))
+PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "fitbox_prompt_tokens", "Tokens des prompts assemblés", ("route",),
+    buckets=(64, 128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192)))
+PROMPT_HISTORY_TURNS = REGISTRY.register(Counter(
+    "fitbox_prompt_history_turns_total", "Échanges d'historique par sort (kept, truncated, dropped)", ("route", "outcome")))
+PROMPT_OVER_BUDGET = REGISTRY.register(Counter(
+    "fitbox_prompt_over_budget_total", "Prompts dépassant le budget (profil seul trop long)", ("route",)))
+
+
+def observe_stage(stage: str, seconds: float, backend: Optional[str] = None):
+    """Enregistre la durée d'une étape pour la route et le backend courants"""
+    STAGE_DURATION.observe(seconds, stage=stage, route=current_route.get(),
+                           backend=backend or current_backend.get())
+
+
+@contextmanager
+def stage(name: str, backend: Optional[str] = None) -> Iterator[None]:
+    """Chronomètre le bloc comme étape `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start, backend)
+
+
+def record_tokens(tokens_in: Optional[int], tokens_out: Optional[int], generate_seconds: Optional[float] = None,
+                  backend: Optional[str] = None):
+    """Compte les tokens d'une génération et met à jour le débit (tokens/s)"""
+    labels = dict(route=current_route.get(), backend=backend or current_backend.get())
+    if tokens_in:
+        TOKENS.inc(tokens_in, direction="in", **labels)
+    if tokens_out:
+        TOKENS.inc(tokens_out, direction="out", **labels)
+        if generate_seconds:
+            TOKENS_PER_SECOND.set(tokens_out / generate_seconds, **labels)
+
+
+def record_error(kind: str, backend: Optional[str] = None):
+    ERRORS.inc(route=current_route.get(), backend=backend or current_backend.get(), kind=kind)
+
+
+def record_prompt(report: dict):
+    """Enregistre la taille d'un prompt et le sort de son historique (rapport de build_prompt)"""
+    route = current_route.get()
+    PROMPT_TOKENS.observe(report["prompt_tokens"], route=route)
+    for outcome in ("kept", "truncated", "dropped"):
+        if report[f"history_{outcome}"]:
+            PROMPT_HISTORY_TURNS.inc(report[f"history_{outcome}"], route=route, outcome=outcome)
+    if report.get("over_budget"):
+        PROMPT_OVER_BUDGET.inc(route=route)
@@ -0,0 +1,175 @@
+"""
+Lecture incrémentale des réponses NDJSON d'Ollama.
+
+Ollama renvoie (par défaut) un objet JSON par ligne au fil de la
+génération; certains proxys concatènent les objets sans saut de ligne
+(`}{`) et un objet peut être coupé entre deux paquets réseau.
+NDJSONDecoder décode les objets dès qu'ils sont complets, sans attendre la
+fin de la réponse ni conserver le texte brut déjà traité.
+"""
+
+import codecs
+import json
+from typing import Any, Iterable, List, Optional, Tuple, Union
+
+_WHITESPACE = " \t\r\n"
+
+
+class NDJSONDecoder:
+    """
+    Décodeur incrémental d'objets JSON concaténés.
+
+    feed() accepte des morceaux bytes ou str arbitrairement découpés et
+    retourne les objets complets. Une ligne dont l'erreur de syntaxe se
+    situe avant son saut de ligne est ignorée (comptée dans `skipped`).
+    """
+
+    # Taille maximale d'un fragment sans fin de ligne ni objet décodable
+    MAX_PENDING = 1 << 20
+    # Texte invalide conservé pour les messages d'erreur
+    SNIPPET_SIZE = 2000
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._buffer = ""
+        self.objects = 0
+        self.skipped = 0
+        self.snippet = ""
+
+    def _skip(self, text: str):
+        self.skipped += 1
+        if len(self.snippet) < self.SNIPPET_SIZE:
+            self.snippet = (self.snippet + text)[:self.SNIPPET_SIZE]
+
+    def feed(self, chunk: Union[bytes, str]) -> List[Any]:
+        """Ajoute un morceau et retourne les objets désormais complets"""
+        if isinstance(chunk, bytes):
+            chunk = self._utf8.decode(chunk)
+        buffer = self._buffer + chunk
+        objects = []
+        pos = 0
+        end = len(buffer)
+
+        while True:
+            while pos < end and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos == end:
+                break
+            try:
+                obj, pos = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                newline = buffer.find("\n", pos)
+                if newline == -1 or e.pos > newline:
+                    # Erreur en fin de données: objet incomplet (éventuellement
+                    # sur plusieurs lignes), on attend la suite
+                    break
+                self._skip(buffer[pos:newline])
+                pos = newline + 1
+                continue
+            objects.append(obj)
+
+        self._buffer = buffer[pos:]
+        if len(self._buffer) > self.MAX_PENDING:
+            self._skip(self._buffer)
+            self._buffer = ""
+        self.objects += len(objects)
+        return objects
+
+    def close(self) -> List[Any]:
+        """Fin du flux: décode ce qui reste (objet sans saut de ligne final)"""
+        objects = self.feed(self._utf8.decode(b"", final=True) + "\n")
+        if self._buffer.strip():
+            self._skip(self._buffer)
+        self._buffer = ""
+        return objects
+
+
+def extract_text(obj: Any) -> str:
+    """Texte porté par un objet Ollama ('response', 'text' ou output/results[0])"""
+    if not isinstance(obj, dict):
+        return ""
+    if obj.get('response'):
+        return str(obj['response'])
+    if obj.get('text'):
+        return str(obj['text'])
+    out = obj.get('output') or obj.get('results')
+    if isinstance(out, list) and out:
+        first = out[0]
+        if isinstance(first, dict) and 'text' in first:
+            return str(first['text'])
+        if isinstance(first, str):
+            return first
+    return ""
+
+
+class NDJSONText:
+    """
+    Accumule le texte des objets décodés d'une réponse NDJSON.
+
+    Les morceaux de texte sont gardés dans une liste et joints une seule
+    fois; `done` passe à True dès l'objet `"done": true`, conservé dans
+    `final` (compteurs et durées d'Ollama: prompt_eval_count,
+    eval_count, eval_duration...). Le premier champ `error` reçu est
+    gardé dans `error`. Utilisable avec une lecture synchrone
+    (read_ndjson_text) ou asynchrone.
+    """
+
+    def __init__(self, decoder: Optional[NDJSONDecoder] = None):
+        self.decoder = decoder or NDJSONDecoder()
+        self.parts = []
+        self.others = []
+        self.done = False
+        self.final = None
+        self.error = None
+
+    def _consume(self, objects):
+        for obj in objects:
+            text = extract_text(obj)
+            if text:
+                self.parts.append(text)
+            elif not self.others:
+                self.others.append(obj)
+            if isinstance(obj, dict) and obj.get('error') and self.error is None:
+                self.error = obj['error']
+            if isinstance(obj, dict) and obj.get('done'):
+                self.done = True
+                self.final = obj
+                return
+
+    def feed(self, chunk: Union[bytes, str]) -> bool:
+        """Ajoute un morceau brut; retourne True quand la réponse est terminée"""
+        if not self.done:
+            self._consume(self.decoder.feed(chunk))
+        return self.done
+
+    def close(self):
+        """Fin du flux (si l'objet done n'a pas été reçu)"""
+        if not self.done:
+            self._consume(self.decoder.close())
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+
+def read_ndjson_text(chunks: Iterable[Union[bytes, str]], decoder: Optional[NDJSONDecoder] = None) -> Tuple[str, List[Any]]:
+    """
+    Assemble le texte d'une réponse NDJSON lue morceau par morceau.
+
+    La lecture s'arrête dès l'objet `"done": true`.
+
+    Args:
+        chunks: Morceaux bruts (resp.iter_content(...))
+        decoder: Décodeur à utiliser (pour consulter ensuite ses compteurs)
+
+    Returns:
+        Tuple (texte, premiers objets sans texte, au plus 1): le second
+        élément sert à interpréter une réponse non streamée sans champ texte
+    """
+    accumulator = NDJSONText(decoder)
+    for chunk in chunks:
+        if accumulator.feed(chunk):
+            break
+    accumulator.close()
+    return accumulator.text, accumulator.others
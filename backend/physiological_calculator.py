@@ -1,9 +1,11 @@
 
 
-from typing import Dict, Tuple, Optional
+from typing import Dict, Tuple, Optional, Sequence
 from enum import Enum
 import math
 
+import numpy as np
+
 
 # ============================================================================
 # ÉNUMÉRATIONS ET CONSTANTES
@@ -61,6 +63,35 @@ class BMICategory(Enum):
         self.indicator = indicator
 
 
+class BatchErrorCode(Enum):
+    """
+    Codes d'erreur par ligne pour les calculs en lot.
+    
+    NON_SCALAR est vérifié en premier, les autres suivent l'ordre de
+    validation du chemin scalaire.
+    """
+    OK = (0, "")
+    INVALID_WEIGHT = (1, "Poids invalide")
+    INVALID_HEIGHT = (2, "Taille invalide")
+    INVALID_AGE = (3, "Âge invalide")
+    INVALID_GENDER = (4, "Le genre doit être 'male' ou 'female'")
+    INVALID_ACTIVITY_LEVEL = (5, "Niveau d'activité invalide")
+    INVALID_GOAL = (6, "Objectif invalide")
+    NON_SCALAR = (7, "Valeur non scalaire (nombre ou texte attendu)")
+    
+    def __init__(self, code, message):
+        self.code = code
+        self.message = message
+    
+    @classmethod
+    def from_code(cls, code: int) -> "BatchErrorCode":
+        """Retrouve le membre correspondant à un code entier"""
+        for member in cls:
+            if member.code == code:
+                return member
+        raise ValueError(f"Code d'erreur inconnu: {code}")
+
+
 # ============================================================================
 # CLASSE PRINCIPALE DE CALCULS
 # ============================================================================
@@ -389,16 +420,7 @@ class PhysiologicalCalculator:
                 target_calories = tdee + fitness_goal.calorie_adjustment
                 
                 # Calcul des macronutriments (protéines, glucides, lipides)
-                # Ratios standards selon l'objectif
-                if fitness_goal in [FitnessGoal.WEIGHT_LOSS, FitnessGoal.MODERATE_WEIGHT_LOSS]:
-                    # 40% protéines, 30% glucides, 30% lipides
-                    protein_ratio, carbs_ratio, fat_ratio = 0.40, 0.30, 0.30
-                elif fitness_goal in [FitnessGoal.MUSCLE_GAIN, FitnessGoal.BULKING]:
-                    # 30% protéines, 45% glucides, 25% lipides
-                    protein_ratio, carbs_ratio, fat_ratio = 0.30, 0.45, 0.25
-                else:  # MAINTENANCE
-                    # 30% protéines, 40% glucides, 30% lipides
-                    protein_ratio, carbs_ratio, fat_ratio = 0.30, 0.40, 0.30
+                protein_ratio, carbs_ratio, fat_ratio = _macro_ratios(fitness_goal)
                 
                 # Conversion en grammes (1g protéine = 4 cal, 1g glucides = 4 cal, 1g lipides = 9 cal)
                 protein_g = round((target_calories * protein_ratio) / 4, 0)
@@ -501,6 +523,166 @@ class PhysiologicalCalculator:
         
         return profile
     
+    # ========================================================================
+    # CALCULS EN LOT (VECTORISÉS)
+    # ========================================================================
+    
+    @staticmethod
+    def calculate_batch_profiles(
+        age: Sequence[float],
+        gender: Sequence[str],
+        weight: Sequence[float],
+        height: Sequence[float],
+        activity_level: Sequence[str],
+        goal: Sequence[str]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Calcule les métriques physiologiques d'un lot d'utilisateurs.
+        
+        Version vectorisée de calculate_complete_profile: chaque argument est
+        une colonne (liste ou tableau NumPy) de même longueur. Les valeurs
+        produites sont identiques à celles du calcul scalaire, arrondis
+        compris. Une ligne invalide ne lève pas d'exception: elle est
+        signalée dans error_mask / error_codes et ses valeurs valent NaN.
+        
+        Args:
+            age: Âges en années
+            gender: Genres ("male" ou "female")
+            weight: Poids en kg
+            height: Tailles en mètres
+            activity_level: Niveaux d'activité (voir ActivityLevel)
+            goal: Objectifs fitness (voir FitnessGoal)
+            
+        Returns:
+            Dictionnaire de tableaux NumPy: bmi, bmi_category (indice dans
+            BMICategory, -1 si invalide), bmr, tdee, target_calories,
+            protein_g, carbs_g, fat_g, ideal_weight, weight_difference,
+            error_mask (bool) et error_codes (voir BatchErrorCode)
+            
+        Raises:
+            ValueError: Si les colonnes n'ont pas toutes la même longueur
+        """
+        calc = PhysiologicalCalculator
+        
+        # Cellules non scalaires (listes, objets...): ligne en erreur
+        # NON_SCALAR, la cellule est remplacée par None avant la conversion
+        raw_columns = [age, gender, weight, height, activity_level, goal]
+        if len({len(col) for col in raw_columns}) > 1:
+            raise ValueError("Toutes les colonnes doivent être à une dimension et de même longueur")
+        non_scalar = np.zeros(len(age), dtype=bool)
+        for i, values in enumerate(raw_columns):
+            mask = _non_scalar_mask(values)
+            if mask is not None:
+                non_scalar |= mask
+                raw_columns[i] = [None if bad else value for value, bad in zip(values, mask)]
+        age, gender, weight, height, activity_level, goal = raw_columns
+        
+        age_arr = _as_float_column(age)
+        weight_arr = _as_float_column(weight)
+        height_arr = _as_float_column(height)
+        gender_arr = np.char.lower(np.asarray(gender, dtype=str))
+        activity_arr = np.char.lower(np.asarray(activity_level, dtype=str))
+        goal_arr = np.char.lower(np.asarray(goal, dtype=str))
+        
+        columns = (age_arr, gender_arr, weight_arr, height_arr, activity_arr, goal_arr)
+        if any(col.ndim != 1 for col in columns) or len({len(col) for col in columns}) > 1:
+            raise ValueError("Toutes les colonnes doivent être à une dimension et de même longueur")
+        n = len(age_arr)
+        
+        # Résolution des énumérations: une recherche par valeur distincte,
+        # puis diffusion sur toutes les lignes
+        activity_factor = _lookup_column(
+            activity_arr, {level.key: level.factor for level in ActivityLevel}
+        )
+        goal_index = _lookup_column(
+            goal_arr, {g.key: i for i, g in enumerate(FitnessGoal)}
+        )
+        is_male = gender_arr == Gender.MALE.value
+        is_female = gender_arr == Gender.FEMALE.value
+        
+        # Validation vectorisée (même bornes et même ordre que le chemin scalaire)
+        checks = [
+            (non_scalar, BatchErrorCode.NON_SCALAR),
+            (~_in_range(weight_arr, calc.MIN_WEIGHT, calc.MAX_WEIGHT), BatchErrorCode.INVALID_WEIGHT),
+            (~_in_range(height_arr, calc.MIN_HEIGHT, calc.MAX_HEIGHT), BatchErrorCode.INVALID_HEIGHT),
+            (~_in_range(age_arr, calc.MIN_AGE, calc.MAX_AGE), BatchErrorCode.INVALID_AGE),
+            (~(is_male | is_female), BatchErrorCode.INVALID_GENDER),
+            (np.isnan(activity_factor), BatchErrorCode.INVALID_ACTIVITY_LEVEL),
+            (np.isnan(goal_index), BatchErrorCode.INVALID_GOAL),
+        ]
+        error_codes = np.zeros(n, dtype=np.int8)
+        # Parcours inverse: la première erreur rencontrée par le chemin scalaire l'emporte
+        for mask, error in reversed(checks):
+            error_codes[mask] = error.code
+        error_mask = error_codes != BatchErrorCode.OK.code
+        
+        # Les lignes invalides peuvent produire des divisions par zéro: elles
+        # sont écrasées par NaN à la fin, les avertissements sont donc ignorés
+        with np.errstate(all="ignore"):
+            results = calc._compute_batch_metrics(
+                age_arr, weight_arr, height_arr, is_male, activity_factor, goal_index
+            )
+        
+        for key, values in results.items():
+            if key == "bmi_category":
+                values[error_mask] = -1
+            else:
+                values[error_mask] = np.nan
+        
+        results["error_mask"] = error_mask
+        results["error_codes"] = error_codes
+        return results
+    
+    @staticmethod
+    def _compute_batch_metrics(
+        age_arr: np.ndarray,
+        weight_arr: np.ndarray,
+        height_arr: np.ndarray,
+        is_male: np.ndarray,
+        activity_factor: np.ndarray,
+        goal_index: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """Formules de calculate_complete_profile appliquées colonne par colonne"""
+        # IMC et catégorie
+        bmi = _round_like_python(weight_arr / (height_arr ** 2), 2)
+        bmi_bounds = [category.min_bmi for category in BMICategory][1:]
+        bmi_category = np.digitize(bmi, bmi_bounds).astype(np.int8)
+        
+        # BMR (Mifflin-St Jeor) puis TDEE
+        height_cm = height_arr * 100
+        bmr = (10 * weight_arr) + (6.25 * height_cm) - (5 * age_arr) + np.where(is_male, 5, -161)
+        bmr = np.round(bmr, 0)
+        tdee = np.round(bmr * activity_factor, 0)
+        
+        # Calories cibles et macronutriments
+        goals = list(FitnessGoal)
+        safe_goal = np.where(np.isnan(goal_index), 0, goal_index).astype(np.intp)
+        adjustments = np.array([g.calorie_adjustment for g in goals], dtype=np.float64)
+        ratios = np.array([_macro_ratios(g) for g in goals], dtype=np.float64)
+        target_calories = tdee + adjustments[safe_goal]
+        goal_ratios = ratios[safe_goal]
+        protein_g = np.round((target_calories * goal_ratios[:, 0]) / 4, 0)
+        carbs_g = np.round((target_calories * goal_ratios[:, 1]) / 4, 0)
+        fat_g = np.round((target_calories * goal_ratios[:, 2]) / 9, 0)
+        target_calories = np.round(target_calories, 0)
+        
+        # Poids idéal (IMC = 22)
+        ideal_weight = _round_like_python(22 * (height_arr ** 2), 1)
+        weight_difference = _round_like_python(weight_arr - ideal_weight, 1)
+        
+        return {
+            "bmi": bmi,
+            "bmi_category": bmi_category,
+            "bmr": bmr,
+            "tdee": tdee,
+            "target_calories": target_calories,
+            "protein_g": protein_g,
+            "carbs_g": carbs_g,
+            "fat_g": fat_g,
+            "ideal_weight": ideal_weight,
+            "weight_difference": weight_difference,
+        }
+    
     @staticmethod
     def format_profile_report(profile: Dict) -> str:
         """
@@ -572,6 +754,77 @@ class PhysiologicalCalculator:
 # FONCTIONS UTILITAIRES
 # ============================================================================
 
+def _macro_ratios(fitness_goal: FitnessGoal) -> Tuple[float, float, float]:
+    """Ratios standards (protéines, glucides, lipides) selon l'objectif"""
+    if fitness_goal in [FitnessGoal.WEIGHT_LOSS, FitnessGoal.MODERATE_WEIGHT_LOSS]:
+        # 40% protéines, 30% glucides, 30% lipides
+        return 0.40, 0.30, 0.30
+    elif fitness_goal in [FitnessGoal.MUSCLE_GAIN, FitnessGoal.BULKING]:
+        # 30% protéines, 45% glucides, 25% lipides
+        return 0.30, 0.45, 0.25
+    else:  # MAINTENANCE
+        # 30% protéines, 40% glucides, 30% lipides
+        return 0.30, 0.40, 0.30
+
+
+_SCALAR_TYPES = (str, int, float, np.generic, type(None))
+
+
+def _non_scalar_mask(values) -> Optional[np.ndarray]:
+    """Masque des cellules non scalaires d'une colonne, None s'il n'y en a aucune"""
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        return None
+    # Un seul passage en C (type de chaque cellule) dans le cas courant
+    if all(issubclass(t, _SCALAR_TYPES) for t in set(map(type, values))):
+        return None
+    return np.fromiter((not isinstance(v, _SCALAR_TYPES) for v in values), dtype=bool, count=len(values))
+
+
+def _as_float_column(values) -> np.ndarray:
+    """Convertit une colonne en float64; les valeurs non numériques deviennent NaN"""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        converted = []
+        for value in values:
+            try:
+                converted.append(float(value))
+            except (TypeError, ValueError):
+                converted.append(np.nan)
+        return np.asarray(converted, dtype=np.float64)
+
+
+def _in_range(values: np.ndarray, minimum: float, maximum: float) -> np.ndarray:
+    """Masque des valeurs finies comprises dans [minimum, maximum]"""
+    with np.errstate(invalid="ignore"):
+        return np.isfinite(values) & (values >= minimum) & (values <= maximum)
+
+
+def _lookup_column(keys: np.ndarray, mapping: Dict[str, float]) -> np.ndarray:
+    """Associe chaque clé à sa valeur (NaN si absente), une recherche par valeur distincte"""
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    values = np.array([mapping.get(key, np.nan) for key in unique_keys], dtype=np.float64)
+    return values[inverse.reshape(-1)]
+
+
+def _round_like_python(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    Arrondi vectorisé identique à round() de Python.
+    
+    np.round multiplie par 10**ndigits avant d'arrondir, ce qui peut
+    différer de round() pour les valeurs très proches d'une demi-unité:
+    ces rares cas ambigus sont recalculés avec round().
+    """
+    with np.errstate(invalid="ignore"):
+        rounded = np.round(values, ndigits)
+        scaled = values * (10.0 ** ndigits)
+        ambiguous = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    ambiguous &= np.isfinite(values)
+    if ambiguous.any():
+        rounded[ambiguous] = [round(float(v), ndigits) for v in values[ambiguous]]
+    return rounded
+
+
 def get_available_activity_levels() -> list:
     """Retourne la liste des niveaux d'activité disponibles"""
     return [(level.key, level.description) for level in ActivityLevel]
@@ -0,0 +1,126 @@
+"""
+Cache des profils physiologiques.
+
+Un même utilisateur envoie les mêmes données à chaque message d'une
+session: le profil n'est calculé qu'une fois puis partagé entre les
+requêtes. Les profils mis en cache sont immuables (FrozenDict), ce qui
+permet de les partager sans copie.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+
+class FrozenDict(dict):
+    """Dictionnaire en lecture seule (reste sérialisable par json/jsonify)"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Profil en lecture seule (partagé par le cache)")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):
+        return id(self)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def freeze(value):
+    """Rend récursivement une structure immuable (dict -> FrozenDict, list -> tuple)"""
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+PROFILE_FIELDS = ('age', 'gender', 'weight', 'height', 'activity_level', 'goal')
+PROFILE_DEFAULTS = {'activity_level': 'moderately_active', 'goal': 'maintenance'}
+
+
+def profile_key(user_data: dict) -> Optional[Tuple[Hashable, ...]]:
+    """
+    Clé canonique (age, gender, weight, height, activity_level, goal).
+
+    Les valeurs par défaut sont appliquées et l'ordre des champs ne compte
+    plus. Le type des nombres fait partie de la clé: 75 et 75.0 sont
+    renvoyés tels quels dans user_info, ils ne doivent pas partager
+    d'entrée.
+
+    Returns:
+        Tuple hashable, ou None si une valeur ne peut pas servir de clé
+    """
+    key = []
+    for field in PROFILE_FIELDS:
+        value = user_data.get(field, PROFILE_DEFAULTS.get(field))
+        if not isinstance(value, (str, int, float)) or value != value:
+            return None
+        key.append((type(value).__name__, value))
+    return tuple(key)
+
+
+class ProfileCache:
+    """Cache LRU borné des profils, avec compteurs de hits/misses"""
+
+    def __init__(self, max_entries: int = 4096):
+        """
+        Initialise le cache.
+
+        Args:
+            max_entries: Nombre de profils conservés (0 désactive le cache)
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, FrozenDict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_compute(self, user_data: dict, compute: Callable[[dict], dict]) -> FrozenDict:
+        """
+        Retourne le profil en cache, ou le calcule avec compute(user_data).
+
+        Les exceptions de compute (données invalides) sont propagées et
+        rien n'est mis en cache.
+        """
+        key = profile_key(user_data) if self.max_entries > 0 else None
+        if key is not None:
+            with self._lock:
+                profile = self._entries.get(key)
+                if profile is not None:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return profile
+
+        profile = freeze(compute(user_data))
+
+        with self._lock:
+            self._misses += 1
+            if key is not None:
+                self._entries[key] = profile
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return profile
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Taille, hits, misses et taux de hit du cache"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0,
+            }
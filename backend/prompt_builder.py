@@ -0,0 +1,174 @@
+"""
+Assemblage du prompt sous un budget de tokens.
+
+Le profil, le message et le gabarit (préambule système, balises) sont
+toujours inclus; l'historique de conversation occupe la place restante.
+Les échanges sont repris du plus récent au plus ancien: un échange qui ne
+tient plus entier est tronqué (réponse de l'assistant coupée au token près),
+les plus anciens sont abandonnés. Si le profil et le message dépassent seuls
+le budget, le message est tronqué; si le profil dépasse seul le budget, le
+prompt le dépasse aussi et le rapport le signale (over_budget).
+
+Les tokens sont comptés avec le tokenizer actif quand il y en a un
+(modèle local chargé ou FITBOX_PROMPT_TOKENIZER), sinon estimés à
+CHARS_PER_TOKEN caractères par token (estimation prudente pour le français).
+"""
+
+import math
+from typing import Callable, List, Optional, Tuple
+
+HISTORY_HEADER = "\n\nHISTORIQUE DE CONVERSATION:\n"
+TRUNCATION_MARK = "…"
+
+
+def format_turn(user: str, assistant: str) -> str:
+    """Un échange de l'historique, tel qu'il apparaît dans le prompt"""
+    return f"User: {user}\nAssistant: {assistant}\n\n"
+
+
+class TokenCounter:
+    """Comptage et troncature en tokens (tokenizer Hugging Face ou estimation)"""
+
+    CHARS_PER_TOKEN = 3
+
+    def __init__(self, tokenizer=None):
+        self.tokenizer = tokenizer
+
+    @property
+    def exact(self) -> bool:
+        return self.tokenizer is not None
+
+    def _encode(self, text: str) -> List[int]:
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def count(self, text: str) -> int:
+        """Nombre de tokens de `text`"""
+        if not text:
+            return 0
+        if self.tokenizer is None:
+            return math.ceil(len(text) / self.CHARS_PER_TOKEN)
+        return len(self._encode(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Début de `text` limité à max_tokens tokens"""
+        if max_tokens <= 0:
+            return ""
+        if self.tokenizer is None:
+            return text[:max_tokens * self.CHARS_PER_TOKEN]
+        ids = self._encode(text)
+        if len(ids) <= max_tokens:
+            return text
+        return self.tokenizer.decode(ids[:max_tokens], skip_special_tokens=True)
+
+
+def fit_history(history: list, counter: TokenCounter, available: int, min_turn_tokens: int = 32) -> Tuple[str, dict]:
+    """
+    Texte d'historique tenant dans `available` tokens.
+
+    Args:
+        history: Échanges {'user', 'assistant'}, du plus ancien au plus récent
+        counter: Compteur de tokens
+        available: Tokens disponibles pour l'historique (en-tête compris)
+        min_turn_tokens: En dessous de cette place restante, un échange
+            n'est pas tronqué mais abandonné
+
+    Returns:
+        Tuple (texte, {'kept', 'truncated', 'dropped'})
+    """
+    report = {"kept": 0, "truncated": 0, "dropped": 0}
+    if not history:
+        return "", report
+
+    remaining = available - counter.count(HISTORY_HEADER)
+    turns = []
+    for index in range(len(history) - 1, -1, -1):
+        item = history[index]
+        turn = format_turn(item['user'], item['assistant'])
+        cost = counter.count(turn)
+        if cost <= remaining:
+            turns.append(turn)
+            remaining -= cost
+            report["kept"] += 1
+            continue
+
+        # Place pour la question et une partie de la réponse ?
+        base = counter.count(format_turn(item['user'], TRUNCATION_MARK))
+        if remaining - base >= min_turn_tokens:
+            answer = counter.truncate(item['assistant'], remaining - base).rstrip()
+            turns.append(format_turn(item['user'], answer + TRUNCATION_MARK))
+            report["truncated"] += 1
+        # Les échanges plus anciens ne tiennent plus
+        report["dropped"] = index if report["truncated"] else index + 1
+        break
+
+    if not turns:
+        return "", report
+    return HISTORY_HEADER + "".join(reversed(turns)), report
+
+
+def build_prompt(
+    render: Callable[[str, str], str],
+    message: str,
+    history: Optional[list],
+    counter: TokenCounter,
+    budget: int,
+    min_turn_tokens: int = 32
+) -> Tuple[str, dict]:
+    """
+    Assemble un prompt d'au plus `budget` tokens, sauf si la partie fixe
+    (gabarit et profil, message vide) dépasse seule le budget: over_budget
+    est alors vrai dans le rapport.
+
+    Args:
+        render: Fonction (texte d'historique, message) -> prompt complet
+        message: Message de l'utilisateur
+        history: Échanges à reprendre (déjà limités en nombre), ou None
+        counter: Compteur de tokens
+        budget: Nombre maximal de tokens du prompt
+        min_turn_tokens: Voir fit_history
+
+    Returns:
+        Tuple (prompt, rapport): prompt_tokens, budget, exact (tokenizer ou
+        estimation), history_kept/truncated/dropped, message_truncated,
+        over_budget
+    """
+    history = history or []
+    fixed_prompt = render("", message)
+    fixed = counter.count(fixed_prompt)
+    message_truncated = False
+
+    # Profil + message seuls trop longs: le message est coupé, puis recompté
+    # (les jonctions peuvent coûter des tokens) jusqu'à tenir ou être vide
+    while fixed > budget and message:
+        message_tokens = counter.count(message)
+        overflow = max(1, fixed - budget)
+        message = counter.truncate(message, message_tokens - overflow).rstrip()
+        message_truncated = True
+        fixed_prompt = render("", message)
+        fixed = counter.count(fixed_prompt)
+
+    history_text, turns = fit_history(history, counter, budget - fixed, min_turn_tokens)
+    prompt = render(history_text, message) if history_text else fixed_prompt
+    prompt_tokens = counter.count(prompt)
+
+    # Les tokens aux jonctions peuvent différer de la somme des parties:
+    # on retire des échanges anciens tant que le total dépasse
+    while prompt_tokens > budget and history_text:
+        kept = turns["kept"] + turns["truncated"]
+        history = history[len(history) - kept + 1:] if kept > 1 else []
+        history_text, reduced = fit_history(history, counter, budget - fixed, min_turn_tokens)
+        reduced["dropped"] += turns["dropped"] + 1
+        turns = reduced
+        prompt = render(history_text, message) if history_text else fixed_prompt
+        prompt_tokens = counter.count(prompt)
+
+    return prompt, {
+        "prompt_tokens": prompt_tokens,
+        "budget": budget,
+        "exact": counter.exact,
+        "history_kept": turns["kept"],
+        "history_truncated": turns["truncated"],
+        "history_dropped": turns["dropped"],
+        "message_truncated": message_truncated,
+        "over_budget": prompt_tokens > budget,
+    }
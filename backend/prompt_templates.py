@@ -35,6 +35,29 @@ STYLE DE RÉPONSE:
 - Exemples concrets
 - Pas de jargon inutile"""
     
+    # Libellés du contexte utilisateur (construits une seule fois)
+    EXPERIENCE_LABELS = {
+        1: "Débutant",
+        2: "Intermédiaire",
+        3: "Avancé"
+    }
+    
+    GOAL_LABELS = {
+        "weight_loss": "Perte de poids",
+        "moderate_weight_loss": "Perte de poids modérée",
+        "maintenance": "Maintien du poids",
+        "muscle_gain": "Prise de masse musculaire",
+        "bulking": "Prise de masse importante"
+    }
+    
+    ACTIVITY_LABELS = {
+        "sedentary": "Sédentaire",
+        "lightly_active": "Légèrement actif",
+        "moderately_active": "Modérément actif",
+        "very_active": "Très actif",
+        "extra_active": "Extrêmement actif"
+    }
+    
     @staticmethod
     def format_user_context(user_data: dict, profile: dict) -> str:
         """
@@ -49,35 +72,16 @@ STYLE DE RÉPONSE:
         """
         
         # Niveau d'expérience
-        experience_map = {
-            1: "Débutant",
-            2: "Intermédiaire",
-            3: "Avancé"
-        }
         experience = user_data.get('experience_level', 1)
-        experience_label = experience_map.get(experience, "Non spécifié")
+        experience_label = PromptTemplateManager.EXPERIENCE_LABELS.get(experience, "Non spécifié")
         
         # Objectif en français
-        goal_map = {
-            "weight_loss": "Perte de poids",
-            "moderate_weight_loss": "Perte de poids modérée",
-            "maintenance": "Maintien du poids",
-            "muscle_gain": "Prise de masse musculaire",
-            "bulking": "Prise de masse importante"
-        }
         goal = user_data.get('goal', 'maintenance')
-        goal_label = goal_map.get(goal, goal)
+        goal_label = PromptTemplateManager.GOAL_LABELS.get(goal, goal)
         
         # Niveau d'activité
-        activity_map = {
-            "sedentary": "Sédentaire",
-            "lightly_active": "Légèrement actif",
-            "moderately_active": "Modérément actif",
-            "very_active": "Très actif",
-            "extra_active": "Extrêmement actif"
-        }
         activity = user_data.get('activity_level', 'moderately_active')
-        activity_label = activity_map.get(activity, activity)
+        activity_label = PromptTemplateManager.ACTIVITY_LABELS.get(activity, activity)
         
         context = f"""📋 PROFIL UTILISATEUR:
 👤 Informations de base:
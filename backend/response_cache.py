@@ -0,0 +1,169 @@
+"""
+Cache des réponses générées.
+
+Les programmes d'entraînement et plans nutritionnels dépendent uniquement
+du prompt (profil + objectif) et des paramètres de génération: deux membres
+au profil identique reçoivent la même réponse au lieu de payer deux
+générations.
+
+Deux niveaux:
+- mémoire: LRU borné avec TTL
+- disque (optionnel): table SQLite, conservée après redémarrage et
+  partagée entre workers
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+def response_key(prompt: str, model: str, temperature: float, max_tokens: int) -> str:
+    """Clé SHA-256 du prompt et des paramètres de génération"""
+    raw = json.dumps([model, temperature, max_tokens, prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Cache LRU + TTL des réponses, avec niveau disque SQLite optionnel"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 86400,
+        path: Optional[str] = None,
+        max_disk_entries: int = 100000
+    ):
+        """
+        Initialise le cache.
+
+        Args:
+            max_entries: Réponses conservées en mémoire
+            ttl_seconds: Durée de validité d'une réponse
+            path: Fichier SQLite du niveau disque (None = mémoire seule)
+            max_disk_entries: Réponses conservées sur disque
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = str(path) if path else None
+        self.max_disk_entries = max_disk_entries
+
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._bypassed = 0
+
+        if self.path:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY,"
+                    " response TEXT NOT NULL,"
+                    " expires_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_expires ON responses(expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connexion SQLite propre au thread courant"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, expires_at: float, response: str):
+        """Ajoute une entrée au niveau mémoire (appelé sous verrou)"""
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Retourne la réponse en cache, ou None si absente ou expirée"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        if self.path:
+            row = self._connection().execute(
+                "SELECT response, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is not None:
+                with self._lock:
+                    self._hits += 1
+                    self._disk_hits += 1
+                    self._remember(key, row[1], row[0])
+                return row[0]
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, key: str, response: str):
+        """Enregistre une réponse dans les deux niveaux"""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, response)
+
+        if self.path:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, expires_at) VALUES (?, ?, ?)",
+                    (key, response, expires_at)
+                )
+                # Les entrées expirées puis les plus proches de l'expiration
+                # (donc les plus anciennes) sont supprimées au-delà de la limite
+                conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses"
+                    " ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,)
+                )
+
+    def record_bypass(self):
+        """Comptabilise une requête ayant contourné le cache"""
+        with self._lock:
+            self._bypassed += 1
+
+    def clear(self):
+        """Vide les deux niveaux"""
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict:
+        """Taille, hits (dont disque), misses, contournements et taux de hit"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_path": self.path,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "bypassed": self._bypassed,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
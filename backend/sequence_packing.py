@@ -0,0 +1,196 @@
+"""
+Packing de séquences et padding dynamique pour le fine-tuning.
+
+Les exemples générés font quelques centaines de tokens: paddés à 2048, la
+majorité du calcul part dans des tokens de padding. Deux alternatives:
+
+- packing: les exemples (terminés par EOS) sont concaténés dans des
+  séquences de max_length tokens. Les position_ids repartent de 0 à chaque
+  exemple et aucun attention_mask n'est fourni: avec flash_attention_2
+  (setup_model_for_training), transformers en déduit les frontières et un
+  exemple ne voit pas les précédents (avec une autre implémentation de
+  l'attention, seuls les position_ids et les labels sont séparés). Le
+  premier token de chaque exemple n'a pas de label (pas de prédiction à
+  travers une frontière).
+- padding dynamique: chaque batch est paddé à sa plus longue séquence
+  (DynamicPaddingCollator), les batches étant groupés par longueur
+  (group_by_length du Trainer) pour limiter l'écart.
+
+padding_report() mesure, pour une liste de longueurs d'exemples, les tokens
+utiles par pas et le taux de padding de chaque mode.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+IGNORE_INDEX = -100
+
+
+def pack_sequences(
+    sequences: Sequence[Sequence[int]],
+    max_length: int,
+    eos_token_id: Optional[int] = None,
+    pad_token_id: int = 0
+) -> Dict[str, List[List[int]]]:
+    """
+    Concatène des exemples tokenisés en séquences d'au plus max_length tokens.
+
+    Les exemples sont pris dans l'ordre; un exemple qui ne tient plus dans la
+    séquence en cours en commence une nouvelle, un exemple plus long que
+    max_length est tronqué. La fin d'une séquence incomplète est paddée.
+
+    Args:
+        sequences: input_ids de chaque exemple
+        max_length: Longueur des séquences produites
+        eos_token_id: Ajouté à la fin de chaque exemple s'il n'y est pas déjà
+        pad_token_id: Token de padding
+
+    Returns:
+        Colonnes input_ids, labels et position_ids (listes de longueur
+        max_length); le padding final forme un segment sans labels
+    """
+    packed = {"input_ids": [], "labels": [], "position_ids": []}
+    current = {key: [] for key in packed}
+
+    def flush():
+        if not current["input_ids"]:
+            return
+        pad = max_length - len(current["input_ids"])
+        packed["input_ids"].append(current["input_ids"] + [pad_token_id] * pad)
+        packed["labels"].append(current["labels"] + [IGNORE_INDEX] * pad)
+        packed["position_ids"].append(current["position_ids"] + list(range(pad)))
+        for values in current.values():
+            values.clear()
+
+    for ids in sequences:
+        ids = list(ids)
+        if eos_token_id is not None and (not ids or ids[-1] != eos_token_id):
+            ids.append(eos_token_id)
+        ids = ids[:max_length]
+        if not ids:
+            continue
+        if len(current["input_ids"]) + len(ids) > max_length:
+            flush()
+        current["input_ids"].extend(ids)
+        current["labels"].extend([IGNORE_INDEX] + ids[1:])
+        current["position_ids"].extend(range(len(ids)))
+    flush()
+    return packed
+
+
+class DynamicPaddingCollator:
+    """
+    Collator qui padde chaque batch à sa plus longue séquence.
+
+    Sans colonne labels, les labels sont les input_ids (IGNORE_INDEX sur le
+    padding: l'EOS réel reste appris même si pad_token == eos_token, ce que
+    DataCollatorForLanguageModeling ne permet pas). Les séquences packées
+    (position_ids, toutes de même longueur) passent telles quelles, sans
+    attention_mask.
+    """
+
+    def __init__(self, pad_token_id: int, pad_to_multiple_of: Optional[int] = 8):
+        self.pad_token_id = pad_token_id
+        self.pad_to_multiple_of = pad_to_multiple_of
+
+    def __call__(self, features: List[dict]) -> dict:
+        import torch
+
+        length = max(len(f["input_ids"]) for f in features)
+        if self.pad_to_multiple_of:
+            length = -(-length // self.pad_to_multiple_of) * self.pad_to_multiple_of
+
+        def pad(values, fill):
+            values = list(values)
+            return values + [fill] * (length - len(values))
+
+        batch = {
+            "input_ids": [pad(f["input_ids"], self.pad_token_id) for f in features],
+            "labels": [
+                pad(f["labels"], IGNORE_INDEX) if "labels" in f
+                else pad(f["input_ids"], IGNORE_INDEX)
+                for f in features
+            ],
+        }
+        if all("position_ids" in f for f in features):
+            batch["position_ids"] = [pad(f["position_ids"], 0) for f in features]
+        else:
+            batch["attention_mask"] = [pad(f.get("attention_mask") or [1] * len(f["input_ids"]), 0) for f in features]
+        return {key: torch.tensor(values, dtype=torch.long) for key, values in batch.items()}
+
+
+def length_grouped_batches(lengths: Sequence[int], batch_size: int, seed: int = 42, mega_batch_mult: int = 50) -> List[List[int]]:
+    """
+    Indices des batches formés comme le LengthGroupedSampler du Trainer:
+    permutation aléatoire, méga-batches de mega_batch_mult × batch_size
+    triés par longueur décroissante puis découpés.
+    """
+    indices = np.random.default_rng(seed).permutation(len(lengths))
+    lengths = np.asarray(lengths)
+    mega = mega_batch_mult * batch_size
+    batches = []
+    for start in range(0, len(indices), mega):
+        group = indices[start:start + mega]
+        group = group[np.argsort(-lengths[group], kind="stable")]
+        batches.extend(group[i:i + batch_size].tolist() for i in range(0, len(group), batch_size))
+    return batches
+
+
+def padding_report(
+    lengths: Sequence[int],
+    max_length: int,
+    batch_size: int,
+    pad_to_multiple_of: Optional[int] = 8
+) -> Dict[str, dict]:
+    """
+    Tokens utiles par pas et taux de padding de chaque mode.
+
+    Args:
+        lengths: Longueur (tokens, EOS compris) de chaque exemple
+        max_length: Longueur maximale des séquences
+        batch_size: Séquences par pas (par device)
+        pad_to_multiple_of: Arrondi du padding dynamique
+
+    Returns:
+        {mode: {steps, tokens_per_step, padding_ratio}} pour max_length,
+        dynamic et packing
+    """
+    lengths = [min(int(n), max_length) for n in lengths]
+    real = sum(lengths)
+
+    def summary(steps: int, processed: int) -> dict:
+        return {
+            "steps": steps,
+            "tokens_per_step": round(real / steps, 1) if steps else 0.0,
+            "padding_ratio": round(1 - real / processed, 4) if processed else 0.0,
+        }
+
+    report = {"max_length": summary(-(-len(lengths) // batch_size), len(lengths) * max_length)}
+
+    processed = 0
+    batches = length_grouped_batches(lengths, batch_size)
+    for batch in batches:
+        longest = max(lengths[i] for i in batch)
+        if pad_to_multiple_of:
+            longest = min(max_length, -(-longest // pad_to_multiple_of) * pad_to_multiple_of)
+        processed += longest * len(batch)
+    report["dynamic"] = summary(len(batches), processed)
+
+    rows, used = 0, max_length
+    for n in lengths:
+        if used + n > max_length:
+            rows, used = rows + 1, 0
+        used += n
+    report["packing"] = summary(-(-rows // batch_size), rows * max_length)
+    return report
+
+
+def format_padding_report(report: Dict[str, dict]) -> str:
+    """Tableau lisible de padding_report()"""
+    lines = [f"   {'mode':<12}{'pas':>10}{'tokens/pas':>14}{'padding':>10}"]
+    for mode, stats in report.items():
+        lines.append(
+            f"   {mode:<12}{stats['steps']:>10}{stats['tokens_per_step']:>14.1f}{stats['padding_ratio'] * 100:>9.1f}%"
+        )
+    return "\n".join(lines)
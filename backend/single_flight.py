@@ -0,0 +1,119 @@
+"""
+Regroupement (single-flight) des générations identiques en cours.
+
+Quand plusieurs requêtes arrivent en même temps avec le même prompt et les
+mêmes paramètres (typiquement les membres d'un même cours, au profil
+identique), une seule génération est lancée: les autres attendent son
+résultat et le partagent. Une fois la génération terminée, la clé est
+libérée; la réutilisation au-delà relève du cache de réponses.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _Call:
+    """Génération en cours partagée par les appelants d'une même clé"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Counters:
+    """Compteurs communs aux deux variantes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Any] = {}
+        self._total = 0
+        self._executions = 0
+        self._deduplicated = 0
+
+    def _record(self, shared: bool):
+        with self._lock:
+            self._total += 1
+            if shared:
+                self._deduplicated += 1
+            else:
+                self._executions += 1
+
+    def stats(self) -> dict:
+        """Appels, générations réellement lancées et appels dédupliqués"""
+        with self._lock:
+            return {
+                "calls": self._total,
+                "executions": self._executions,
+                "deduplicated": self._deduplicated,
+                "in_flight": len(self._in_flight),
+                "dedup_ratio": round(self._deduplicated / self._total, 4) if self._total else 0.0,
+            }
+
+
+class SingleFlight(_Counters):
+    """Single-flight pour du code synchrone (threads)"""
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Exécute fn() une seule fois pour tous les appels concurrents de même clé.
+
+        Une exception levée par fn() est relevée chez chacun des appelants.
+
+        Returns:
+            Tuple (résultat, True si le résultat vient d'un autre appel)
+        """
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._in_flight[key] = call
+        self._record(not leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
+        return call.result, False
+
+
+class AsyncSingleFlight(_Counters):
+    """Single-flight pour des coroutines (une seule boucle d'événements)"""
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Équivalent asynchrone de SingleFlight.do (fn retourne une coroutine).
+
+        La génération tourne dans sa propre tâche: l'annulation d'un appelant
+        (client déconnecté) ne l'interrompt pas pour les autres.
+        """
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+        self._record(shared)
+        return await asyncio.shield(task), shared
+
+    def _finished(self, key: Hashable, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Exception lue: pas d'avertissement si plus personne n'attend
+            task.exception()
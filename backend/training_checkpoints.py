@@ -0,0 +1,119 @@
+"""
+Sélection du checkpoint de reprise du fine-tuning.
+
+Chaque exécution de FitBoxFineTuner.train porte un identifiant (run_id),
+écrit dans chaque checkpoint qu'elle sauvegarde (fitbox_run.json) puis dans
+training_metadata.json quand elle se termine; ses checkpoints sont alors
+supprimés. La reprise se décide sur ce marqueur et non sur les numéros de
+pas: le checkpoint le plus numéroté peut venir d'une exécution plus
+ancienne (et terminée) que celle qui a été interrompue.
+
+Les checkpoints d'autres exécutions (terminées, sans marqueur, ou écartées
+par resume=False) sont déplacés dans stale_checkpoints/ au démarrage: la
+rotation du Trainer (save_total_limit, par numéro de pas) supprimerait
+sinon les checkpoints de la nouvelle exécution.
+"""
+
+import json
+import re
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+RUN_MARKER = "fitbox_run.json"
+METADATA_FILE = "training_metadata.json"
+STALE_DIR = "stale_checkpoints"
+# Même nommage que le Trainer (PREFIX_CHECKPOINT_DIR)
+_CHECKPOINT = re.compile(r"^checkpoint-(\d+)$")
+
+
+def new_run_id() -> str:
+    """Identifiant d'exécution (horodatage + suffixe aléatoire)"""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def list_checkpoints(output_dir: str) -> List[Tuple[int, Path]]:
+    """(pas, dossier) des checkpoint-* de output_dir, par pas croissant"""
+    output_dir = Path(output_dir)
+    if not output_dir.is_dir():
+        return []
+    checkpoints = []
+    for path in output_dir.iterdir():
+        match = _CHECKPOINT.match(path.name)
+        if match and path.is_dir():
+            checkpoints.append((int(match.group(1)), path))
+    return sorted(checkpoints)
+
+
+def mark_checkpoint(checkpoint: str, run_id: str):
+    """Écrit le marqueur d'exécution dans un checkpoint"""
+    with open(Path(checkpoint) / RUN_MARKER, "w") as f:
+        json.dump({"run_id": run_id, "saved_at": datetime.now().isoformat()}, f)
+
+
+def checkpoint_run_id(checkpoint: str) -> Optional[str]:
+    """run_id d'un checkpoint, None s'il n'a pas de marqueur lisible"""
+    try:
+        with open(Path(checkpoint) / RUN_MARKER) as f:
+            return json.load(f).get("run_id")
+    except (OSError, ValueError):
+        return None
+
+
+def finished_run_ids(output_dir: str) -> Set[str]:
+    """Exécutions terminées (run_id de training_metadata.json)"""
+    try:
+        with open(Path(output_dir) / METADATA_FILE) as f:
+            run_id = json.load(f).get("run_id")
+    except (OSError, ValueError):
+        return set()
+    return {run_id} if run_id else set()
+
+
+def find_resume_checkpoint(output_dir: str) -> Optional[Tuple[str, str]]:
+    """
+    Checkpoint d'une exécution interrompue à reprendre.
+
+    Returns:
+        (dossier du checkpoint, run_id) pour le pas le plus avancé d'une
+        exécution marquée et non terminée, ou None
+    """
+    finished = finished_run_ids(output_dir)
+    for _, path in reversed(list_checkpoints(output_dir)):
+        run_id = checkpoint_run_id(path)
+        if run_id is not None and run_id not in finished:
+            return str(path), run_id
+    return None
+
+
+def set_aside_checkpoints(output_dir: str, keep_run_id: Optional[str] = None) -> List[Path]:
+    """
+    Déplace dans stale_checkpoints/<run_id>/ les checkpoints des autres exécutions.
+
+    Returns:
+        Nouveaux emplacements des checkpoints déplacés
+    """
+    moved = []
+    for _, path in list_checkpoints(output_dir):
+        run_id = checkpoint_run_id(path)
+        if keep_run_id is not None and run_id == keep_run_id:
+            continue
+        target = Path(output_dir) / STALE_DIR / (run_id or "unmarked") / path.name
+        if target.exists():
+            shutil.rmtree(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        path.rename(target)
+        moved.append(target)
+    return moved
+
+
+def remove_run_checkpoints(output_dir: str, run_id: str) -> int:
+    """Supprime les checkpoints d'une exécution terminée; retourne leur nombre"""
+    removed = 0
+    for _, path in list_checkpoints(output_dir):
+        if checkpoint_run_id(path) == run_id:
+            shutil.rmtree(path)
+            removed += 1
+    return removed
@@ -0,0 +1,459 @@
+"""
+Génération des exemples d'entraînement à grande échelle.
+
+Pipeline utilisé par FitBoxFineTuner.prepare_training_data:
+1. le CSV (ou Parquet) est lu par blocs (chunk_rows lignes)
+2. les profils physiologiques d'un bloc sont calculés en colonnes
+   (PhysiologicalCalculator.calculate_batch_profiles), les types
+   d'entraînement, niveaux d'activité et objectifs sont mappés par
+   opérations sur tableaux
+3. les textes (3 exemples par ligne) sont rendus par un pool de processus
+4. les exemples sont écrits au fur et à mesure dans des fichiers JSONL
+   découpés (shards) au lieu d'une unique liste Python, ou fournis un par
+   un à un IterableDataset (iter_examples, mode streaming)
+
+Les textes sont identiques à ceux de l'ancienne boucle df.iterrows(), dans
+le même ordre; les lignes invalides sont ignorées de la même façon.
+
+Usage (depuis la racine du dépôt):
+    python -m backend.training_data data/fitness_data_cleaned.csv data/training_shards --workers 4
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.physiological_calculator import BMICategory, PhysiologicalCalculator
+
+# Colonnes du CSV reprises dans les textes, dans l'ordre attendu par format_examples
+TEXT_COLUMNS = [
+    'Age', 'Weight (kg)', 'Height (m)', 'Experience_Level', 'Workout_Frequency (days/week)',
+    'Session_Duration (hours)', 'Calories_Burned', 'Water_Intake (liters)', 'Avg_BPM',
+    'Resting_BPM', 'Fat_Percentage'
+]
+
+BMI_DESCRIPTIONS = [category.description for category in BMICategory]
+
+
+def map_workout_types(values) -> np.ndarray:
+    """Workout_Type numérique (0.0 à 1.0) -> cardio / hiit / strength / flexibility (mixed si NaN)"""
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        labels = np.select(
+            [values <= 0.25, values <= 0.5, values <= 0.75],
+            ["cardio", "hiit", "strength"],
+            default="flexibility"
+        )
+    return np.where(np.isnan(values), "mixed", labels).astype(object)
+
+
+def map_activity_levels(frequencies) -> np.ndarray:
+    """Fréquence d'entraînement (jours/semaine) -> niveau d'activité"""
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        return np.select(
+            [frequencies <= 2, frequencies <= 4],
+            ["sedentary", "moderately_active"],
+            default="very_active"
+        ).astype(object)
+
+
+def map_goals(workout_types) -> np.ndarray:
+    """Type d'entraînement -> objectif (cardio/hiit: perte de poids, strength: prise de masse)"""
+    lowered = pd.Series(workout_types, dtype=object).astype(str).str.lower()
+    loss = lowered.str.contains("cardio", regex=False) | lowered.str.contains("hiit", regex=False)
+    gain = lowered.str.contains("strength", regex=False)
+    return np.select([loss.to_numpy(), gain.to_numpy()], ["weight_loss", "muscle_gain"], default="maintenance").astype(object)
+
+
+def gender_label(gender) -> str:
+    """Genre affiché dans les exemples (0 -> Male, 1 -> Female pour les valeurs numériques)"""
+    if isinstance(gender, (int, float)):
+        return "Male" if int(gender) == 0 else "Female"
+    return str(gender).capitalize()
+
+
+def format_examples(
+    age, gender, weight, height, experience, frequency, duration, calories_burned,
+    water, avg_bpm, resting_bpm, fat_percentage,
+    workout_type: str, bmi, bmi_category: str, target_calories, protein_g, carbs_g, fat_g
+) -> Tuple[str, str, str]:
+    """
+    Les trois exemples d'une ligne: programme d'entraînement, plan nutritionnel
+    et conseils généraux.
+
+    Returns:
+        Tuple (workout, nutrition, general)
+    """
+    user_info = f"""Âge: {age} ans
+Genre: {gender_label(gender)}
+Poids: {weight} kg
+Taille: {height} m
+IMC: {bmi}
+Niveau: {'Débutant' if experience == 1 else 'Intermédiaire' if experience == 2 else 'Avancé'}"""
+
+    # Exemple 1: Programme d'entraînement
+    workout_prompt = f"""<|system|>
+Tu es FitBox, un coach sportif expert. Fournis des programmes personnalisés.<|end|>
+<|user|>
+{user_info}
+
+Crée-moi un programme d'entraînement {workout_type} pour cette semaine.<|end|>
+<|assistant|>
+Voici ton programme {workout_type} personnalisé pour la semaine:
+
+📅 PROGRAMME HEBDOMADAIRE ({frequency} séances):
+
+Séance 1-3: {workout_type}
+- Durée: {duration:.1f}h par séance
+- Intensité: {'Modérée' if experience <= 2 else 'Élevée'}
+- Calories estimées: {calories_burned:.0f} cal/séance
+
+💡 CONSEILS:
+- Hydratation: {water:.1f}L par jour minimum
+- Échauffement: 10 minutes avant chaque séance
+- Récupération: 48h entre séances intenses
+- Progression: {'Commence doucement, concentre-toi sur la technique' if experience == 1 else 'Augmente progressivement l intensité' if experience == 2 else 'Challenge-toi avec des variantes avancées'}
+
+🎯 OBJECTIF:
+Avec une fréquence cardiaque moyenne de {avg_bpm} BPM et un pourcentage de masse grasse de {fat_percentage:.1f}%, tu es sur la bonne voie!<|end|>"""
+
+    # Exemple 2: Plan nutritionnel
+    nutrition_prompt = f"""<|system|>
+Tu es FitBox, un nutritionniste expert. Fournis des plans alimentaires personnalisés.<|end|>
+<|user|>
+{user_info}
+Type d'entraînement: {workout_type}
+Calories cibles: {target_calories:.0f} cal/jour
+Protéines: {protein_g:.0f}g
+Glucides: {carbs_g:.0f}g
+Lipides: {fat_g:.0f}g
+
+Donne-moi un plan alimentaire pour une journée.<|end|>
+<|assistant|>
+Voici ton plan nutritionnel pour atteindre tes objectifs:
+
+🍳 PETIT-DÉJEUNER (25% - {target_calories * 0.25:.0f} cal):
+- Protéines: {protein_g * 0.25:.0f}g
+- Glucides: {carbs_g * 0.25:.0f}g
+- Lipides: {fat_g * 0.25:.0f}g
+
+Exemple: Omelette 3 œufs, flocons d'avoine, fruits
+
+🥗 DÉJEUNER (35% - {target_calories * 0.35:.0f} cal):
+- Protéines: {protein_g * 0.35:.0f}g
+- Glucides: {carbs_g * 0.35:.0f}g
+- Lipides: {fat_g * 0.35:.0f}g
+
+Exemple: Poulet grillé 200g, riz complet, légumes
+
+🍽️ DÎNER (30% - {target_calories * 0.30:.0f} cal):
+- Protéines: {protein_g * 0.30:.0f}g
+- Glucides: {carbs_g * 0.30:.0f}g
+- Lipides: {fat_g * 0.30:.0f}g
+
+Exemple: Poisson, patates douces, salade
+
+🥜 COLLATIONS (10% - {target_calories * 0.10:.0f} cal):
+Fruits secs, yaourt grec, fruits frais
+
+💧 HYDRATATION:
+{water:.1f}L d'eau minimum par jour<|end|>"""
+
+    # Exemple 3: Conseils généraux
+    general_prompt = f"""<|system|>
+Tu es FitBox, un coach sportif et nutritionniste expert.<|end|>
+<|user|>
+{user_info}
+
+Donne-moi des conseils pour optimiser mes résultats.<|end|>
+<|assistant|>
+Voici mes conseils personnalisés pour toi:
+
+💪 ENTRAÎNEMENT:
+- Continue ton programme {workout_type} à raison de {frequency} fois/semaine
+- Maintiens ta fréquence cardiaque moyenne autour de {avg_bpm} BPM
+- Fréquence cardiaque au repos: {resting_bpm} BPM (très bon!)
+
+📊 PROGRESSION:
+- Ton IMC actuel: {bmi} - {bmi_category}
+- Calories à consommer: {target_calories:.0f} cal/jour
+- Répartition: {protein_g:.0f}g protéines, {carbs_g:.0f}g glucides, {fat_g:.0f}g lipides
+
+🎯 RECOMMANDATIONS:
+1. Maintiens ton niveau d'activité actuel
+2. Assure {water:.1f}L d'eau par jour
+3. Dors 7-8h par nuit pour la récupération
+4. {'Concentre-toi sur la technique avant d augmenter les charges' if experience == 1 else 'Continue à progresser graduellement' if experience == 2 else 'N hésite pas à varier tes entraînements'}
+
+Tu es sur la bonne voie! Continue comme ça! 🚀<|end|>"""
+
+    return workout_prompt, nutrition_prompt, general_prompt
+
+
+def _row_values(df: pd.DataFrame, column: str) -> list:
+    """
+    Valeurs Python d'une colonne, typées comme les lignes de df.iterrows():
+    si toutes les colonnes sont numériques, iterrows() convertit chaque
+    ligne vers le type commun (ex. 56 -> 56.0).
+    """
+    dtypes = list(df.dtypes)
+    if all(pd.api.types.is_numeric_dtype(dtype) for dtype in dtypes):
+        return df[column].astype(np.result_type(*dtypes)).tolist()
+    return df[column].tolist()
+
+
+def _numeric(column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """(valeurs float64, masque des valeurs présentes mais non numériques)"""
+    values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=np.float64)
+    return values, np.isnan(values) & column.notna().to_numpy()
+
+
+def prepare_chunk(df: pd.DataFrame) -> Tuple[List[tuple], List[int]]:
+    """
+    Calcule en colonnes les profils d'un bloc du CSV.
+
+    Returns:
+        Tuple (lignes prêtes pour format_examples, index des lignes ignorées)
+    """
+    gender_numeric, _ = _numeric(df['Gender'])
+    age, _ = _numeric(df['Age'])
+    workout_numeric, bad_workout = _numeric(df['Workout_Type'])
+    frequency, bad_frequency = _numeric(df['Workout_Frequency (days/week)'])
+
+    with np.errstate(invalid="ignore"):
+        gender = np.where(np.trunc(gender_numeric) == 1, "female", "male")
+    workout_types = map_workout_types(workout_numeric)
+    goals = map_goals(workout_types)
+
+    batch = PhysiologicalCalculator.calculate_batch_profiles(
+        age=np.trunc(age),
+        gender=gender,
+        weight=df['Weight (kg)'],
+        height=df['Height (m)'],
+        activity_level=map_activity_levels(frequency),
+        goal=goals
+    )
+    # Lignes rejetées par l'ancienne boucle: genre ou âge non convertibles en
+    # int, type ou fréquence non numériques, profil invalide
+    skipped = (batch["error_mask"] | ~np.isfinite(gender_numeric) | ~np.isfinite(age)
+               | bad_workout | bad_frequency)
+
+    columns = [_row_values(df, column) for column in TEXT_COLUMNS]
+    bmi_category = [BMI_DESCRIPTIONS[i] if i >= 0 else None for i in batch["bmi_category"].tolist()]
+
+    rows = zip(
+        columns[0], _row_values(df, 'Gender'), *columns[1:], workout_types.tolist(),
+        batch["bmi"].tolist(), bmi_category, batch["target_calories"].tolist(),
+        batch["protein_g"].tolist(), batch["carbs_g"].tolist(), batch["fat_g"].tolist()
+    )
+    kept, skipped_index = [], []
+    for row, index, skip in zip(rows, df.index.tolist(), skipped.tolist()):
+        if skip:
+            skipped_index.append(index)
+        else:
+            kept.append(row)
+    return kept, skipped_index
+
+
+def to_jsonl(texts: Sequence[str]) -> str:
+    """Lignes JSONL {"text": ...} (json.dumps d'une chaîne seule: encodeur C direct)"""
+    return "".join('{"text": ' + json.dumps(text, ensure_ascii=False) + '}\n' for text in texts)
+
+
+def render_chunk(rows: List[tuple], jsonl: bool = False):
+    """
+    Textes d'un bloc (3 par ligne, dans l'ordre); exécuté dans les processus du pool.
+
+    Avec jsonl=True, retourne (lignes JSONL, nombre d'exemples): l'encodage
+    JSON est alors fait lui aussi dans le pool.
+    """
+    texts = []
+    for row in rows:
+        texts.extend(format_examples(*row))
+    if jsonl:
+        return to_jsonl(texts), len(texts)
+    return texts
+
+
+def _chunks(path: str, chunk_rows: int, max_samples: Optional[int]) -> Iterator[pd.DataFrame]:
+    """Blocs du CSV (ou d'un fichier .parquet, lu par lots avec pyarrow)"""
+    parquet = str(path).endswith(".parquet")
+    if max_samples:
+        # Même échantillon qu'avant (random_state=42): le fichier est lu en entier
+        df = pd.read_parquet(path) if parquet else pd.read_csv(path)
+        df = df.sample(n=min(max_samples, len(df)), random_state=42)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+    elif parquet:
+        import pyarrow.parquet as pq
+        offset = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            df = batch.to_pandas()
+            df.index += offset
+            offset += len(df)
+            yield df
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def generate_examples(
+    csv_path: str,
+    max_samples: Optional[int] = None,
+    chunk_rows: int = 10000,
+    num_workers: Optional[int] = None,
+    jsonl: bool = False
+) -> Iterator:
+    """
+    Génère les textes d'entraînement bloc par bloc.
+
+    Args:
+        csv_path: CSV des profils (colonnes de fitness_data_cleaned.csv),
+            ou fichier .parquet (lu par lots avec pyarrow)
+        max_samples: Échantillon aléatoire (random_state=42) de cette taille
+        chunk_rows: Lignes du CSV par bloc
+        num_workers: Processus de rendu (None: nombre de CPU, 1: sans pool)
+        jsonl: Produire des blocs JSONL (voir render_chunk)
+
+    Yields:
+        Liste des textes de chaque bloc (ou tuple (JSONL, nombre)), dans
+        l'ordre du CSV
+    """
+    num_workers = num_workers or os.cpu_count() or 1
+    prepared = (prepare_chunk(chunk) for chunk in _chunks(csv_path, chunk_rows, max_samples))
+
+    def _report(skipped: List[int]):
+        if skipped:
+            preview = ", ".join(str(i) for i in skipped[:10])
+            print(f"⚠️  {len(skipped)} ligne(s) ignorée(s) (valeurs invalides): {preview}{'...' if len(skipped) > 10 else ''}")
+
+    if num_workers <= 1:
+        for rows, skipped in prepared:
+            _report(skipped)
+            yield render_chunk(rows, jsonl)
+        return
+
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        # Au plus 2 blocs en attente par processus: la mémoire reste bornée
+        pending = []
+        for rows, skipped in prepared:
+            _report(skipped)
+            pending.append(pool.submit(render_chunk, rows, jsonl))
+            if len(pending) >= 2 * num_workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def iter_examples(
+    path: str,
+    max_samples: Optional[int] = None,
+    chunk_rows: int = 10000,
+    num_workers: Optional[int] = None
+) -> Iterator[dict]:
+    """Exemples {"text": ...} un par un (générateur d'un IterableDataset)"""
+    for texts in generate_examples(path, max_samples, chunk_rows, num_workers):
+        for text in texts:
+            yield {"text": text}
+
+
+class ShardWriter:
+    """Écrit les exemples en JSONL ({"text": ...}), un nouveau fichier tous les shard_size exemples"""
+
+    def __init__(self, output_dir: str, shard_size: int = 100000, prefix: str = "train"):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.shard_size = shard_size
+        self.prefix = prefix
+        self.paths: List[Path] = []
+        self.count = 0
+        self._file = None
+        self._in_shard = 0
+
+    def write(self, texts: Sequence[str]):
+        """Écrit des textes"""
+        self.write_jsonl(to_jsonl(texts), len(texts))
+
+    def write_jsonl(self, lines: str, count: int):
+        """Écrit `count` lignes JSONL déjà encodées (render_chunk(..., jsonl=True))"""
+        start = 0
+        while count:
+            if self._file is None or self._in_shard >= self.shard_size:
+                self._open_next()
+            take = min(count, self.shard_size - self._in_shard)
+            end = len(lines)
+            if take < count:
+                end = start
+                for _ in range(take):
+                    end = lines.index("\n", end) + 1
+            self._file.write(lines[start:end])
+            self._in_shard += take
+            self.count += take
+            count -= take
+            start = end
+
+    def _open_next(self):
+        self.close()
+        path = self.output_dir / f"{self.prefix}-{len(self.paths):05d}.jsonl"
+        self._file = open(path, "w", encoding="utf-8")
+        self.paths.append(path)
+        self._in_shard = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_training_shards(
+    csv_path: str,
+    output_dir: str,
+    max_samples: Optional[int] = None,
+    chunk_rows: int = 10000,
+    num_workers: Optional[int] = None,
+    shard_size: int = 100000
+) -> List[Path]:
+    """
+    Génère les exemples et les écrit en shards JSONL au fil de l'eau.
+
+    Returns:
+        Chemins des shards écrits, dans l'ordre
+    """
+    with ShardWriter(output_dir, shard_size=shard_size) as writer:
+        for lines, count in generate_examples(csv_path, max_samples, chunk_rows, num_workers, jsonl=True):
+            writer.write_jsonl(lines, count)
+            print(f"   Exemples écrits: {writer.count}")
+    print(f"✅ {writer.count} exemples dans {len(writer.paths)} shard(s) ({output_dir})")
+    return writer.paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génération des exemples d'entraînement en shards JSONL")
+    parser.add_argument("csv_path")
+    parser.add_argument("output_dir")
+    parser.add_argument("--max-samples", type=int, default=None)
+    parser.add_argument("--chunk-rows", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--shard-size", type=int, default=100000)
+    args = parser.parse_args()
+
+    write_training_shards(
+        args.csv_path, args.output_dir, max_samples=args.max_samples,
+        chunk_rows=args.chunk_rows, num_workers=args.workers, shard_size=args.shard_size
+    )
+
+
+if __name__ == "__main__":
+    main()
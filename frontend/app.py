@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 import json
 import time
+import uuid
 from datetime import datetime
 import plotly.graph_objects as go
 from fpdf import FPDF
@@ -254,7 +255,7 @@ class FitBoxFrontend:
         if 'chat_history' not in st.session_state:
             st.session_state.chat_history = []
         if 'conversation_id' not in st.session_state:
-            st.session_state.conversation_id = f"user_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            st.session_state.conversation_id = f"user_{uuid.uuid4().hex}"
         if 'user_data' not in st.session_state:
             st.session_state.user_data = {}
         if 'show_chat_stats' not in st.session_state:
@@ -286,16 +287,12 @@ class FitBoxFrontend:
             return None
     
     def send_message(self, message, user_data):
-        """Envoie un message au chatbot"""
+        """Envoie un message au chatbot (l'historique est relu côté serveur)"""
         try:
             payload = {
                 "user_data": user_data,
                 "message": message,
-                "conversation_id": st.session_state.conversation_id,
-                "history": [
-                    {"user": msg["user"], "assistant": msg["bot"]}
-                    for msg in st.session_state.chat_history[-3:]
-                ]
+                "conversation_id": st.session_state.conversation_id
             }
             
             response = requests.post(
@@ -582,6 +579,8 @@ def render_chat_interface(frontend):
     with col2:
         if st.button("Effacer", use_container_width=True):
             st.session_state.chat_history = []
+            # Nouvelle conversation: le serveur ne reprend plus l'ancien historique
+            st.session_state.conversation_id = f"user_{uuid.uuid4().hex}"
             st.rerun()
     with col3:
         if st.button("Stats", use_container_width=True):
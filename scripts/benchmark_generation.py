@@ -0,0 +1,94 @@
+"""
+Benchmark de la génération locale: débit (tokens/s) avec et sans cache KV.
+
+Compare, à nombre de tokens générés fixe (400 par défaut):
+1. model.generate avec use_cache=False (ancien comportement)
+2. LocalGenerationEngine: cache KV activé
+3. LocalGenerationEngine: cache KV + cache du préfixe <|system|>
+
+Usage (depuis la racine du dépôt, mode local: OLLAMA_LOCAL=0):
+    OLLAMA_LOCAL=0 python scripts/benchmark_generation.py --new-tokens 400 --runs 3
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import torch
+
+
+def _timed(fn, new_tokens: int, runs: int) -> float:
+    """Exécute fn `runs` fois et retourne le débit moyen en tokens/s"""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        durations.append(time.perf_counter() - start)
+    return new_tokens / (sum(durations) / len(durations))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark génération locale (cache KV)")
+    parser.add_argument("--model-path", default=None, help="Dossier du modèle (défaut: models/fitbox_model)")
+    parser.add_argument("--new-tokens", type=int, default=400)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OLLAMA_LOCAL", "0")
+    from backend_api import FitBoxBackend
+
+    backend = FitBoxBackend(args.model_path)
+    backend.use_ollama = False
+    if not backend.load_model():
+        print("❌ Impossible de charger le modèle local")
+        sys.exit(1)
+
+    user_data = {"age": 25, "gender": "male", "weight": 75, "height": 1.75,
+                 "activity_level": "moderately_active", "goal": "muscle_gain"}
+    profile = backend.calculate_profile(user_data)["profile"]
+    prompt = backend.create_prompt(user_data, profile, "Donne-moi 3 conseils pour progresser.")
+
+    # Longueur fixe: min_new_tokens empêche un arrêt anticipé sur EOS
+    fixed = dict(max_new_tokens=args.new_tokens, min_new_tokens=args.new_tokens)
+    engine = backend.get_engine()
+
+    def no_cache():
+        inputs = backend.tokenizer(prompt, return_tensors="pt").to(backend.device)
+        with torch.no_grad():
+            backend.model.generate(**inputs, do_sample=True, temperature=0.7, top_p=0.9, top_k=50,
+                                   repetition_penalty=1.1, pad_token_id=backend.tokenizer.eos_token_id,
+                                   use_cache=False, **fixed)
+
+    def kv_cache():
+        engine.generate(prompt, min_new_tokens=args.new_tokens, max_new_tokens=args.new_tokens)
+
+    def kv_and_prefix_cache():
+        engine.generate(prompt, min_new_tokens=args.new_tokens, max_new_tokens=args.new_tokens,
+                        prefix=backend.SYSTEM_PREAMBLE)
+
+    # Amorçage (kernels, cache du préfixe)
+    kv_and_prefix_cache()
+
+    print("\n" + "=" * 60)
+    print(f"⏱️  BENCHMARK GÉNÉRATION LOCALE ({args.new_tokens} tokens, {args.runs} runs, {backend.device})")
+    print("=" * 60)
+    results = [
+        ("use_cache=False", _timed(no_cache, args.new_tokens, args.runs)),
+        ("Cache KV", _timed(kv_cache, args.new_tokens, args.runs)),
+        ("Cache KV + préfixe", _timed(kv_and_prefix_cache, args.new_tokens, args.runs)),
+    ]
+    baseline = results[0][1]
+    for name, tps in results:
+        print(f"   {name:<22} {tps:8.2f} tokens/s   (x{tps / baseline:.2f})")
+    print(f"\n   Cache de préfixe: {engine.stats()}")
+    print("=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
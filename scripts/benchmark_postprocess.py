@@ -0,0 +1,137 @@
+"""
+Micro-benchmark du nettoyage des réponses générées.
+
+Compare sur un corpus de sorties du modèle:
+1. normalize_text_reference (ancienne version: une passe re.sub par règle)
+2. normalize_text (expressions précompilées, passes regroupées)
+3. IncrementalNormalizer (flux découpé en morceaux de quelques caractères)
+4. Ancien streaming: texte complet re-nettoyé à chaque morceau
+
+et vérifie que toutes les versions produisent le même texte.
+
+Le corpus est un fichier JSONL (champ "response", "text" ou "output", par
+exemple des réponses journalisées) ou un fichier texte où les réponses sont
+séparées par une ligne vide. Sans --corpus, un corpus représentatif des
+artefacts observés (gras, lettres espacées, espaces avant ponctuation...) est
+généré.
+
+Usage (depuis la racine du dépôt):
+    python scripts/benchmark_postprocess.py --corpus logs/responses.jsonl --runs 5
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from text_normalizer import IncrementalNormalizer, normalize_text, normalize_text_reference
+
+
+SAMPLES = [
+    "**Programme d'entraînement** pour la p r i s e de masse :\n\n"
+    "1. **Squat** : 4 séries de 8 répétitions ( repos 90 s ) .\n"
+    "2. **Développé couché** : 4 x 10 , charge modérée .\n"
+    "3. Tractions • 3 séries jusqu 'à l ' échec\n\n\n\n"
+    "Conseil : augmente la charge de 2 , 5 % chaque semaine !",
+    "Voici ton plan nutritionnel  pour  2 500 kcal/jour :\n"
+    "- Petit-déjeuner : flocons d' avoine , banane , `whey`\n"
+    "- Déjeuner : riz complet , poulet , légumes\n"
+    "-----\n"
+    "__Protéines__ : 150 g ; __Glucides__ : 280 g ; __Lipides__ : 70 g .",
+    "Ton IMC est de 24,5 ( corpulence normale ) . Ton métabolisme de base est "
+    "d' environ 1 750 kcal et ta dépense totale de 2 700 kcal . "
+    "Pour perdre du poids , vise un déficit de 500 kcal : e n t r a î n e m e n t "
+    "3 fois par semaine et marche quotidienne ?",
+]
+
+
+def load_corpus(path: str) -> list:
+    """Charge les réponses depuis un fichier JSONL ou texte"""
+    content = Path(path).read_text(encoding="utf-8")
+    if path.endswith(".jsonl"):
+        corpus = []
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            obj = json.loads(line)
+            if isinstance(obj, dict):
+                obj = obj.get("response") or obj.get("text") or obj.get("output") or ""
+            corpus.append(str(obj))
+        return corpus
+    return [block for block in content.split("\n\n\n") if block.strip()]
+
+
+def synthetic_corpus(size: int, seed: int = 0) -> list:
+    """Corpus généré à partir de SAMPLES (longueurs et combinaisons variées)"""
+    rng = random.Random(seed)
+    return ["\n\n".join(rng.choices(SAMPLES, k=rng.randint(1, 6))) for _ in range(size)]
+
+
+def _chunks(text: str, size: int = 4):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _stream_incremental(text: str) -> str:
+    normalizer = IncrementalNormalizer()
+    parts = [normalizer.feed(chunk) for chunk in _chunks(text)]
+    parts.append(normalizer.flush())
+    return "".join(parts)
+
+
+def _stream_rescan(text: str) -> str:
+    raw = ""
+    cleaned = ""
+    for chunk in _chunks(text):
+        raw += chunk
+        cleaned = normalize_text_reference(raw)
+    return cleaned
+
+
+def _timed(fn, corpus: list, runs: int) -> float:
+    """Durée moyenne (ms) pour traiter tout le corpus"""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        durations.append(time.perf_counter() - start)
+    return sum(durations) / len(durations) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du nettoyage des réponses")
+    parser.add_argument("--corpus", default=None, help="Fichier JSONL ou texte de réponses du modèle")
+    parser.add_argument("--size", type=int, default=500, help="Taille du corpus généré (sans --corpus)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.size)
+
+    mismatches = sum(
+        1 for text in corpus
+        if not (normalize_text(text) == _stream_incremental(text) == normalize_text_reference(text))
+    )
+
+    print("\n" + "=" * 60)
+    print(f"⏱️  BENCHMARK NETTOYAGE ({len(corpus)} réponses, "
+          f"{sum(len(t) for t in corpus) / 1000:.0f} k caractères, {args.runs} runs)")
+    print("=" * 60)
+    results = [
+        ("Référence (re.sub x13)", _timed(normalize_text_reference, corpus, args.runs)),
+        ("normalize_text", _timed(normalize_text, corpus, args.runs)),
+        ("Flux incrémental", _timed(_stream_incremental, corpus, args.runs)),
+        ("Flux re-nettoyé (ancien)", _timed(_stream_rescan, corpus, max(1, args.runs // 5))),
+    ]
+    baseline = results[0][1]
+    for name, ms in results:
+        print(f"   {name:<26} {ms:10.2f} ms   (x{baseline / ms:.2f})")
+    print(f"\n   Sorties différentes de la référence: {mismatches}")
+    print("=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark du démarrage du backend: mode Ollama vs mode local.
+
+Chaque mesure tourne dans un processus Python neuf (imports à froid) et
+relève:
+1. le temps d'import de backend_api (construction de FitBoxBackend comprise)
+2. le temps de chargement (backend.load(): rien à charger en mode Ollama)
+3. le pic de mémoire résidente (RSS) du processus
+4. si torch / transformers / peft ont été importés
+
+Avec --background, le chargement passe par start_background_load(): le
+temps "prêt à servir" est alors celui de l'import seul.
+
+Usage (depuis la racine du dépôt):
+    python scripts/benchmark_startup.py --runs 3
+    python scripts/benchmark_startup.py --modes local --background
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+CHILD = r"""
+import json, resource, sys, time
+start = time.perf_counter()
+import backend_api
+imported = time.perf_counter()
+backend = backend_api.backend
+if BACKGROUND:
+    backend.start_background_load().join()
+else:
+    backend.load()
+loaded = time.perf_counter()
+print("@@" + json.dumps({
+    "import_s": imported - start,
+    "load_s": loaded - imported,
+    "ready": backend.ready,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": sorted(m for m in ("torch", "transformers", "peft") if m in sys.modules),
+}))
+"""
+
+MODES = {
+    # Serveur Ollama (pas de requête envoyée: seul le démarrage est mesuré)
+    "ollama": {"OLLAMA_LOCAL": "1", "OLLAMA_HEALTH_INTERVAL": "0"},
+    "local": {"OLLAMA_LOCAL": "0", "OLLAMA_API_URL": "", "OLLAMA_API_URLS": ""},
+}
+
+
+def run_once(mode: str, background: bool) -> dict:
+    """Démarre le backend dans un processus neuf et retourne ses mesures"""
+    env = dict(os.environ, **MODES[mode])
+    code = CHILD.replace("BACKGROUND", "True" if background else "False")
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith("@@"):
+            return json.loads(line[2:])
+    raise RuntimeError(f"Échec du démarrage ({mode}):\n{proc.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage du backend")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--background", action="store_true", help="Chargement via start_background_load()")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 60)
+    print(f"⏱️  BENCHMARK DÉMARRAGE ({args.runs} runs{', chargement en arrière-plan' if args.background else ''})")
+    print("=" * 60)
+    for mode in args.modes:
+        runs = [run_once(mode, args.background) for _ in range(args.runs)]
+        import_s = sum(r["import_s"] for r in runs) / len(runs)
+        load_s = sum(r["load_s"] for r in runs) / len(runs)
+        ready_s = import_s if args.background else import_s + load_s
+        print(f"\n   Mode {mode}:")
+        print(f"   import backend_api     {import_s * 1000:10.1f} ms")
+        print(f"   chargement             {load_s * 1000:10.1f} ms   (prêt: {runs[-1]['ready']})")
+        print(f"   prêt à servir          {ready_s * 1000:10.1f} ms")
+        print(f"   RSS max                {max(r['rss_mb'] for r in runs):10.1f} Mo")
+        print(f"   modules lourds         {', '.join(runs[-1]['heavy']) or 'aucun'}")
+    print("\n" + "=" * 60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+# asgi_app importe ses voisins directement (lancé depuis backend/)
+sys.path.insert(0, str(parent_dir / "backend"))
+
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+try:
+    import asgi_app
+    from asgi_app import app, backend, generation
+    from response_cache import ResponseCache
+    HAS_QUART = True
+except ImportError:
+    HAS_QUART = False
+
+
+USER = {"age": 25, "gender": "male", "weight": 75, "height": 1.75, "goal": "muscle_gain"}
+
+
+@unittest.skipUnless(HAS_QUART, "quart/httpx non installés")
+class TestAsgiApp(unittest.IsolatedAsyncioTestCase):
+    """Tests des routes du mode ASGI (Ollama remplacé par un faux client)"""
+
+    async def asyncSetUp(self):
+        self.prompts = []
+        self.loop_thread = threading.get_ident()
+        self.release = asyncio.Event()
+        self.release.set()
+
+        async def fake_ollama(prompt, max_tokens, temperature):
+            self.prompts.append(prompt)
+            await self.release.wait()
+            return f"Réponse {len(self.prompts)}"
+
+        for target, attribute, value in (
+            (generation, "_ollama", fake_ollama),
+            (backend, "use_ollama", True),
+            (backend, "response_cache", None),
+        ):
+            patcher = mock.patch.object(target, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = app.test_client()
+
+    async def test_chat(self):
+        """Test: réponse générée, échange enregistré et repris dans le prompt suivant"""
+        response = await self.client.post("/chat", json={"user_data": USER, "message": "Salut", "conversation_id": "asgi-1"})
+        payload = await response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(payload["response"], "Réponse 1")
+        self.assertGreater(payload["prompt_tokens"], 0)
+        self.assertEqual(backend.conversations.count("asgi-1"), 1)
+
+        await self.client.post("/chat", json={"user_data": USER, "message": "Et ensuite ?", "conversation_id": "asgi-1"})
+        self.assertIn("Réponse 1", self.prompts[-1])
+
+    async def test_chat_invalid_body(self):
+        """Test: corps absent, non JSON ou incomplet -> 400"""
+        for kwargs in ({}, {"data": "pas du json", "headers": {"Content-Type": "text/plain"}},
+                       {"json": {"user_data": USER}}):
+            response = await self.client.post("/chat", **kwargs)
+            self.assertEqual(response.status_code, 400, kwargs)
+            self.assertEqual((await response.get_json())["error"], "user_data et message sont requis")
+        self.assertEqual(self.prompts, [])
+
+    async def test_generate_plans(self):
+        """Test: /generate_workout et /generate_nutrition, puis réponse servie par le cache"""
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResponseCache(path=str(Path(tmp) / "cache.db"))
+            with mock.patch.object(backend, "response_cache", cache):
+                for route, key in (("/generate_workout", "workout_plan"), ("/generate_nutrition", "nutrition_plan")):
+                    first = await (await self.client.post(route, json=USER)).get_json()
+                    second = await (await self.client.post(route, json=USER)).get_json()
+                    self.assertTrue(first["success"])
+                    self.assertEqual((first["cached"], second["cached"]), (False, True))
+                    self.assertEqual(second[key], first[key])
+                    self.assertIn("bmi", first["profile"])
+        self.assertEqual(len(self.prompts), 2)
+
+        response = await self.client.post("/generate_workout", data="x", headers={"Content-Type": "text/plain"})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_ready(self):
+        """Test: /ready à 503 pendant le chargement, 200 une fois prêt"""
+        with mock.patch.object(backend, "load_state", "loading"):
+            self.assertEqual((await self.client.get("/ready")).status_code, 503)
+        with mock.patch.object(backend, "load_state", "ready"), mock.patch.object(backend, "warmup_state", "done"):
+            response = await self.client.get("/ready")
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue((await response.get_json())["ready"])
+
+    async def test_coalescing(self):
+        """Test: deux demandes identiques simultanées partagent une seule génération"""
+        if generation.coalescing is None:
+            self.skipTest("FITBOX_COALESCE désactivé")
+        self.release.clear()
+        requests = [asyncio.ensure_future(self.client.post("/generate_workout", json=USER)) for _ in range(2)]
+        while not self.prompts:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        self.release.set()
+
+        payloads = [await response.get_json() for response in await asyncio.gather(*requests)]
+        self.assertEqual(len(self.prompts), 1)
+        self.assertEqual(payloads[0]["workout_plan"], payloads[1]["workout_plan"])
+
+    async def test_blocking_calls_off_event_loop(self):
+        """Test: historique, prompt et cache de réponses appelés hors de la boucle d'événements"""
+        threads = {}
+
+        def recorder(name, fn):
+            def wrapper(*args, **kwargs):
+                threads[name] = threading.get_ident()
+                return fn(*args, **kwargs)
+            return wrapper
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResponseCache(path=str(Path(tmp) / "cache.db"))
+            patches = [
+                mock.patch.object(backend, "response_cache", cache),
+                mock.patch.object(backend, "conversation_history", recorder("history", backend.conversation_history)),
+                mock.patch.object(backend, "build_prompt", recorder("build_prompt", backend.build_prompt)),
+                mock.patch.object(backend, "create_prompt", recorder("create_prompt", backend.create_prompt)),
+                mock.patch.object(backend.conversations, "append", recorder("append", backend.conversations.append)),
+                mock.patch.object(cache, "get", recorder("cache_get", cache.get)),
+                mock.patch.object(cache, "set", recorder("cache_set", cache.set)),
+            ]
+            for patcher in patches:
+                patcher.start()
+            try:
+                await self.client.post("/chat", json={"user_data": USER, "message": "Salut", "conversation_id": "asgi-2"})
+                await self.client.post("/generate_workout", json=USER)
+            finally:
+                for patcher in reversed(patches):
+                    patcher.stop()
+
+        self.assertEqual(set(threads), {"history", "build_prompt", "create_prompt", "append", "cache_get", "cache_set"})
+        for name, ident in threads.items():
+            self.assertNotEqual(ident, self.loop_thread, name)
+
+
+if __name__ == "__main__":
+    unittest.main()
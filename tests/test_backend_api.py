@@ -0,0 +1,344 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+# backend_api importe ses voisins directement (lancé depuis backend/)
+sys.path.insert(0, str(parent_dir / "backend"))
+
+import json
+import os
+import queue
+import unittest
+from unittest import mock
+
+try:
+    import backend_api
+    from backend_api import app, backend
+    HAS_FLASK = True
+except ImportError:
+    HAS_FLASK = False
+
+
+USER = {"age": 25, "gender": "male", "weight": 75, "height": 1.75, "goal": "muscle_gain"}
+
+
+def parse_sse(body: str) -> list:
+    """Liste (événement, données) d'une réponse text/event-stream"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = "message", None
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        events.append((event, data))
+    return events
+
+
+class QueueStreamer:
+    """Même protocole que TextIteratorStreamer: file de textes, fin par end()"""
+
+    _STOP = object()
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def put(self, text):
+        self.queue.put(text)
+
+    def end(self):
+        self.queue.put(self._STOP)
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get(timeout=5)
+            if item is self._STOP:
+                return
+            yield item
+
+
+@unittest.skipUnless(HAS_FLASK, "flask non installé")
+class TestStreamingRoutes(unittest.TestCase):
+    """Tests des routes SSE (/generate_workout/stream, /generate_nutrition/stream, /chat/stream)"""
+
+    def setUp(self):
+        self.prompts = []
+
+        def fake_stream(prompt, max_tokens=400, temperature=0.7):
+            self.prompts.append(prompt)
+            yield "Bonjour "
+            yield "champion"
+
+        patcher = mock.patch.object(backend, "stream_response", fake_stream)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app.test_client()
+
+    def test_plan_streams(self):
+        """Test: un événement par morceau, puis `done` avec le texte complet et le profil"""
+        for route, key in (("/generate_workout/stream", "workout_plan"),
+                           ("/generate_nutrition/stream", "nutrition_plan")):
+            response = self.client.post(route, json=USER)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.mimetype.startswith("text/event-stream"))
+
+            events = parse_sse(response.get_data(as_text=True))
+            self.assertEqual(events[:2], [("message", {"token": "Bonjour "}), ("message", {"token": "champion"})])
+            event, done = events[-1]
+            self.assertEqual(event, "done")
+            self.assertEqual(done[key], "Bonjour champion")
+            self.assertIn("bmi", done["profile"])
+
+    def test_chat_stream_saves_exchange(self):
+        """Test: /chat/stream enregistre l'échange une fois le flux terminé"""
+        response = self.client.post("/chat/stream", json={"user_data": USER, "message": "Salut", "conversation_id": "sse-1"})
+        event, done = parse_sse(response.get_data(as_text=True))[-1]
+
+        self.assertEqual(event, "done")
+        self.assertEqual((done["response"], done["conversation_id"]), ("Bonjour champion", "sse-1"))
+        self.assertEqual(backend.conversations.count("sse-1"), 1)
+
+    def test_invalid_bodies(self):
+        """Test: corps absent, non JSON, tableau ou incomplet -> 400 JSON (jamais 500)"""
+        bodies = ({}, {"data": "pas du json", "content_type": "text/plain"}, {"json": [USER]},
+                  {"json": {"user_data": USER}}, {"json": {"user_data": [USER], "message": "Salut"}})
+        for route in ("/generate_workout/stream", "/generate_nutrition/stream", "/chat/stream"):
+            for kwargs in bodies:
+                response = self.client.post(route, **kwargs)
+                self.assertEqual(response.status_code, 400, (route, kwargs))
+                self.assertFalse(response.get_json()["success"])
+        self.assertEqual(self.prompts, [])
+
+    def test_unexpected_error_returns_500(self):
+        """Test: une exception avant le flux donne la réponse JSON 500 des autres routes"""
+        with mock.patch.object(backend, "create_prompt", side_effect=RuntimeError("prompt cassé")):
+            response = self.client.post("/generate_workout/stream", json=USER)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.get_json(), {"success": False, "error": "prompt cassé"})
+
+    def test_generation_error_event(self):
+        """Test: une erreur pendant la génération produit un événement `error`"""
+        def failing_stream(prompt, max_tokens=400, temperature=0.7):
+            yield "Début"
+            raise RuntimeError("Erreur Ollama: modèle introuvable")
+
+        with mock.patch.object(backend, "stream_response", failing_stream):
+            response = self.client.post("/chat/stream", json={"user_data": USER, "message": "Salut", "conversation_id": "sse-2"})
+        events = parse_sse(response.get_data(as_text=True))
+
+        self.assertEqual(events[-1], ("error", {"success": False, "error": "Erreur Ollama: modèle introuvable"}))
+        self.assertEqual(backend.conversations.count("sse-2"), 0)
+
+
+@unittest.skipUnless(HAS_FLASK, "flask non installé")
+class TestCalculateBatch(unittest.TestCase):
+    """Tests de /calculate_batch (lignes, colonnes, réponse streamée, requêtes invalides)"""
+
+    FEMALE = {"age": 35, "gender": "female", "weight": 65, "height": 1.65, "activity_level": "lightly_active"}
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def _expected(self, user_data):
+        return backend.calculate_profile(user_data)["profile"]
+
+    def test_rows(self):
+        """Test: une réponse par ligne, erreurs par ligne (champ manquant, valeur invalide ou non scalaire)"""
+        rows = [USER, self.FEMALE, {"age": 25, "gender": "male", "weight": 75},
+                dict(USER, gender="other"), dict(USER, gender=["male"]), "pas un profil"]
+        response = self.client.post("/calculate_batch", json=rows)
+        payload = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((payload["count"], payload["failed"]), (6, 4))
+        results = payload["results"]
+        self.assertEqual([r["index"] for r in results], list(range(6)))
+        self.assertEqual(results[0]["profile"]["bmr"], self._expected(USER)["bmr"]["value"])
+        self.assertEqual(results[1]["profile"]["tdee"], self._expected(self.FEMALE)["tdee"]["value"])
+        self.assertEqual(results[2]["error"], "Champ manquant: height")
+        self.assertEqual(results[3]["error"], "Le genre doit être 'male' ou 'female'")
+        self.assertEqual(results[4]["error"], "Valeur non scalaire (nombre ou texte attendu)")
+        self.assertEqual(results[5]["error"], "Champ manquant: age")
+
+        # Forme {"profiles": [...]}
+        response = self.client.post("/calculate_batch", json={"profiles": rows[:2]})
+        self.assertEqual(response.get_json()["failed"], 0)
+
+    def test_columns(self):
+        """Test: réponse colonnaire, valeurs par défaut et cellules imbriquées signalées par ligne"""
+        columns = {"age": [25, 35, [40]], "gender": ["male", "female", "male"],
+                   "weight": [75, 65, 80], "height": [1.75, 1.65, 1.80]}
+        for body in (columns, {"columns": columns}):
+            response = self.client.post("/calculate_batch", json=body)
+            payload = response.get_json()
+
+            self.assertEqual(response.status_code, 200)
+            out = payload["columns"]
+            self.assertEqual(out["success"], [True, True, False])
+            self.assertEqual(out["error"], [None, None, "Valeur non scalaire (nombre ou texte attendu)"])
+            expected = self._expected({"age": 35, "gender": "female", "weight": 65, "height": 1.65})
+            self.assertEqual(out["target_calories"][1], expected["nutrition"]["target_calories"])
+            self.assertIsNone(out["bmi"][2])
+
+    def test_streamed_response(self):
+        """Test: au-delà du seuil, la réponse est streamée et identique à la réponse directe"""
+        rows = [USER, self.FEMALE] * 5
+        direct = self.client.post("/calculate_batch", json=rows)
+        with mock.patch.object(backend_api, "BATCH_STREAM_THRESHOLD", 3), \
+                mock.patch.object(backend_api, "BATCH_STREAM_CHUNK", 4):
+            streamed = self.client.post("/calculate_batch", json=rows)
+            self.assertTrue(streamed.is_streamed)
+            self.assertEqual(streamed.get_json(), direct.get_json())
+
+            columns = {field: [row[field] for row in rows] for field in ("age", "gender", "weight", "height")}
+            payload = self.client.post("/calculate_batch", json=columns).get_json()
+        self.assertEqual(payload["columns"]["bmr"], [r["profile"]["bmr"] for r in direct.get_json()["results"]])
+
+    def test_invalid_payloads(self):
+        """Test: formes non reconnues -> 400, lot trop volumineux -> 413"""
+        invalid = (
+            {"data": "pas du json", "content_type": "text/plain"},
+            {"json": 42},
+            {"json": {"age": [25], "gender": ["male"], "weight": [75]}},
+            {"json": {"age": [25, 30], "gender": ["male"], "weight": [75, 80], "height": [1.75, 1.8]}},
+            {"json": {"columns": {"age": 25, "gender": "male", "weight": 75, "height": 1.75}}},
+        )
+        for kwargs in invalid:
+            response = self.client.post("/calculate_batch", **kwargs)
+            self.assertEqual(response.status_code, 400, kwargs)
+            self.assertFalse(response.get_json()["success"])
+
+        with mock.patch.object(backend_api, "BATCH_MAX_ROWS", 2):
+            response = self.client.post("/calculate_batch", json=[USER] * 3)
+        self.assertEqual(response.status_code, 413)
+
+
+@unittest.skipUnless(HAS_FLASK, "flask non installé")
+class TestReadiness(unittest.TestCase):
+    """Tests de /ready et /live (chargement, chauffe, nouvelle tentative)"""
+
+    def setUp(self):
+        # Instance neuve: l'état de chargement de `backend` est partagé par les autres tests
+        self.backend = backend_api.FitBoxBackend()
+        self.generated = []
+        self.replies = ["Salut champion"]
+
+        def fake_generate(prompt, max_tokens=400, temperature=0.7):
+            self.generated.append(max_tokens)
+            return self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+
+        patchers = (
+            mock.patch.object(backend_api, "backend", self.backend),
+            mock.patch.object(self.backend, "load_model", return_value=True),
+            mock.patch.object(self.backend, "_generate_response", fake_generate),
+            mock.patch.dict(os.environ, {"FITBOX_WARMUP": "1", "FITBOX_WARMUP_TOKENS": "4",
+                                         "FITBOX_WARMUP_RETRY_SECONDS": "0.01"}),
+        )
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = app.test_client()
+
+    def _ready(self):
+        response = self.client.get("/ready")
+        return response.status_code, response.get_json()
+
+    def test_ready_after_warm_up(self):
+        """Test: 503 avant le chargement et la chauffe, 200 ensuite avec la durée de chauffe"""
+        status, payload = self._ready()
+        self.assertEqual(status, 503)
+        self.assertEqual((payload["load_state"], payload["warmup_state"]), ("pending", "pending"))
+
+        self.assertTrue(self.backend.load())
+        status, payload = self._ready()
+        self.assertEqual((status, payload["warmup_state"]), (503, "pending"))
+
+        self.assertTrue(self.backend.warm_up())
+        status, payload = self._ready()
+        self.assertEqual(status, 200)
+        self.assertTrue(payload["ready"])
+        self.assertEqual(payload["warmup_state"], "done")
+        self.assertIsInstance(payload["warmup_seconds"], float)
+        self.assertIsNone(payload["warmup_error"])
+        self.assertEqual(self.generated, [4])
+
+    def test_warm_up_skipped(self):
+        """Test: FITBOX_WARMUP=0 -> prêt dès le chargement, sans génération"""
+        with mock.patch.dict(os.environ, {"FITBOX_WARMUP": "0"}):
+            self.assertTrue(self.backend.boot())
+        status, payload = self._ready()
+        self.assertEqual((status, payload["warmup_state"]), (200, "skipped"))
+        self.assertIsNone(payload["warmup_seconds"])
+        self.assertEqual(self.generated, [])
+
+    def test_failed_warm_up_is_retried(self):
+        """Test: chauffe en erreur -> 503 avec l'erreur, puis 200 après une nouvelle tentative réussie"""
+        self.replies = ["Erreur Ollama: connexion refusée"] * 2 + ["Salut champion"]
+        with mock.patch.object(backend_api.threading, "Thread") as thread:
+            self.assertTrue(self.backend.boot())
+        self.assertEqual(thread.call_args.kwargs["target"], self.backend._retry_warm_up)
+        thread.return_value.start.assert_called_once()
+
+        status, payload = self._ready()
+        self.assertEqual((status, payload["warmup_state"]), (503, "failed"))
+        self.assertEqual(payload["warmup_error"], "Erreur Ollama: connexion refusée")
+        self.assertIsInstance(payload["warmup_seconds"], float)
+
+        # Boucle du thread de reprise: s'arrête à la première chauffe réussie
+        self.backend._retry_warm_up()
+        status, payload = self._ready()
+        self.assertEqual((status, payload["warmup_state"]), (200, "done"))
+        self.assertIsNone(payload["warmup_error"])
+        self.assertEqual(len(self.generated), 3)
+
+    def test_failed_load(self):
+        """Test: chargement en échec -> 503, pas de chauffe"""
+        self.backend.load_model.return_value = False
+        self.assertFalse(self.backend.boot())
+        status, payload = self._ready()
+        self.assertEqual((status, payload["load_state"], payload["warmup_state"]), (503, "failed", "pending"))
+        self.assertEqual(self.generated, [])
+
+    def test_live(self):
+        """Test: /live répond 200 quel que soit l'état du modèle"""
+        response = self.client.get("/live")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["status"], "alive")
+        self.assertFalse(self.backend.ready)
+
+
+@unittest.skipUnless(HAS_FLASK, "flask non installé")
+class TestStreamInThread(unittest.TestCase):
+    """Tests de stream_in_thread (lecture du streamer de la génération locale)"""
+
+    def test_yields_generated_text(self):
+        """Test: les morceaux sont transmis dans l'ordre"""
+        streamer = QueueStreamer()
+
+        def generate():
+            for text in ("a", "b", "c"):
+                streamer.put(text)
+            streamer.end()
+
+        self.assertEqual(list(backend_api.stream_in_thread(streamer, generate)), ["a", "b", "c"])
+
+    def test_generation_error_reaches_reader(self):
+        """Test: une exception de generate() termine la lecture et est relancée (pas de blocage)"""
+        streamer = QueueStreamer()
+
+        def generate():
+            streamer.put("a")
+            raise RuntimeError("CUDA out of memory")
+
+        received = []
+        with self.assertRaisesRegex(RuntimeError, "CUDA out of memory"):
+            for text in backend_api.stream_in_thread(streamer, generate):
+                received.append(text)
+        self.assertEqual(received, ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import tempfile
+import threading
+import time
+import unittest
+
+from backend.conversation_store import InMemoryConversationStore, SQLiteConversationStore
+
+
+def _entry(i):
+    return {"user": f"question {i}", "assistant": f"réponse {i}", "timestamp": str(i)}
+
+
+class _StoreContract:
+    """Comportement commun aux deux stockages"""
+
+    def make_store(self, max_messages=5):
+        raise NotImplementedError
+
+    def test_append_and_get(self):
+        """Test ajout puis lecture dans l'ordre"""
+        store = self.make_store()
+        for i in range(3):
+            store.append("c1", _entry(i))
+        self.assertEqual(store.get("c1"), [_entry(0), _entry(1), _entry(2)])
+        self.assertEqual(store.count("c1"), 3)
+        self.assertIn("c1", store)
+
+    def test_unknown_conversation(self):
+        """Test conversation inexistante"""
+        store = self.make_store()
+        self.assertIsNone(store.get("absente"))
+        self.assertEqual(store.count("absente"), 0)
+        self.assertNotIn("absente", store)
+        self.assertEqual(store.recent("absente", 3), [])
+
+    def test_message_cap(self):
+        """Test plafond de messages par conversation (les plus anciens partent)"""
+        store = self.make_store(max_messages=5)
+        for i in range(12):
+            store.append("c1", _entry(i))
+        self.assertEqual(store.count("c1"), 5)
+        self.assertEqual(store.get("c1"), [_entry(i) for i in range(7, 12)])
+
+    def test_pagination(self):
+        """Test lecture paginée et derniers messages"""
+        store = self.make_store(max_messages=5)
+        for i in range(8):
+            store.append("c1", _entry(i))
+        self.assertEqual(store.get("c1", offset=1, limit=2), [_entry(4), _entry(5)])
+        self.assertEqual(store.get("c1", offset=4, limit=10), [_entry(7)])
+        self.assertEqual(store.get("c1", offset=10, limit=10), [])
+        self.assertEqual(store.recent("c1", 3), [_entry(5), _entry(6), _entry(7)])
+
+
+class TestInMemoryConversationStore(_StoreContract, unittest.TestCase):
+    """Tests du stockage en mémoire"""
+
+    def make_store(self, max_messages=5):
+        return InMemoryConversationStore(max_conversations=10, max_messages=max_messages)
+
+    def test_lru_eviction(self):
+        """Test éviction de la conversation la moins récemment utilisée"""
+        store = InMemoryConversationStore(max_conversations=2, max_messages=5)
+        store.append("a", _entry(0))
+        store.append("b", _entry(0))
+        store.get("a")
+        store.append("c", _entry(0))
+        self.assertIn("a", store)
+        self.assertNotIn("b", store)
+        self.assertEqual(store.stats()["evicted"], 1)
+
+    def test_ttl_expiry(self):
+        """Test expiration des conversations inactives"""
+        store = InMemoryConversationStore(max_messages=5, ttl_seconds=0.05)
+        store.append("a", _entry(0))
+        time.sleep(0.1)
+        self.assertIsNone(store.get("a"))
+        self.assertEqual(store.stats()["expired"], 1)
+
+
+class TestSQLiteConversationStore(_StoreContract, unittest.TestCase):
+    """Tests du stockage SQLite"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp.name) / "conversations.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_store(self, max_messages=5):
+        return SQLiteConversationStore(self.path, max_messages=max_messages)
+
+    def test_persistence_and_wal(self):
+        """Test persistance entre deux instances (autre worker) et mode WAL"""
+        self.make_store().append("c1", _entry(0))
+        other = self.make_store()
+        self.assertEqual(other.get("c1"), [_entry(0)])
+        mode = other._connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_concurrent_appends(self):
+        """Test ajouts concurrents depuis plusieurs threads"""
+        store = self.make_store(max_messages=100)
+        threads = [
+            threading.Thread(target=lambda: [store.append("c1", _entry(i)) for i in range(10)])
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(store.count("c1"), 40)
+        self.assertEqual(len(store.get("c1")), 40)
+
+    def test_purge_expired(self):
+        """Test purge des conversations expirées"""
+        store = SQLiteConversationStore(self.path, max_messages=5, ttl_seconds=0.05)
+        store.append("a", _entry(0))
+        time.sleep(0.1)
+        self.assertEqual(store.purge_expired(), 1)
+        self.assertIsNone(store.get("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
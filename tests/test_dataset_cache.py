@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import tempfile
+import unittest
+
+from backend import training_data
+from backend.dataset_cache import DatasetCache, file_digest, fingerprint, source_digest, tokenizer_digest
+
+try:
+    from datasets import Dataset
+    HAS_DATASETS = True
+except ImportError:
+    HAS_DATASETS = False
+
+
+class VocabTokenizer:
+    """Tokenizer de test: seul le vocabulaire compte"""
+    eos_token_id = 2
+    pad_token_id = 2
+    special_tokens_map = {"eos_token": "</s>"}
+
+    def __init__(self, vocab):
+        self.vocab = vocab
+
+    def get_vocab(self):
+        return dict(self.vocab)
+
+
+class TestFingerprints(unittest.TestCase):
+    """Tests des empreintes du cache"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_file_digest_follows_content(self):
+        """Test: même contenu, même empreinte, quel que soit le fichier"""
+        paths = [Path(self.tmp.name) / name for name in ("a.csv", "b.csv")]
+        for path in paths:
+            path.write_text("Age,Weight\n25,70\n", encoding="utf-8")
+        self.assertEqual(file_digest(paths[0]), file_digest(paths[1]))
+
+        paths[1].write_text("Age,Weight\n25,71\n", encoding="utf-8")
+        self.assertNotEqual(file_digest(paths[0]), file_digest(paths[1]))
+
+    def test_tokenizer_digest(self):
+        """Test: empreinte indépendante de l'ordre du vocabulaire, sensible à son contenu"""
+        a = VocabTokenizer({"a": 0, "b": 1})
+        self.assertEqual(tokenizer_digest(a), tokenizer_digest(VocabTokenizer({"b": 1, "a": 0})))
+        self.assertNotEqual(tokenizer_digest(a), tokenizer_digest(VocabTokenizer({"a": 0, "c": 1})))
+
+    def test_fingerprint(self):
+        """Test: ordre des paramètres indifférent, chaque valeur compte"""
+        code = source_digest(training_data)
+        self.assertEqual(len(code), 64)
+        self.assertEqual(fingerprint(csv="x", code=code, max_length=2048),
+                         fingerprint(max_length=2048, code=code, csv="x"))
+        self.assertNotEqual(fingerprint(csv="x", max_length=2048), fingerprint(csv="x", max_length=1024))
+        self.assertNotEqual(fingerprint(max_samples=None), fingerprint(max_samples=0))
+
+    @unittest.skipUnless(HAS_DATASETS, "datasets non installé")
+    def test_round_trip(self):
+        """Test: dataset et métadonnées relus depuis le cache"""
+        cache = DatasetCache(self.tmp.name)
+        key = fingerprint(csv="x")
+        self.assertIsNone(cache.load("texts", key))
+
+        cache.save("texts", key, Dataset.from_dict({"text": ["a", "b"]}), {"padding_report": {"steps": 1}})
+        dataset, metadata = cache.load("texts", key)
+        self.assertEqual(dataset["text"], ["a", "b"])
+        self.assertEqual(metadata["padding_report"], {"steps": 1})
+        self.assertIsNone(cache.load("texts", fingerprint(csv="y")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import unittest
+
+from backend.generation_router import GenerationRouter, health_url
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestGenerationRouter(unittest.TestCase):
+    """Tests de la répartition entre répliques Ollama"""
+
+    URLS = ["http://a:11434/api/generate", "http://b:11434/api/generate", "http://c:11434/api/generate"]
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_least_outstanding(self):
+        """Test: la réplique la moins chargée est choisie, égalités tour à tour"""
+        router = GenerationRouter(self.URLS, clock=self.clock)
+        held = [router.acquire() for _ in range(3)]
+        self.assertEqual(sorted(r.url for r in held), sorted(self.URLS))
+
+        router.release(held[0])
+        self.assertIs(router.acquire(), held[0])
+
+    def test_latency_weighted(self):
+        """Test: répartition proportionnelle à l'inverse de la latence"""
+        router = GenerationRouter(self.URLS[:2], strategy="latency_weighted", clock=self.clock)
+        fast, slow = router.replicas
+        fast.latency, slow.latency = 0.1, 0.3
+
+        counts = {fast.url: 0, slow.url: 0}
+        for _ in range(400):
+            replica = router.acquire()
+            counts[replica.url] += 1
+            router.release(replica)
+        self.assertEqual(counts, {fast.url: 300, slow.url: 100})
+
+    def test_ejection_after_failures(self):
+        """Test: écartement après échecs consécutifs, retour après eject_seconds"""
+        router = GenerationRouter(self.URLS[:2], eject_after=2, eject_seconds=30, clock=self.clock)
+        bad = router.replicas[0]
+        for _ in range(2):
+            router.acquire(exclude=[self.URLS[1]])
+            router.release(bad, ok=False)
+
+        for _ in range(5):
+            replica = router.acquire()
+            self.assertEqual(replica.url, self.URLS[1])
+            router.release(replica, latency=0.05)
+
+        self.clock.now = 31
+        self.assertIn(bad.url, [router.acquire().url for _ in range(2)])
+        self.assertEqual(router.stats()["replicas"][0]["ejections"], 1)
+
+    def test_success_resets_failures(self):
+        """Test: un succès remet le compteur d'échecs consécutifs à zéro"""
+        router = GenerationRouter(self.URLS[:1], eject_after=2, clock=self.clock)
+        for ok in (False, True, False):
+            router.release(router.acquire(), ok=ok)
+        self.assertFalse(router.all_down())
+
+    def test_all_down_and_panic(self):
+        """Test: aucune réplique disponible -> None, sauf en mode panique"""
+        router = GenerationRouter(self.URLS[:2], clock=self.clock)
+        router.check_health(lambda url: False)
+        self.assertTrue(router.all_down())
+        self.assertIsNone(router.acquire())
+        self.assertIsNotNone(router.acquire(panic=True))
+        self.assertIsNone(router.acquire(exclude=self.URLS[:2], panic=True))
+
+    def test_health_check(self):
+        """Test: contrôle de santé actif (une sonde qui lève compte comme un échec)"""
+        router = GenerationRouter(self.URLS, clock=self.clock)
+
+        def probe(url):
+            if "c:" in url:
+                raise ConnectionError("refused")
+            return "a:" in url
+
+        router.check_health(probe)
+        self.assertEqual([r.healthy for r in router.replicas], [True, False, False])
+        self.assertEqual(router.acquire().url, self.URLS[0])
+        self.assertEqual(router.stats()["available"], 1)
+
+    def test_config(self):
+        """Test: URLs dédupliquées, stratégie validée, URL de santé"""
+        router = GenerationRouter(self.URLS[:1] + [" " + self.URLS[0] + " ", ""])
+        self.assertEqual(router.urls, self.URLS[:1])
+        with self.assertRaises(ValueError):
+            GenerationRouter(self.URLS, strategy="random")
+        with self.assertRaises(ValueError):
+            GenerationRouter([])
+        self.assertEqual(health_url("https://ollama.com/api/generate?x=1"), "https://ollama.com/api/tags")
+
+
+if __name__ == "__main__":
+    unittest.main()
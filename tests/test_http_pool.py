@@ -0,0 +1,94 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.http_pool import PooledHTTPSession
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    """Serveur HTTP/1.1 minimal imitant /api/generate"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(payload.get("delay", 0))
+        body = json.dumps({"response": "ok"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPooledHTTPSession(unittest.TestCase):
+    """Tests du pool de connexions HTTP"""
+
+    def setUp(self):
+        """Démarre un serveur local keep-alive"""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/generate"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        """Test réutilisation de la connexion keep-alive"""
+        pool = PooledHTTPSession(pool_maxsize=2)
+        for _ in range(5):
+            resp = pool.post(self.url, json={"prompt": "test"})
+            self.assertEqual(resp.json()["response"], "ok")
+
+        stats = pool.stats()
+        pool.close()
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["new_connections"], 1)
+        self.assertAlmostEqual(stats["reuse_ratio"], 0.8)
+        self.assertEqual(stats["errors"], 0)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_per_host_limit_records_wait_time(self):
+        """Test limite par hôte: la seconde requête attend un créneau"""
+        pool = PooledHTTPSession(pool_maxsize=2, max_per_host=1)
+        threads = [
+            threading.Thread(target=pool.post, args=(self.url,), kwargs={"json": {"delay": 0.2}})
+            for _ in range(2)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = pool.stats()
+        pool.close()
+        self.assertEqual(stats["requests"], 2)
+        self.assertGreaterEqual(stats["wait_time_max_ms"], 100)
+
+    def test_split_timeouts(self):
+        """Test timeouts connexion/lecture séparés"""
+        pool = PooledHTTPSession(connect_timeout=1.5, read_timeout=30)
+        self.assertEqual(pool.timeout, (1.5, 30))
+        stats = pool.stats()
+        pool.close()
+        self.assertEqual(stats["connect_timeout"], 1.5)
+        self.assertEqual(stats["read_timeout"], 30)
+        self.assertEqual(stats["reuse_ratio"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
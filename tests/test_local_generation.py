@@ -0,0 +1,288 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import re
+import threading
+import time
+import unittest
+
+try:
+    import torch
+    from backend.local_generation import BatchScheduler, LocalGenerationEngine
+    HAS_TORCH = True
+except ImportError:
+    HAS_TORCH = False
+
+
+PREFIX = "<|system|>\n    Tu es FitBox.\n    <|end|>\n    <|user|>\n    "
+PROMPT = PREFIX + "Profil: homme, 25 ans\n    Message<|end|>\n    <|assistant|>\n    "
+
+
+class Encoding(dict):
+    """Sortie du faux tokenizer (accès par clé ou attribut, .to(device))"""
+
+    def __getattr__(self, name):
+        return self[name]
+
+    def to(self, device):
+        return self
+
+
+class StubTokenizer:
+    """
+    Tokenizer par mots: un saut de ligne est un token, les espaces sont
+    rattachés au mot qui suit (comme " mot" en BPE). BOS = 1, EOS = 2, PAD = 0.
+    """
+
+    PATTERN = r"\n|[^\S\n]*\S+|[^\S\n]+"
+
+    def __init__(self):
+        self.pad_token = None
+        self.eos_token = "</s>"
+        self.eos_token_id = 2
+        self.pad_token_id = 0
+        self.vocab = {"<pad>": 0, "<s>": 1, "</s>": 2}
+        self.calls = 0
+
+    def _ids(self, text, add_special_tokens):
+        ids = [1] if add_special_tokens else []
+        for token in re.findall(self.PATTERN, text):
+            ids.append(self.vocab.setdefault(token, len(self.vocab)))
+        return ids
+
+    def __call__(self, text, return_tensors=None, add_special_tokens=True, padding=False, padding_side="right"):
+        self.calls += 1
+        if isinstance(text, str):
+            ids = self._ids(text, add_special_tokens)
+            return Encoding(input_ids=torch.tensor([ids]) if return_tensors else ids)
+        rows = [self._ids(t, add_special_tokens) for t in text]
+        width = max(len(r) for r in rows)
+        input_ids, attention_mask = [], []
+        for row in rows:
+            pad = [self.pad_token_id] * (width - len(row))
+            mask = [1] * len(row)
+            input_ids.append(pad + row if padding_side == "left" else row + pad)
+            attention_mask.append([0] * len(pad) + mask if padding_side == "left" else mask + [0] * len(pad))
+        return Encoding(input_ids=torch.tensor(input_ids), attention_mask=torch.tensor(attention_mask))
+
+    def decode(self, ids, skip_special_tokens=False):
+        words = {i: w for w, i in self.vocab.items()}
+        return "".join(words.get(int(i), f"<{int(i)}>") for i in ids if not (skip_special_tokens and int(i) < 3))
+
+
+class StubOutput:
+    def __init__(self, past_key_values):
+        self.past_key_values = past_key_values
+
+
+class StubModel:
+    """
+    Faux modèle causal: le cache KV est une liste de tokens déjà vus;
+    generate l'étend en place (comme un DynamicCache) et produit le token
+    " ok" (ou lève l'exception `fail`).
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.prefill_calls = 0
+        self.generate_calls = []
+        self.fail = None
+
+    def __call__(self, input_ids, use_cache=True):
+        self.prefill_calls += 1
+        return StubOutput([input_ids[0].tolist()])
+
+    def generate(self, input_ids, attention_mask=None, max_new_tokens=1, past_key_values=None, **kwargs):
+        self.generate_calls.append({
+            "input_ids": input_ids.tolist(),
+            "past_key_values": past_key_values,
+            "cached": list(past_key_values[0]) if past_key_values is not None else None,
+            "temperature": kwargs.get("temperature"),
+        })
+        if self.fail is not None:
+            raise self.fail
+        if past_key_values is not None:
+            past_key_values[0].extend(range(max_new_tokens))
+        token = self.tokenizer.vocab.setdefault(" ok", len(self.tokenizer.vocab))
+        generated = torch.full((input_ids.shape[0], max_new_tokens), token, dtype=input_ids.dtype)
+        return torch.cat([input_ids, generated], dim=-1)
+
+
+@unittest.skipUnless(HAS_TORCH, "torch non installé")
+class TestLocalGenerationEngine(unittest.TestCase):
+    """Tests du cache de préfixe du moteur local"""
+
+    def setUp(self):
+        self.tokenizer = StubTokenizer()
+        self.model = StubModel(self.tokenizer)
+        self.engine = LocalGenerationEngine(self.model, self.tokenizer, "cpu")
+
+    def test_prefix_ends_on_line_boundary(self):
+        """Test: l'indentation finale du préfixe reste dans la suite"""
+        self.assertEqual(LocalGenerationEngine.cache_boundary(PREFIX), PREFIX[:-4])
+        self.assertEqual(LocalGenerationEngine.cache_boundary("sans saut"), "sans saut")
+
+    def test_same_input_ids_as_full_prompt(self):
+        """Test: mêmes input_ids avec ou sans cache de préfixe"""
+        cached_ids, past = self.engine.encode(PROMPT, prefix=PREFIX)
+        full_ids, no_past = self.engine.encode(PROMPT)
+
+        self.assertIsNotNone(past)
+        self.assertIsNone(no_past)
+        self.assertEqual(cached_ids.tolist(), full_ids.tolist())
+
+    def test_prefix_cache_hit_and_miss(self):
+        """Test: un prefill au premier appel, puis réutilisation (hits, tokens économisés)"""
+        other = PROMPT.replace("25 ans", "40 ans")
+        for prompt in (PROMPT, other, PROMPT):
+            self.engine.generate(prompt, max_new_tokens=3, prefix=PREFIX)
+
+        stats = self.engine.stats()
+        prefix_len = len(self.tokenizer(LocalGenerationEngine.cache_boundary(PREFIX)).input_ids)
+        self.assertEqual(self.model.prefill_calls, 1)
+        self.assertEqual((stats["prefix_entries"], stats["prefix_misses"], stats["prefix_hits"]), (1, 1, 2))
+        self.assertEqual(stats["prefill_tokens_saved"], 2 * prefix_len)
+        self.assertEqual(stats["prefix_rejected"], 0)
+
+        # Autre préfixe: nouveau prefill
+        self.engine.generate(PROMPT.replace("FitBox", "Coach"), prefix=PREFIX.replace("FitBox", "Coach"))
+        self.assertEqual(self.model.prefill_calls, 2)
+        self.assertEqual(self.engine.stats()["prefix_misses"], 2)
+
+    def test_cache_copied_per_request(self):
+        """Test: chaque requête reçoit sa copie du cache, l'original reste intact"""
+        for _ in range(2):
+            self.engine.generate(PROMPT, max_new_tokens=5, prefix=PREFIX)
+
+        first, second = self.model.generate_calls
+        self.assertIsNot(first["past_key_values"], second["past_key_values"])
+        # La seconde requête voit le cache du préfixe seul, pas les tokens de la première
+        self.assertEqual(first["cached"], second["cached"])
+        prefix_ids = self.tokenizer(LocalGenerationEngine.cache_boundary(PREFIX)).input_ids
+        self.assertEqual(second["cached"], prefix_ids)
+
+    def test_split_mismatch_falls_back(self):
+        """Test: si la découpe change la tokenisation, le prompt est tokenisé en entier"""
+        # Espaces rattachés au saut de ligne précédent: "\n    Profil" est un seul token
+        self.tokenizer.PATTERN = r"\s*\S+|\s+"
+        input_ids, past = self.engine.encode(PROMPT, prefix=PREFIX)
+
+        self.assertIsNone(past)
+        self.assertEqual(input_ids.tolist(), self.tokenizer(PROMPT, return_tensors="pt").input_ids.tolist())
+        self.assertEqual(self.model.prefill_calls, 0)
+
+        # Vérification faite une seule fois par préfixe
+        calls = self.tokenizer.calls
+        self.engine.encode(PROMPT, prefix=PREFIX)
+        self.assertEqual(self.tokenizer.calls, calls + 1)
+        self.assertEqual(self.engine.stats()["prefix_rejected"], 1)
+
+    def test_generate_batch(self):
+        """Test: padding à gauche par appel, sorties tronquées à la limite de chaque prompt"""
+        texts = self.engine.generate_batch(["Salut", "Un prompt plus long"], max_new_tokens=[1, 3])
+
+        self.assertEqual(texts, [" ok", " ok ok ok"])
+        self.assertEqual(self.model.generate_calls[0]["input_ids"][0][:2], [0, 0])
+
+
+@unittest.skipUnless(HAS_TORCH, "torch non installé")
+class TestBatchScheduler(unittest.TestCase):
+    """Tests du regroupement en lots du BatchScheduler"""
+
+    def setUp(self):
+        self.tokenizer = StubTokenizer()
+        self.model = StubModel(self.tokenizer)
+        self.engine = LocalGenerationEngine(self.model, self.tokenizer, "cpu")
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+        generate_batch = self.engine.generate_batch
+
+        def recording_generate_batch(prompts, max_new_tokens=400, temperature=0.7, contexts=None):
+            self.release.wait(5)
+            self.batches.append((list(prompts), temperature))
+            return generate_batch(prompts, max_new_tokens=max_new_tokens, temperature=temperature, contexts=contexts)
+
+        self.engine.generate_batch = recording_generate_batch
+
+    def _scheduler(self, **kwargs):
+        return BatchScheduler(self.engine, prefix=PREFIX, **kwargs)
+
+    def test_batch_limited_by_size(self):
+        """Test: un lot ne dépasse pas max_batch_size, les requêtes suivantes forment le lot suivant"""
+        scheduler = self._scheduler(max_batch_size=3, max_wait_ms=500)
+        futures = [scheduler.submit(f"Prompt {i}", max_new_tokens=i + 1) for i in range(5)]
+        results = [f.result(timeout=5) for f in futures]
+
+        self.assertEqual([len(prompts) for prompts, _ in self.batches], [3, 2])
+        # Chaque Future reçoit le résultat de son propre prompt
+        self.assertEqual(results, [" ok" * (i + 1) for i in range(5)])
+        self.assertEqual(scheduler.stats()["batch_size_histogram"], {2: 1, 3: 1})
+
+    def test_batch_limited_by_wait(self):
+        """Test: passé max_wait_ms, le lot part incomplet"""
+        scheduler = self._scheduler(max_batch_size=8, max_wait_ms=30)
+        first = scheduler.submit("Premier")
+        first.result(timeout=5)
+        time.sleep(0.05)
+        second = scheduler.submit("Second")
+        second.result(timeout=5)
+
+        self.assertEqual(scheduler.stats()["batch_size_histogram"], {1: 2})
+        # Lot d'un seul prompt: chemin generate avec préfixe (pas generate_batch)
+        self.assertEqual(self.batches, [])
+
+    def test_grouped_by_temperature(self):
+        """Test: un même lot est généré par température"""
+        scheduler = self._scheduler(max_batch_size=4, max_wait_ms=500)
+        futures = [scheduler.submit(f"Prompt {i}", temperature=t) for i, t in enumerate((0.7, 0.2, 0.7, 0.2))]
+        for future in futures:
+            future.result(timeout=5)
+
+        self.assertEqual(sorted(self.batches, key=lambda b: b[1]),
+                         [(["Prompt 1", "Prompt 3"], 0.2), (["Prompt 0", "Prompt 2"], 0.7)])
+        self.assertEqual(scheduler.stats()["batch_size_histogram"], {4: 1})
+
+    def test_exception_reaches_every_waiter(self):
+        """Test: une erreur du modèle est transmise à chaque Future du lot"""
+        self.model.fail = RuntimeError("CUDA out of memory")
+        scheduler = self._scheduler(max_batch_size=3, max_wait_ms=500)
+        futures = [scheduler.submit(f"Prompt {i}") for i in range(3)]
+
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "CUDA out of memory"):
+                future.result(timeout=5)
+        self.assertEqual(scheduler.stats()["processed"], 0)
+
+        # Le worker continue de servir les requêtes suivantes
+        self.model.fail = None
+        self.assertEqual(scheduler.generate("Après", max_new_tokens=1), " ok")
+
+    def test_stats(self):
+        """Test: profondeur de file, requêtes traitées et latences d'attente"""
+        scheduler = self._scheduler(max_batch_size=2, max_wait_ms=200)
+        self.release.clear()
+        futures = [scheduler.submit(f"Prompt {i}") for i in range(4)]
+        time.sleep(0.1)
+        self.assertEqual(scheduler.stats()["queue_depth"], 2)
+        self.release.set()
+        for future in futures:
+            future.result(timeout=5)
+
+        stats = scheduler.stats()
+        self.assertEqual(stats["processed"], 4)
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual((stats["max_batch_size"], stats["max_wait_ms"]), (2, 200))
+        latency = stats["queue_latency_ms"]
+        self.assertGreater(latency["max"], 50)
+        self.assertLessEqual(latency["p50"], latency["p95"])
+        self.assertLessEqual(latency["p95"], latency["max"])
+
+
+if __name__ == "__main__":
+    unittest.main()
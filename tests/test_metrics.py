@@ -0,0 +1,77 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import contextvars
+import unittest
+
+from backend import metrics
+from backend.metrics import Counter, Gauge, Histogram, Registry
+
+
+class TestMetrics(unittest.TestCase):
+    """Tests des métriques au format Prometheus"""
+
+    def test_counter_and_gauge(self):
+        """Test compteur (monotone) et jauge, rendu texte"""
+        counter = Counter("fitbox_test_total", "Compteur", ("route",))
+        counter.inc(route="/chat")
+        counter.inc(2, route="/chat")
+        self.assertEqual(counter.value(route="/chat"), 3)
+        with self.assertRaises(ValueError):
+            counter.inc(-1, route="/chat")
+        with self.assertRaises(ValueError):
+            counter.inc(backend="ollama")
+
+        gauge = Gauge("fitbox_test_gauge", "Jauge")
+        gauge.set(12.5)
+        registry = Registry()
+        registry.register(counter)
+        registry.register(gauge)
+        text = registry.render()
+        self.assertIn("# TYPE fitbox_test_total counter", text)
+        self.assertIn('fitbox_test_total{route="/chat"} 3', text)
+        self.assertIn("fitbox_test_gauge 12.5", text)
+
+    def test_histogram_buckets(self):
+        """Test histogramme: buckets cumulatifs, somme et nombre"""
+        histogram = Histogram("fitbox_test_seconds", "Durées", ("stage",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value, stage="generate")
+        lines = histogram.render().splitlines()
+        self.assertIn('fitbox_test_seconds_bucket{stage="generate",le="0.1"} 1', lines)
+        self.assertIn('fitbox_test_seconds_bucket{stage="generate",le="1"} 3', lines)
+        self.assertIn('fitbox_test_seconds_bucket{stage="generate",le="+Inf"} 4', lines)
+        self.assertIn('fitbox_test_seconds_sum{stage="generate"} 4.25', lines)
+        self.assertIn('fitbox_test_seconds_count{stage="generate"} 4', lines)
+
+    def test_label_escaping(self):
+        """Test échappement des valeurs d'étiquettes"""
+        counter = Counter("fitbox_test_escape_total", "Échappement", ("kind",))
+        counter.inc(kind='a"b\\c')
+        self.assertIn('kind="a\\"b\\\\c"', counter.render())
+
+    def test_stage_uses_request_context(self):
+        """Test: étapes et tokens étiquetés par la route et le backend du contexte"""
+        def request():
+            metrics.current_route.set("/test_route")
+            metrics.current_backend.set("local")
+            with metrics.stage("create_prompt"):
+                pass
+            metrics.record_tokens(100, 40, 2.0)
+
+        contextvars.copy_context().run(request)
+        labels = dict(route="/test_route", backend="local")
+        self.assertEqual(metrics.STAGE_DURATION.count(stage="create_prompt", **labels), 1)
+        self.assertEqual(metrics.TOKENS.value(direction="in", **labels), 100)
+        self.assertEqual(metrics.TOKENS.value(direction="out", **labels), 40)
+        self.assertEqual(metrics.TOKENS_PER_SECOND.value(**labels), 20.0)
+        # Hors requête: étiquettes par défaut
+        self.assertEqual(metrics.current_route.get(), "none")
+
+
+if __name__ == "__main__":
+    unittest.main()
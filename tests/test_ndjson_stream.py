@@ -0,0 +1,79 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import json
+import unittest
+
+from backend.ndjson_stream import NDJSONDecoder, extract_text, read_ndjson_text
+
+
+def _ndjson(tokens, separator="\n"):
+    objects = [{"response": t, "done": False} for t in tokens] + [{"response": "", "done": True}]
+    return separator.join(json.dumps(o, ensure_ascii=False) for o in objects).encode("utf-8")
+
+
+class TestNDJSONDecoder(unittest.TestCase):
+    """Tests du décodeur NDJSON incrémental"""
+
+    def test_objects_split_across_chunks(self):
+        """Test objets (et caractères UTF-8) coupés entre deux morceaux"""
+        raw = _ndjson(["Voici", " ton", " programme d'entraînement"])
+        for size in (1, 3, 7, 64):
+            chunks = [raw[i:i + size] for i in range(0, len(raw), size)]
+            text, _ = read_ndjson_text(chunks)
+            self.assertEqual(text, "Voici ton programme d'entraînement")
+
+    def test_concatenated_objects(self):
+        """Test objets concaténés sans saut de ligne (`}{`)"""
+        text, _ = read_ndjson_text([_ndjson(["a", "b", "c"], separator="")])
+        self.assertEqual(text, "abc")
+
+    def test_stops_on_done(self):
+        """Test arrêt dès l'objet done: les morceaux suivants ne sont pas lus"""
+        consumed = []
+
+        def chunks():
+            for chunk in (_ndjson(["fin"]), b'{"response": "jamais lu"}'):
+                consumed.append(chunk)
+                yield chunk
+
+        text, _ = read_ndjson_text(chunks())
+        self.assertEqual(text, "fin")
+        self.assertEqual(len(consumed), 1)
+
+    def test_invalid_lines_are_skipped(self):
+        """Test lignes invalides ignorées, extrait conservé pour le debug"""
+        decoder = NDJSONDecoder()
+        objects = decoder.feed('data: pas du json\n{"response": "ok"}\n')
+        self.assertEqual(objects, [{"response": "ok"}])
+        self.assertEqual(decoder.skipped, 1)
+        self.assertEqual(decoder.snippet, "data: pas du json")
+
+    def test_multiline_object_waits_for_completion(self):
+        """Test objet sur plusieurs lignes coupé: attente de la suite"""
+        decoder = NDJSONDecoder()
+        self.assertEqual(decoder.feed('{\n  "response": "ab'), [])
+        self.assertEqual(decoder.feed('c"\n}\n'), [{"response": "abc"}])
+        self.assertEqual(decoder.skipped, 0)
+
+    def test_single_json_without_text(self):
+        """Test réponse non streamée sans champ texte"""
+        text, others = read_ndjson_text([b'{"error": "model not found"}'])
+        self.assertEqual(text, "")
+        self.assertEqual(others, [{"error": "model not found"}])
+
+    def test_extract_text_shapes(self):
+        """Test formes de réponse reconnues"""
+        self.assertEqual(extract_text({"response": "a"}), "a")
+        self.assertEqual(extract_text({"text": "b"}), "b")
+        self.assertEqual(extract_text({"output": [{"text": "c"}]}), "c")
+        self.assertEqual(extract_text({"results": ["d"]}), "d")
+        self.assertEqual(extract_text([1, 2]), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
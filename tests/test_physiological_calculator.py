@@ -8,7 +8,7 @@ sys.path.insert(0, str(parent_dir))
 import unittest
 from backend.physiological_calculator import (
     PhysiologicalCalculator,
-    Gender, ActivityLevel, FitnessGoal, BMICategory
+    Gender, ActivityLevel, FitnessGoal, BMICategory, BatchErrorCode
 )
 
 
@@ -482,6 +482,124 @@ class TestEdgeCases(unittest.TestCase):
         # Note: En pratique, il faudrait un minimum de 1200 cal pour les femmes
 
 
+class TestBatchProfiles(unittest.TestCase):
+    """Tests du calcul vectorisé en lot"""
+    
+    def setUp(self):
+        """Initialisation avant chaque test"""
+        self.calc = PhysiologicalCalculator()
+        self.rows = [
+            (25, "male", 75, 1.75, "moderately_active", "muscle_gain"),
+            (35, "female", 65, 1.65, "lightly_active", "weight_loss"),
+            (50, "Male", 85.3, 1.80, "sedentary", "maintenance"),
+            (42, "FEMALE", 58.7, 1.58, "extra_active", "bulking"),
+            (67, "male", 112.4, 1.91, "very_active", "moderate_weight_loss"),
+        ]
+    
+    def _columns(self, rows):
+        return [list(col) for col in zip(*rows)]
+    
+    def test_batch_matches_scalar(self):
+        """Test résultats identiques au calcul scalaire, arrondis compris"""
+        result = self.calc.calculate_batch_profiles(*self._columns(self.rows))
+        
+        for i, row in enumerate(self.rows):
+            profile = self.calc.calculate_complete_profile(*row)
+            nutrition = profile["nutrition"]
+            self.assertEqual(result["bmi"][i], profile["bmi"]["bmi"])
+            self.assertEqual(result["bmr"][i], profile["bmr"]["value"])
+            self.assertEqual(result["tdee"][i], profile["tdee"]["value"])
+            self.assertEqual(result["target_calories"][i], nutrition["target_calories"])
+            self.assertEqual(result["protein_g"][i], nutrition["macros"]["protein_g"])
+            self.assertEqual(result["carbs_g"][i], nutrition["macros"]["carbs_g"])
+            self.assertEqual(result["fat_g"][i], nutrition["macros"]["fat_g"])
+            self.assertEqual(result["ideal_weight"][i], profile["weight_analysis"]["ideal"])
+            self.assertEqual(result["weight_difference"][i], profile["weight_analysis"]["difference"])
+            
+            category = list(BMICategory)[result["bmi_category"][i]]
+            self.assertEqual(category.description, profile["bmi"]["category"])
+        
+        self.assertFalse(result["error_mask"].any())
+    
+    def test_batch_rounding_edge_cases(self):
+        """Test arrondi IMC identique à round() sur les valeurs ambiguës"""
+        # Taille 2.0 m: IMC = poids / 4 tombe sur des demi-centièmes
+        # (ex: 218.7 / 4 = 54.675) où np.round seul diverge de round()
+        weights = [218.7, 194.9, 141.1, 298.7, 172.7, 237.3] + [30 + i * 0.1 for i in range(500)]
+        n = len(weights)
+        heights = [2.0] * n
+        result = self.calc.calculate_batch_profiles(
+            [30] * n, ["male"] * n, weights, heights, ["sedentary"] * n, ["maintenance"] * n
+        )
+        for i in range(n):
+            self.assertEqual(result["bmi"][i], round(weights[i] / (heights[i] ** 2), 2))
+    
+    def test_batch_error_codes(self):
+        """Test masque d'erreurs et codes par ligne sans échec global"""
+        rows = [
+            (25, "male", 75, 1.75, "moderately_active", "muscle_gain"),
+            (25, "male", 10, 1.75, "moderately_active", "muscle_gain"),
+            (25, "male", 75, 3.0, "moderately_active", "muscle_gain"),
+            (10, "male", 75, 1.75, "moderately_active", "muscle_gain"),
+            (25, "other", 75, 1.75, "moderately_active", "muscle_gain"),
+            (25, "male", 75, 1.75, "couch", "muscle_gain"),
+            (25, "male", 75, 1.75, "moderately_active", "fly"),
+            (10, "other", 10, 1.75, "couch", "fly"),
+            ("abc", "male", 75, 1.75, "moderately_active", "muscle_gain"),
+        ]
+        result = self.calc.calculate_batch_profiles(*self._columns(rows))
+        
+        expected = [
+            BatchErrorCode.OK,
+            BatchErrorCode.INVALID_WEIGHT,
+            BatchErrorCode.INVALID_HEIGHT,
+            BatchErrorCode.INVALID_AGE,
+            BatchErrorCode.INVALID_GENDER,
+            BatchErrorCode.INVALID_ACTIVITY_LEVEL,
+            BatchErrorCode.INVALID_GOAL,
+            BatchErrorCode.INVALID_WEIGHT,
+            BatchErrorCode.INVALID_AGE,
+        ]
+        self.assertEqual(
+            [BatchErrorCode.from_code(int(c)) for c in result["error_codes"]], expected
+        )
+        self.assertEqual(list(result["error_mask"]), [e != BatchErrorCode.OK for e in expected])
+        self.assertEqual(result["bmi_category"][1], -1)
+        self.assertTrue(all(v != v for v in result["bmr"][1:]))  # NaN
+        self.assertGreater(result["bmr"][0], 0)
+    
+    def test_batch_non_scalar_cells(self):
+        """Test cellules non scalaires (listes, objets): erreur sur la ligne, pas sur le lot"""
+        rows = [
+            (25, "male", 75, 1.75, "moderately_active", "muscle_gain"),
+            (25, ["male"], 75, 1.75, "moderately_active", "muscle_gain"),
+            ([25], "male", 75, 1.75, "moderately_active", "muscle_gain"),
+            (25, "male", {"kg": 75}, 1.75, "moderately_active", "muscle_gain"),
+        ]
+        result = self.calc.calculate_batch_profiles(*self._columns(rows))
+        
+        self.assertEqual(
+            [BatchErrorCode.from_code(int(c)) for c in result["error_codes"]],
+            [BatchErrorCode.OK] + [BatchErrorCode.NON_SCALAR] * 3
+        )
+        self.assertEqual(result["bmr"][0], self.calc.calculate_complete_profile(*rows[0])["bmr"]["value"])
+        
+        # Colonnes entièrement imbriquées (tableau 2D si converti tel quel)
+        result = self.calc.calculate_batch_profiles(
+            [[25], [30]], ["male", "female"], [75, 60], [1.75, 1.65],
+            ["sedentary", "sedentary"], ["maintenance", "maintenance"]
+        )
+        self.assertTrue(result["error_mask"].all())
+    
+    def test_batch_length_mismatch(self):
+        """Test colonnes de longueurs différentes"""
+        with self.assertRaises(ValueError):
+            self.calc.calculate_batch_profiles(
+                [25, 30], ["male"], [75, 80], [1.75, 1.80],
+                ["sedentary", "sedentary"], ["maintenance", "maintenance"]
+            )
+
+
 def run_all_tests():
     """Lance tous les tests et affiche un rapport"""
     print("\n" + "=" * 60)
@@ -501,6 +619,7 @@ def run_all_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestCompleteProfile))
     suite.addTests(loader.loadTestsFromTestCase(TestRealWorldScenarios))
     suite.addTests(loader.loadTestsFromTestCase(TestEdgeCases))
+    suite.addTests(loader.loadTestsFromTestCase(TestBatchProfiles))
     
     # Lancer les tests
     runner = unittest.TextTestRunner(verbosity=2)
@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import json
+import unittest
+
+from backend.physiological_calculator import PhysiologicalCalculator
+from backend.profile_cache import ProfileCache, profile_key
+
+
+def _compute(user_data):
+    return PhysiologicalCalculator.calculate_complete_profile(
+        age=user_data['age'],
+        gender=user_data['gender'],
+        weight=user_data['weight'],
+        height=user_data['height'],
+        activity_level=user_data.get('activity_level', 'moderately_active'),
+        goal=user_data.get('goal', 'maintenance')
+    )
+
+
+USER = {"age": 25, "gender": "male", "weight": 75, "height": 1.75}
+
+
+class TestProfileCache(unittest.TestCase):
+    """Tests du cache de profils"""
+
+    def test_hit_returns_shared_profile(self):
+        """Test hit: même objet, identique au calcul direct"""
+        cache = ProfileCache()
+        first = cache.get_or_compute(USER, _compute)
+        second = cache.get_or_compute(dict(reversed(list(USER.items()))), _compute)
+        self.assertIs(first, second)
+        self.assertEqual(json.dumps(first, sort_keys=True), json.dumps(_compute(USER), sort_keys=True))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_defaults_are_part_of_key(self):
+        """Test clé canonique: valeurs par défaut explicites ou implicites"""
+        explicit = dict(USER, activity_level="moderately_active", goal="maintenance")
+        self.assertEqual(profile_key(USER), profile_key(explicit))
+        self.assertNotEqual(profile_key(USER), profile_key(dict(USER, weight=75.0)))
+        self.assertIsNone(profile_key(dict(USER, age=[25])))
+
+    def test_profile_is_read_only(self):
+        """Test profil immuable"""
+        profile = ProfileCache().get_or_compute(USER, _compute)
+        with self.assertRaises(TypeError):
+            profile["bmi"]["bmi"] = 0
+        with self.assertRaises(TypeError):
+            profile.update({})
+
+    def test_lru_eviction(self):
+        """Test éviction LRU"""
+        cache = ProfileCache(max_entries=2)
+        for age in (20, 30, 40):
+            cache.get_or_compute(dict(USER, age=age), _compute)
+        self.assertEqual(cache.stats()["entries"], 2)
+        cache.get_or_compute(dict(USER, age=20), _compute)
+        self.assertEqual(cache.stats()["misses"], 4)
+
+    def test_errors_are_not_cached(self):
+        """Test données invalides: exception propagée, rien en cache"""
+        cache = ProfileCache()
+        with self.assertRaises(ValueError):
+            cache.get_or_compute(dict(USER, weight=-1), _compute)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
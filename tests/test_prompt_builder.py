@@ -0,0 +1,130 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import unittest
+
+from backend.prompt_builder import HISTORY_HEADER, TRUNCATION_MARK, TokenCounter, build_prompt, format_turn
+
+
+class WordTokenizer:
+    """Tokenizer de test: un token par mot"""
+
+    def __init__(self):
+        self.vocab = []
+
+    def encode(self, text, add_special_tokens=True):
+        ids = []
+        for word in text.split():
+            if word not in self.vocab:
+                self.vocab.append(word)
+            ids.append(self.vocab.index(word))
+        return ids
+
+    def decode(self, ids, skip_special_tokens=False):
+        return " ".join(self.vocab[i] for i in ids)
+
+
+def render(history_text, message):
+    return f"<|system|> Coach <|user|> PROFIL{history_text} {message} <|assistant|>"
+
+
+def turn(n, words=10):
+    return {"user": f"question{n}", "assistant": " ".join(f"r{n}_{i}" for i in range(words))}
+
+
+class TestPromptBuilder(unittest.TestCase):
+    """Tests de l'assemblage du prompt sous budget de tokens"""
+
+    def setUp(self):
+        self.counter = TokenCounter(WordTokenizer())
+
+    def test_within_budget_is_unchanged(self):
+        """Test: sous le budget, prompt identique à l'assemblage complet"""
+        history = [turn(1), turn(2)]
+        expected = render(HISTORY_HEADER + "".join(format_turn(h["user"], h["assistant"]) for h in history), "Bonjour")
+
+        prompt, report = build_prompt(render, "Bonjour", history, self.counter, budget=1000)
+
+        self.assertEqual(prompt, expected)
+        self.assertEqual((report["history_kept"], report["history_dropped"]), (2, 0))
+        self.assertEqual(report["prompt_tokens"], self.counter.count(expected))
+        self.assertTrue(report["exact"])
+
+    def test_oldest_turns_dropped_first(self):
+        """Test: les échanges les plus anciens sont abandonnés"""
+        history = [turn(1), turn(2), turn(3)]
+        prompt, report = build_prompt(render, "Bonjour", history, self.counter, budget=40, min_turn_tokens=100)
+
+        self.assertLessEqual(report["prompt_tokens"], 40)
+        self.assertIn("question3", prompt)
+        self.assertNotIn("question1", prompt)
+        self.assertEqual(report["history_kept"] + report["history_dropped"], 3)
+        self.assertEqual(report["history_truncated"], 0)
+
+    def test_answer_truncated_exactly(self):
+        """Test: un échange qui ne tient pas entier est tronqué au token près"""
+        history = [turn(1, words=50), turn(2)]
+        budget = 40
+        prompt, report = build_prompt(render, "Bonjour", history, self.counter, budget=budget, min_turn_tokens=3)
+
+        self.assertEqual(report["prompt_tokens"], self.counter.count(prompt))
+        self.assertLessEqual(report["prompt_tokens"], budget)
+        self.assertEqual((report["history_kept"], report["history_truncated"]), (1, 1))
+        self.assertIn("r1_0", prompt)
+        self.assertNotIn("r1_49", prompt)
+        self.assertIn(TRUNCATION_MARK, prompt)
+        self.assertIn("r2_9", prompt)
+
+    def test_message_truncated_when_alone_too_long(self):
+        """Test: profil + message au-delà du budget, le message est coupé"""
+        message = " ".join(f"mot{i}" for i in range(100))
+        prompt, report = build_prompt(render, message, [turn(1)], self.counter, budget=30)
+
+        self.assertTrue(report["message_truncated"])
+        self.assertLessEqual(report["prompt_tokens"], 30)
+        self.assertIn("mot0", prompt)
+        self.assertTrue(prompt.endswith("<|assistant|>"))
+        self.assertEqual(report["history_dropped"], 1)
+
+    def test_message_truncation_is_recounted(self):
+        """Test: message recoupé tant que le prompt dépasse (jonctions coûteuses)"""
+        def glued(history_text, message):
+            # Chaque mot du message coûte deux tokens une fois dans le prompt
+            return "<|system|> Coach PROFIL" + history_text + " " + " ".join(f"{w} x" for w in message.split())
+
+        message = " ".join(f"mot{i}" for i in range(100))
+        prompt, report = build_prompt(glued, message, [], self.counter, budget=40)
+
+        self.assertTrue(report["message_truncated"])
+        self.assertFalse(report["over_budget"])
+        self.assertEqual(report["prompt_tokens"], self.counter.count(prompt))
+        self.assertLessEqual(report["prompt_tokens"], 40)
+
+    def test_profile_over_budget_reported(self):
+        """Test: profil seul au-delà du budget, message vidé et dépassement signalé"""
+        profile = " ".join(f"champ{i}" for i in range(50))
+        prompt, report = build_prompt(lambda h, m: f"{profile}{h} {m}", "Bonjour", [turn(1)], self.counter, budget=20)
+
+        self.assertTrue(report["message_truncated"])
+        self.assertNotIn("Bonjour", prompt)
+        self.assertTrue(report["over_budget"])
+        self.assertEqual(report["prompt_tokens"], 50)
+
+    def test_estimate_without_tokenizer(self):
+        """Test: sans tokenizer, estimation par caractères"""
+        counter = TokenCounter()
+        self.assertFalse(counter.exact)
+        self.assertEqual(counter.count("a" * 7), 3)
+        self.assertEqual(counter.count(counter.truncate("a" * 100, 5)), 5)
+
+        prompt, report = build_prompt(render, "Bonjour", [turn(1)], counter, budget=1000)
+        self.assertFalse(report["exact"])
+        self.assertIn("question1", prompt)
+
+
+if __name__ == "__main__":
+    unittest.main()
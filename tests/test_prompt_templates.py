@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import unittest
+
+from backend.prompt_templates import PromptTemplateManager, PromptType
+
+
+USER_DATA = {
+    'age': 25, 'gender': 'male', 'weight': 75, 'height': 1.75,
+    'activity_level': 'moderately_active', 'goal': 'muscle_gain', 'experience_level': 2
+}
+
+PROFILE = {
+    'bmi': {'bmi': 24.5, 'category': 'Normal', 'indicator': '🟢'},
+    'bmr': {'value': 1669.4},
+    'tdee': {'value': 2587.6},
+    'nutrition': {
+        'target_calories': 2887.3,
+        'macros': {'protein_g': 216.2, 'carbs_g': 325.5, 'fat_g': 80.1,
+                   'protein_percent': 30, 'carbs_percent': 45, 'fat_percent': 25}
+    },
+    'weight_analysis': {'current': 75, 'ideal': 67.4, 'difference': -7.63, 'status': 'au dessus'}
+}
+
+
+class TestPromptTemplateManager(unittest.TestCase):
+    """Tests des prompts FitBox"""
+
+    def test_prompts_structure(self):
+        """Test: chaque prompt commence par le bloc système et se termine par la balise assistant"""
+        prompts = {
+            PromptType.WORKOUT_PLAN: dict(workout_type="musculation", duration_weeks=2),
+            PromptType.NUTRITION_PLAN: dict(meal_count=3, dietary_restrictions=["Sans gluten"]),
+            PromptType.GENERAL_ADVICE: dict(question="Comment récupérer?",
+                                            conversation_history=[{"user": "Salut", "assistant": "Bonjour"}]),
+            PromptType.MOTIVATION: dict(context_type="plateau"),
+            PromptType.EXERCISE_FORM: dict(exercise_name="squat"),
+            PromptType.PROGRESS_TRACKING: dict(progress_data={'adherence_rate': 80}),
+        }
+        for prompt_type, kwargs in prompts.items():
+            prompt = PromptTemplateManager.get_template_by_type(prompt_type, USER_DATA, PROFILE, **kwargs)
+            self.assertTrue(prompt.startswith("<|system|>\n" + PromptTemplateManager.SYSTEM_MESSAGE), prompt_type)
+            self.assertTrue(prompt.endswith("<|end|>\n<|assistant|>\n"))
+
+    def test_user_context(self):
+        """Test: libellés et formats numériques du contexte"""
+        context = PromptTemplateManager.format_user_context(USER_DATA, PROFILE)
+        self.assertIn("   - Genre: Male\n", context)
+        self.assertIn("   - Niveau: Intermédiaire\n", context)
+        self.assertIn("🎯 Objectif: Prise de masse musculaire\n", context)
+        self.assertIn("Calories cibles: 2887 cal/jour", context)
+        self.assertIn("Différence: 7.6 kg (au dessus)", context)
+
+    def test_unknown_labels(self):
+        """Test: niveau inconnu -> "Non spécifié", objectif et activité inconnus repris tels quels"""
+        user_data = dict(USER_DATA, experience_level=9, goal="recomposition", activity_level="athlete")
+        context = PromptTemplateManager.format_user_context(user_data, PROFILE)
+        self.assertIn("   - Niveau: Non spécifié\n", context)
+        self.assertIn("   - Activité: athlete\n", context)
+        self.assertIn("🎯 Objectif: recomposition\n", context)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+# backend_api importe ses voisins directement (lancé depuis backend/)
+sys.path.insert(0, str(parent_dir / "backend"))
+
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from backend.response_cache import ResponseCache, response_key
+
+try:
+    from backend_api import backend
+    from generation_router import GenerationRouter
+    HAS_FLASK = True
+except ImportError:
+    HAS_FLASK = False
+
+try:
+    import httpx
+    from asgi_app import generation
+    HAS_QUART = True
+except ImportError:
+    HAS_QUART = False
+
+
+class TestResponseCache(unittest.TestCase):
+    """Tests du cache de réponses"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp.name) / "responses.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_depends_on_generation_params(self):
+        """Test clé: prompt, modèle, température et max_tokens"""
+        base = response_key("prompt", "llama3.2", 0.7, 500)
+        self.assertEqual(base, response_key("prompt", "llama3.2", 0.7, 500))
+        self.assertNotEqual(base, response_key("prompt", "llama3.2", 0.2, 500))
+        self.assertNotEqual(base, response_key("prompt", "llama3.2", 0.7, 400))
+        self.assertNotEqual(base, response_key("prompt", "mistral", 0.7, 500))
+        self.assertNotEqual(base, response_key("prompt2", "llama3.2", 0.7, 500))
+
+    def test_hit_miss_and_hit_rate(self):
+        """Test hit/miss et taux de hit"""
+        cache = ResponseCache()
+        self.assertIsNone(cache.get("k"))
+        cache.set("k", "programme")
+        self.assertEqual(cache.get("k"), "programme")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_ttl_and_lru(self):
+        """Test expiration et éviction LRU"""
+        cache = ResponseCache(max_entries=2, ttl_seconds=0.05)
+        cache.set("a", "1")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+
+        cache = ResponseCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "c")
+
+    def test_disk_tier_survives_restart(self):
+        """Test niveau disque: réponse retrouvée par une nouvelle instance"""
+        ResponseCache(path=self.path).set("k", "plan nutritionnel")
+        cache = ResponseCache(path=self.path)
+        self.assertEqual(cache.get("k"), "plan nutritionnel")
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+        # Promu en mémoire: le second accès ne lit plus le disque
+        cache.get("k")
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+
+    def test_disk_tier_is_bounded(self):
+        """Test taille bornée du niveau disque"""
+        cache = ResponseCache(max_entries=1, path=self.path, max_disk_entries=3)
+        for i in range(6):
+            cache.set(f"k{i}", str(i))
+        (count,) = cache._connection().execute("SELECT COUNT(*) FROM responses").fetchone()
+        self.assertEqual(count, 3)
+        self.assertEqual(cache.get("k5"), "5")
+
+
+
+class _UnauthorizedHandler(BaseHTTPRequestHandler):
+    """Faux serveur Ollama: 401 {"error": "unauthorized"}"""
+
+    requests = 0
+
+    def do_POST(self):
+        type(self).requests += 1
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"error": "unauthorized"}).encode("utf-8")
+        self.send_response(401)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipUnless(HAS_FLASK, "flask non installé")
+class TestOllamaErrorsNotCached(unittest.TestCase):
+    """Régression: une erreur Ollama (401 + champ error) n'est jamais mise en cache"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        _UnauthorizedHandler.requests = 0
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _UnauthorizedHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        self.cache = ResponseCache(path=str(Path(tmp.name) / "responses.db"))
+        url = f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+        for attribute, value in (("router", GenerationRouter([url])), ("use_ollama", True),
+                                 ("response_cache", self.cache), ("model", None)):
+            patcher = mock.patch.object(backend, attribute, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _assert_not_cached(self, results):
+        for response, cached in results:
+            self.assertTrue(response.startswith("Erreur Ollama (status 401)"), response)
+            self.assertIn("unauthorized", response)
+            self.assertFalse(cached)
+        self.assertEqual(_UnauthorizedHandler.requests, 2)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+        (count,) = self.cache._connection().execute("SELECT COUNT(*) FROM responses").fetchone()
+        self.assertEqual(count, 0)
+
+    def test_flask_generate_cached(self):
+        """Test: FitBoxBackend.generate_cached rappelle Ollama au lieu de servir l'erreur"""
+        self._assert_not_cached([backend.generate_cached("prompt", max_tokens=8) for _ in range(2)])
+
+    @unittest.skipUnless(HAS_QUART, "quart/httpx non installés")
+    def test_asgi_generate_cached(self):
+        """Test: AsyncGenerationClient.generate_cached, même règle"""
+        async def run():
+            async with httpx.AsyncClient() as client:
+                with mock.patch.object(generation, "client", client):
+                    return [await generation.generate_cached("prompt", max_tokens=8) for _ in range(2)]
+
+        self._assert_not_cached(asyncio.run(run()))
+
+    def test_ollama_result_error_object(self):
+        """Test: champ error ou statut hors 2xx -> message d'erreur, même avec un corps JSON"""
+        from ndjson_stream import NDJSONText
+
+        accumulator = NDJSONText()
+        accumulator.feed(b'{"response": "Bon", "done": false}\n{"error": "model unloaded"}\n')
+        accumulator.close()
+        result = backend.ollama_result(accumulator.text, accumulator.others, accumulator.decoder, 200, accumulator.error)
+        self.assertEqual(result, "Erreur Ollama (status 200): model unloaded")
+
+        accumulator = NDJSONText()
+        accumulator.feed(b'{"detail": "not found"}')
+        accumulator.close()
+        result = backend.ollama_result(accumulator.text, accumulator.others, accumulator.decoder, 404)
+        self.assertTrue(result.startswith("Erreur Ollama (status 404)"), result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import unittest
+
+from backend.sequence_packing import (
+    IGNORE_INDEX, DynamicPaddingCollator, length_grouped_batches, pack_sequences, padding_report
+)
+
+
+class TestPackSequences(unittest.TestCase):
+    """Tests du packing de séquences"""
+
+    def test_boundaries(self):
+        """Test: EOS ajouté, position_ids et labels remis à zéro à chaque exemple"""
+        packed = pack_sequences([[1, 5, 6], [1, 7], [1, 8, 9, 10]], max_length=8, eos_token_id=2, pad_token_id=0)
+
+        self.assertEqual(set(packed), {"input_ids", "labels", "position_ids"})
+        self.assertEqual(packed["input_ids"], [[1, 5, 6, 2, 1, 7, 2, 0], [1, 8, 9, 10, 2, 0, 0, 0]])
+        self.assertEqual(packed["position_ids"], [[0, 1, 2, 3, 0, 1, 2, 0], [0, 1, 2, 3, 4, 0, 1, 2]])
+        self.assertEqual(packed["labels"][0], [IGNORE_INDEX, 5, 6, 2, IGNORE_INDEX, 7, 2, IGNORE_INDEX])
+        self.assertEqual(packed["labels"][1][5:], [IGNORE_INDEX] * 3)
+
+    def test_long_example_truncated(self):
+        """Test: un exemple plus long que max_length est tronqué, EOS déjà présent conservé"""
+        packed = pack_sequences([list(range(10, 20)), [1, 2]], max_length=4, eos_token_id=2)
+        self.assertEqual(packed["input_ids"], [[10, 11, 12, 13], [1, 2, 0, 0]])
+
+
+class TestDynamicPaddingCollator(unittest.TestCase):
+    """Tests du collator à padding dynamique"""
+
+    def test_pads_to_longest(self):
+        """Test: padding au plus long (multiple de 8), labels ignorés sur le padding"""
+        batch = DynamicPaddingCollator(pad_token_id=2)([
+            {"input_ids": [1, 5, 2], "length": 3},
+            {"input_ids": [1] * 9 + [2], "length": 10},
+        ])
+        self.assertEqual(set(batch), {"input_ids", "labels", "attention_mask"})
+        self.assertEqual(tuple(batch["input_ids"].shape), (2, 16))
+        self.assertEqual(batch["labels"][0].tolist()[:4], [1, 5, 2, IGNORE_INDEX])
+        self.assertEqual(batch["attention_mask"][0].tolist()[:4], [1, 1, 1, 0])
+        self.assertEqual(batch["labels"][1].tolist()[9], 2)
+
+    def test_packed_features_pass_through(self):
+        """Test: séquences packées transmises avec leurs position_ids, sans attention_mask"""
+        packed = pack_sequences([[1, 5], [1, 6, 7]], max_length=8, eos_token_id=2)
+        features = [{key: values[0] for key, values in packed.items()}]
+        batch = DynamicPaddingCollator(pad_token_id=0)(features)
+        self.assertEqual(set(batch), {"input_ids", "labels", "position_ids"})
+        self.assertEqual(batch["labels"][0].tolist(), packed["labels"][0])
+
+
+class TestPaddingReport(unittest.TestCase):
+    """Tests du rapport de padding"""
+
+    def test_length_grouped_batches(self):
+        """Test: chaque indice dans un seul batch, batches triés par longueur"""
+        lengths = [5, 100, 7, 90, 6, 95, 8, 80]
+        batches = length_grouped_batches(lengths, batch_size=2, mega_batch_mult=4)
+        self.assertEqual(sorted(i for batch in batches for i in batch), list(range(8)))
+        self.assertEqual([sorted(lengths[i] for i in batch) for batch in batches],
+                         [[95, 100], [80, 90], [7, 8], [5, 6]])
+
+    def test_report(self):
+        """Test: tokens utiles par pas et taux de padding de chaque mode"""
+        report = padding_report([100] * 8, max_length=400, batch_size=2)
+
+        self.assertEqual(report["max_length"], {"steps": 4, "tokens_per_step": 200.0, "padding_ratio": 0.75})
+        self.assertEqual(report["dynamic"]["steps"], 4)
+        self.assertAlmostEqual(report["dynamic"]["padding_ratio"], 1 - 100 / 104, places=4)
+        self.assertEqual(report["packing"], {"steps": 1, "tokens_per_step": 800.0, "padding_ratio": 0.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import asyncio
+import threading
+import time
+import unittest
+
+from backend.single_flight import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Tests du regroupement des générations identiques"""
+
+    def _concurrent(self, flight, key, fn, n=10):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do(key, fn))) for _ in range(n)]
+        for t in threads:
+            t.start()
+        return threads, results
+
+    def test_identical_calls_share_one_execution(self):
+        """Test: N appels simultanés, une seule exécution"""
+        flight = SingleFlight()
+        release = threading.Event()
+        executions = []
+
+        def generate():
+            executions.append(1)
+            release.wait(5)
+            return "programme"
+
+        threads, results = self._concurrent(flight, "k", generate)
+        while flight.stats()["calls"] < 10:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(executions), 1)
+        self.assertEqual([r for r, _ in results], ["programme"] * 10)
+        self.assertEqual(sum(shared for _, shared in results), 9)
+        stats = flight.stats()
+        self.assertEqual((stats["executions"], stats["deduplicated"], stats["in_flight"]), (1, 9, 0))
+
+    def test_sequential_calls_are_not_shared(self):
+        """Test: la clé est libérée une fois la génération terminée"""
+        flight = SingleFlight()
+        self.assertEqual(flight.do("k", lambda: 1), (1, False))
+        self.assertEqual(flight.do("k", lambda: 2), (2, False))
+        self.assertEqual(flight.do("autre", lambda: 3), (3, False))
+
+    def test_error_propagates_to_waiters(self):
+        """Test: l'exception est relevée chez tous les appelants"""
+        flight = SingleFlight()
+        release = threading.Event()
+        errors = []
+
+        def failing():
+            release.wait(5)
+            raise RuntimeError("Ollama indisponible")
+
+        def call():
+            try:
+                flight.do("k", failing)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for t in threads:
+            t.start()
+        while flight.stats()["calls"] < 3:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, ["Ollama indisponible"] * 3)
+        self.assertEqual(flight.do("k", lambda: "ok"), ("ok", False))
+
+    def test_async(self):
+        """Test: variante asynchrone, annulation d'un appelant sans effet sur les autres"""
+        flight = AsyncSingleFlight()
+        executions = []
+
+        async def generate():
+            executions.append(1)
+            await asyncio.sleep(0.05)
+            return "plan"
+
+        async def main():
+            first = asyncio.ensure_future(flight.do("k", generate))
+            await asyncio.sleep(0)
+            others = [asyncio.ensure_future(flight.do("k", generate)) for _ in range(4)]
+            await asyncio.sleep(0)
+            first.cancel()
+            return await asyncio.gather(*others)
+
+        results = asyncio.run(main())
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(results, [("plan", True)] * 4)
+        self.assertEqual(flight.stats()["deduplicated"], 4)
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
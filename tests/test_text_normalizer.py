@@ -0,0 +1,98 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import random
+import unittest
+
+from backend.text_normalizer import IncrementalNormalizer, normalize_text, normalize_text_reference
+
+
+CASES = [
+    "**Squat** : 4 séries ( repos 90 s ) .",
+    "l ' exemple , jusqu 'à l' échec !",
+    "p r o g r a m m e d' e n t r a î n e m e n t",
+    "__Protéines__ : 150 g ; `whey` • banane",
+    "Fin\n\n\n\n\nSuite ----- ***gras*** _`_a__b__",
+    "  \xa0Calories\xa0\xa0: 2 500 kcal ?  ",
+    "ﬁn de séance ( ' repos )",
+    "",
+]
+
+
+def _stream(text, sizes):
+    normalizer = IncrementalNormalizer()
+    out, i = [], 0
+    while i < len(text):
+        size = next(sizes)
+        out.append(normalizer.feed(text[i:i + size]))
+        i += size
+    out.append(normalizer.flush())
+    return "".join(out)
+
+
+class TestNormalizeText(unittest.TestCase):
+    """Tests du nettoyage des réponses générées"""
+
+    def test_matches_reference_on_examples(self):
+        """Test équivalence avec l'implémentation d'origine"""
+        for text in CASES:
+            self.assertEqual(normalize_text(text), normalize_text_reference(text), text)
+
+    def test_expected_output(self):
+        """Test sortie attendue sur une réponse typique"""
+        self.assertEqual(
+            normalize_text("**Squat** : 4 séries ( repos 90 s ) ."),
+            "Squat: 4 séries (repos 90 s)."
+        )
+
+    def test_matches_reference_on_random_text(self):
+        """Test équivalence sur des textes aléatoires riches en artefacts"""
+        rng = random.Random(0)
+        alphabet = list("abcxyzéÀ") * 3 + [" ", " ", "\t", "\n", "\xa0", "*", "_", "`", "•",
+                                          "-", ".", ",", "'", "(", ")", "%", "?", "ﬁ"]
+        for _ in range(3000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80)))
+            self.assertEqual(normalize_text(text), normalize_text_reference(text), repr(text))
+
+
+class TestIncrementalNormalizer(unittest.TestCase):
+    """Tests du nettoyage incrémental d'un flux"""
+
+    def test_stream_equals_full_text(self):
+        """Test concaténation des morceaux == nettoyage du texte complet"""
+        rng = random.Random(1)
+        for text in CASES + [" ".join(CASES) * 3]:
+            sizes = iter(lambda: rng.randint(1, 6), None)
+            self.assertEqual(_stream(text, sizes), normalize_text(text), repr(text))
+
+    def test_emits_before_end_of_stream(self):
+        """Test émission au fil de l'eau (sans attendre flush)"""
+        normalizer = IncrementalNormalizer()
+        emitted = "".join(normalizer.feed(word + " ") for word in ("Voici ton programme " * 10).split())
+        self.assertTrue(emitted.startswith("Voici ton programme"))
+
+    def test_open_bold_marker_is_held(self):
+        """Test `**` ouvert: rien n'est émis avant sa fermeture"""
+        normalizer = IncrementalNormalizer()
+        self.assertEqual(normalizer.feed("**Programme complet de musculation"), "")
+        out = normalizer.feed("** pour debutants ") + normalizer.flush()
+        self.assertEqual(out, normalize_text("**Programme complet de musculation** pour debutants "))
+
+    def test_unclosed_marker_does_not_stall(self):
+        """Test `**` jamais refermé: le flux reprend au-delà de MAX_HOLDBACK caractères"""
+        text = "**Programme tronqué " + "squat et fentes, " * 200
+        normalizer = IncrementalNormalizer()
+        emitted = [normalizer.feed(text[i:i + 5]) for i in range(0, len(text), 5)]
+
+        first = next(i for i, out in enumerate(emitted) if out)
+        self.assertLessEqual(first * 5, IncrementalNormalizer.MAX_HOLDBACK + 5)
+        self.assertTrue(any(emitted[-20:]))
+        self.assertEqual("".join(emitted) + normalizer.flush(), normalize_text(text))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import json
+import tempfile
+import unittest
+
+from backend.training_checkpoints import (
+    STALE_DIR,
+    checkpoint_run_id,
+    find_resume_checkpoint,
+    list_checkpoints,
+    mark_checkpoint,
+    remove_run_checkpoints,
+    set_aside_checkpoints,
+)
+
+
+class TestTrainingCheckpoints(unittest.TestCase):
+    """Tests du choix du checkpoint de reprise (marqueur d'exécution)"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.output_dir = Path(tmp.name)
+
+    def _checkpoint(self, step, run_id=None):
+        path = self.output_dir / f"checkpoint-{step}"
+        path.mkdir()
+        (path / "trainer_state.json").write_text(json.dumps({"global_step": step}))
+        if run_id:
+            mark_checkpoint(path, run_id)
+        return path
+
+    def _finish(self, run_id, steps):
+        with open(self.output_dir / "training_metadata.json", "w") as f:
+            json.dump({"run_id": run_id, "training_metrics": {"steps": steps}}, f)
+
+    def test_resume_after_preemption(self):
+        """Test: exécution interrompue reprise même sous des checkpoints plus numérotés d'une exécution terminée"""
+        for step in (400, 600, 800):
+            self._checkpoint(step, "ancienne")
+        self._finish("ancienne", 800)
+        self._checkpoint(100, "nouvelle")
+        self._checkpoint(200, "nouvelle")
+
+        checkpoint, run_id = find_resume_checkpoint(self.output_dir)
+        self.assertEqual(Path(checkpoint).name, "checkpoint-200")
+        self.assertEqual(run_id, "nouvelle")
+
+        # Les checkpoints de l'exécution terminée sont écartés de la rotation
+        moved = set_aside_checkpoints(self.output_dir, keep_run_id=run_id)
+        self.assertEqual(len(moved), 3)
+        self.assertEqual([step for step, _ in list_checkpoints(self.output_dir)], [100, 200])
+        self.assertTrue((self.output_dir / STALE_DIR / "ancienne" / "checkpoint-800").is_dir())
+
+    def test_skip_after_finished_run(self):
+        """Test: rien à reprendre après une exécution terminée ou sans marqueur"""
+        self.assertIsNone(find_resume_checkpoint(self.output_dir))
+
+        for step in (200, 400):
+            self._checkpoint(step, "terminee")
+        self._finish("terminee", 400)
+        self._checkpoint(600)  # checkpoint sans marqueur (ancienne version)
+        self.assertIsNone(find_resume_checkpoint(self.output_dir))
+
+        self.assertEqual(remove_run_checkpoints(self.output_dir, "terminee"), 2)
+        self.assertEqual([step for step, _ in list_checkpoints(self.output_dir)], [600])
+        self.assertIsNone(checkpoint_run_id(self.output_dir / "checkpoint-600"))
+
+    def test_resume_false(self):
+        """Test: resume=False (nouvel run_id) déplace aussi les checkpoints de l'exécution interrompue"""
+        self._checkpoint(200, "interrompue")
+        self._checkpoint(300)
+
+        moved = set_aside_checkpoints(self.output_dir, keep_run_id="nouvelle")
+        self.assertEqual(sorted(path.parent.name for path in moved), ["interrompue", "unmarked"])
+        self.assertEqual(list_checkpoints(self.output_dir), [])
+        self.assertIsNone(find_resume_checkpoint(self.output_dir))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import sys
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour permettre les imports
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+import json
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from backend.physiological_calculator import PhysiologicalCalculator
+from backend.training_data import (
+    ShardWriter, format_examples, generate_examples, iter_examples, map_activity_levels,
+    map_goals, map_workout_types, write_training_shards
+)
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+CSV_PATH = parent_dir / "data" / "fitness_data_cleaned.csv"
+
+
+def reference_examples(df: pd.DataFrame) -> list:
+    """Textes attendus, calculés ligne par ligne (ancienne boucle iterrows)"""
+    texts = []
+    for _, row in df.iterrows():
+        try:
+            workout = map_workout_types([row['Workout_Type']])[0]
+            profile = PhysiologicalCalculator.calculate_complete_profile(
+                age=int(row['Age']),
+                gender="female" if int(row['Gender']) == 1 else "male",
+                weight=float(row['Weight (kg)']),
+                height=float(row['Height (m)']),
+                activity_level=map_activity_levels([row['Workout_Frequency (days/week)']])[0],
+                goal=map_goals([workout])[0]
+            )
+        except (ValueError, OverflowError):
+            continue
+        nutrition = profile['nutrition']
+        texts.extend(format_examples(
+            row['Age'], row['Gender'], row['Weight (kg)'], row['Height (m)'], row['Experience_Level'],
+            row['Workout_Frequency (days/week)'], row['Session_Duration (hours)'], row['Calories_Burned'],
+            row['Water_Intake (liters)'], row['Avg_BPM'], row['Resting_BPM'], row['Fat_Percentage'],
+            workout, profile['bmi']['bmi'], profile['bmi']['category'], nutrition['target_calories'],
+            nutrition['macros']['protein_g'], nutrition['macros']['carbs_g'], nutrition['macros']['fat_g']
+        ))
+    return texts
+
+
+class TestTrainingData(unittest.TestCase):
+    """Tests de la génération des exemples d'entraînement"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _csv(self, df: pd.DataFrame) -> str:
+        path = Path(self.tmp.name) / "data.csv"
+        df.to_csv(path, index=False)
+        return str(path)
+
+    def test_mappings(self):
+        """Test: mappings vectorisés (bornes incluses, NaN)"""
+        self.assertEqual(
+            list(map_workout_types([0.0, 0.25, 0.3, 0.5, 0.6, 0.75, 1.0, np.nan])),
+            ["cardio", "cardio", "hiit", "hiit", "strength", "strength", "flexibility", "mixed"]
+        )
+        self.assertEqual(list(map_activity_levels([1, 2, 3, 4, 5])),
+                         ["sedentary", "sedentary", "moderately_active", "moderately_active", "very_active"])
+        self.assertEqual(list(map_goals(["cardio", "HIIT", "strength", "mixed"])),
+                         ["weight_loss", "weight_loss", "muscle_gain", "maintenance"])
+
+    def test_identical_to_row_by_row(self):
+        """Test: mêmes textes, même ordre que le calcul ligne par ligne"""
+        df = pd.read_csv(CSV_PATH).head(250)
+        expected = reference_examples(df)
+        texts = [t for chunk in generate_examples(self._csv(df), chunk_rows=64, num_workers=1) for t in chunk]
+        self.assertEqual(len(texts), 750)
+        self.assertEqual(texts, expected)
+
+    def test_invalid_rows_skipped(self):
+        """Test: lignes invalides ignorées, colonnes numériques typées comme iterrows()"""
+        df = pd.read_csv(CSV_PATH).select_dtypes("number").head(20).copy()
+        df.loc[2, 'Age'] = np.nan
+        df.loc[4, 'Weight (kg)'] = 500
+        df.loc[6, 'Workout_Type'] = np.nan
+        texts = [t for chunk in generate_examples(self._csv(df), chunk_rows=8, num_workers=1) for t in chunk]
+
+        self.assertEqual(len(texts), 3 * 18)
+        self.assertEqual(texts, reference_examples(df))
+        self.assertIn("Âge: 56.0 ans", texts[0])
+
+    def test_process_pool_and_shards(self):
+        """Test: pool de processus et shards JSONL, ordre conservé"""
+        df = pd.read_csv(CSV_PATH).head(40)
+        shards = write_training_shards(
+            self._csv(df), Path(self.tmp.name) / "shards", chunk_rows=7, num_workers=2, shard_size=50
+        )
+        self.assertEqual([p.name for p in shards], ["train-00000.jsonl", "train-00001.jsonl", "train-00002.jsonl"])
+        lines = [json.loads(line)["text"] for p in shards for line in p.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(lines, reference_examples(df))
+
+    def test_iter_examples_streams(self):
+        """Test: exemples produits un par un, bloc par bloc"""
+        df = pd.read_csv(CSV_PATH).head(30)
+        examples = iter_examples(self._csv(df), chunk_rows=10, num_workers=1)
+        first = next(examples)
+        self.assertEqual(set(first), {"text"})
+        self.assertEqual([first["text"]] + [ex["text"] for ex in examples], reference_examples(df))
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow non installé")
+    def test_parquet_input(self):
+        """Test: un fichier Parquet donne les mêmes exemples que le CSV"""
+        df = pd.read_csv(CSV_PATH).head(30)
+        path = Path(self.tmp.name) / "data.parquet"
+        df.to_parquet(path, index=False)
+        texts = [ex["text"] for ex in iter_examples(str(path), chunk_rows=7, num_workers=1)]
+        self.assertEqual(texts, reference_examples(df))
+
+    def test_shard_writer_rotation(self):
+        """Test: un shard tous les shard_size exemples"""
+        with ShardWriter(Path(self.tmp.name) / "out", shard_size=2) as writer:
+            writer.write(["a\nb", "c"])
+            writer.write(["d", "e", "f"])
+        counts = [len(p.read_text(encoding="utf-8").splitlines()) for p in writer.paths]
+        self.assertEqual(counts, [2, 2, 1])
+        self.assertEqual(writer.count, 5)
+        self.assertEqual(json.loads(writer.paths[0].read_text(encoding="utf-8").splitlines()[0]), {"text": "a\nb"})
+
+
+if __name__ == "__main__":
+    unittest.main()